@@ -1,58 +1,394 @@
 # ai_service.py
+import json
+import logging
 import os
-import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from dotenv import load_dotenv
 
+import metrics
+from circuit_breaker import CircuitBreaker
+from emissions_model import EmissionsModel
+from response_validator import MAX_FORBIDDEN_LENGTH, ResponseValidator, find_forbidden_text
+
+logger = logging.getLogger(__name__)
+
 # 加载 .env 文件中的秘密
 load_dotenv()
 
-class AIService:
+
+class RateLimiter:
+    """
+    简单的线程安全限流器：保证相邻两次请求的间隔不小于 1/rate 秒。
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def acquire(self):
+        """阻塞直到允许发起下一次请求。"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SummaryBackend:
+    """
+    执行摘要后端接口。
+
+    每个后端根据数据字典和组装好的数据上下文生成摘要文本；
+    无法生成（调用失败、校验不通过等）时返回 None，由 AIService 启动安全网。
+    """
+    name = None
+
+    def summarize(self, data, data_context, stream=None):
+        raise NotImplementedError
+
+
+def validate_ai_response(content, original_data, validator=None):
+    """
+    验证AI响应，确保没有产生数据幻觉。
+    严格检查：只允许文本润色，不允许编造数据。
+
+    Args:
+        content: AI 响应文本
+        original_data: 原始数据字典
+        validator: 已为该数据字典构建好的 ResponseValidator，None 时现场构建
+    """
+    try:
+        with metrics.span('validation'):
+            if validator is None:
+                validator = ResponseValidator(original_data)
+            is_valid, warning = validator.validate(content)
+        if warning:
+            logger.warning("%s", warning)
+        return is_valid
+
+    except Exception as e:
+        logger.error("AI响应验证失败: %s", e)
+        return False
+
+
+class OpenAISummaryBackend(SummaryBackend):
+    """
+    调用 OpenAI 兼容接口对数据上下文进行文本润色，响应必须通过防幻觉校验。
+    """
+    name = 'openai'
+
     def __init__(self):
-        """
-        初始化 AI 服务。
-        它会从 .env 文件读取配置并准备好 AI 客户端。
-        功能严格限制在"文本润色"，确保不产生数据幻觉。
-        """
+        # 流式模式：边接收边检查禁用格式，一旦违规立即中止生成
+        self.stream = os.getenv("AI_STREAMING", "false").lower() == "true"
+
+        # 熔断器：后端故障时直接走安全网，并根据 p95 耗时收缩超时时间
+        max_timeout = float(os.getenv("AI_TIMEOUT", 20.0))
+        self.breaker = CircuitBreaker(
+            max_timeout=max_timeout,
+            open_seconds=float(os.getenv("AI_BREAKER_OPEN_SECONDS", 30.0)),
+        )
         try:
             self.client = OpenAI(
                 api_key=os.getenv("OPENAI_API_KEY"),
                 base_url=os.getenv("OPENAI_BASE_URL"),
-                timeout=20.0 # 设置20秒超时
+                timeout=max_timeout # 默认20秒超时
             )
-            print("AI 文本润色服务初始化成功。")
+            logger.info("AI 文本润色服务初始化成功。")
         except Exception as e:
-            print(f"AI 服务初始化失败: {e}")
+            logger.error("AI 服务初始化失败: %s", e)
             self.client = None
 
+    def summarize(self, data, data_context, stream=None):
+        if not self.client:
+            return None
+        if stream is None:
+            stream = self.stream
+
+        # 2. 非常严格的系统提示词 - 限制AI只能进行文本润色
+        SYSTEM_PROMPT = """
+你是一个专业的碳核算报告助手。你的唯一任务是对提供的排放数据进行文本润色，严禁编造任何数据。
+
+严格要求：
+1. 你只能使用我提供的数据进行文本润色
+2. 严禁编造、预测、估算任何数据
+3. 严禁添加任何未在数据中出现的信息
+4. 语气必须专业、客观
+5. 重点描述排放结构（范围一与范围二的比例关系）
+6. 篇幅控制在300字以内
+7. 只输出纯文本内容，不要包含任何Markdown格式
+8. 不要使用"预计"、"可能"、"大约"等推测性词汇
+9. 如果数据不完整，如实说明"数据待补充"
+
+你的角色是文本润色，不是数据分析师。只做语言的优化和重组。
+"""
+
+        # 3. 用户指令 - 明确要求基于提供的数据
+        USER_PROMPT = f"""
+请根据以下企业提供的关键排放数据，撰写一段专业的"执行摘要"。你必须严格基于以下数据进行文本润色：
+
+{data_context}
+
+要求：
+- 仅使用上述数据进行文本润色
+- 描述排放结构和比例关系
+- 保持专业客观的语气
+- 控制在300字以内
+- 输出纯文本格式
+"""
+
+        if not self.breaker.allow_request():
+            logger.warning("AI 服务处于熔断状态，直接启动安全网")
+            return None
+
+        try:
+            logger.debug("正在调用AI进行文本润色...")
+            logger.debug("数据上下文: %s...", data_context[:100])
+
+            start_time = time.monotonic()
+            try:
+                with metrics.span('ai_call'):
+                    if stream:
+                        content, violation = self._stream_completion(SYSTEM_PROMPT, USER_PROMPT)
+                    else:
+                        response = self._create_completion(SYSTEM_PROMPT, USER_PROMPT)
+                        # 提取AI的回复
+                        content = response.choices[0].message.content
+                        violation = None
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            # 中止的流式回复耗时被截断，不作为耗时样本，否则会拉低 p95 和自适应超时
+            self.breaker.record_success(None if violation else time.monotonic() - start_time)
+
+            if violation:
+                logger.warning("AI响应包含禁用内容 %s，已中止生成，启动安全网", violation)
+                return None
+
+            content = content.strip()
+
+            # 严格的响应验证
+            if validate_ai_response(content, data, validator=ResponseValidator(data)):
+                logger.info("AI文本润色成功，响应验证通过")
+                return content
+            else:
+                logger.warning("AI响应验证失败，启动安全网")
+                return None
+
+        except Exception as e:
+            logger.error("AI文本润色调用失败: %s", e)
+            # AI失败了，但程序不能失败。返回 None 由调用方启动安全网。
+            return None
+
+    def _stream_completion(self, system_prompt, user_prompt):
+        """
+        以流式方式接收 AI 回复，每收到一段就检查禁用格式和幻觉关键词。
+        一旦发现违规立即关闭流，不再为注定被丢弃的回复消耗 token 和时间。
+
+        Returns:
+            (已接收的文本, 违规的模式)；没有违规时第二项为 None
+        """
+        response_stream = self._create_completion(system_prompt, user_prompt, stream=True)
+        content = ''
+        try:
+            for chunk in response_stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+
+                # 只需检查新增内容，以及能与新增内容拼成禁用模式的末尾几个字符
+                scan_start = max(0, len(content) - MAX_FORBIDDEN_LENGTH + 1)
+                content += delta
+                violation = find_forbidden_text(content, scan_start)
+                if violation:
+                    return content, violation
+        finally:
+            close = getattr(response_stream, 'close', None)
+            if close:
+                close()
+
+        return content, None
+
+    def _create_completion(self, system_prompt, user_prompt, **kwargs):
+        """
+        调用 chat.completions 接口，超时时间取熔断器给出的自适应值。
+        """
+        return self.client.chat.completions.create(
+            model="gpt-3.5-turbo",  # 使用稳定可靠的模型
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0,  # 温度设为0，消除任何创意性，确保纯文本润色
+            max_tokens=300,  # 限制最大输出长度
+            top_p=1,        # 使用确定性采样
+            frequency_penalty=0,  # 不改变词频
+            presence_penalty=0,   # 不引入新话题
+            timeout=self.breaker.current_timeout(),
+            **kwargs
+        )
+
+
+# GHG Protocol 范围三的 15 个类别
+SCOPE3_CATEGORY_NAMES = {
+    1: '外购商品和服务',
+    2: '资本货物',
+    3: '燃料和能源相关活动',
+    4: '上游运输和配送',
+    5: '运营中产生的废弃物',
+    6: '商务差旅',
+    7: '员工通勤',
+    8: '上游租赁资产',
+    9: '下游运输和配送',
+    10: '已售产品的加工',
+    11: '已售产品的使用',
+    12: '已售产品的报废处理',
+    13: '下游租赁资产',
+    14: '特许经营',
+    15: '投资',
+}
+
+
+class LocalSummaryBackend(SummaryBackend):
+    """
+    基于规则的本地摘要引擎：不依赖网络，微秒级生成多句执行摘要。
+    内容完全由数据字典计算得出，覆盖范围占比、基于位置与基于市场的差异、范围三主要类别。
+    """
+    name = 'local'
+
+    def __init__(self, top_categories=3):
+        self.top_categories = top_categories
+
+    def summarize(self, data, data_context=None, stream=None):
+        company = data.get('company_name') or '企业'
+        year = str(data.get('report_year') or '本年度')
+        year_text = f"{year}年度" if year.isdigit() else year
+
+        # 数值和汇总直接取自排放模型，不再从格式化字符串中解析
+        emissions = EmissionsModel.from_data(data)
+        scope2_location = emissions.scope_2_location
+        scope2_market = emissions.scope_2_market
+        total_location = emissions.total_location
+        total_market = emissions.total_market
+
+        if not total_location:
+            return (f"{company}已完成{year_text}温室气体盘查，排放数据待补充。"
+                    f"企业将在数据完善后进一步分析排放结构并制定减排计划。")
+
+        sentences = []
+        total_text = f"{company}{year_text}温室气体排放总量（基于位置）为{total_location:,.2f}tCO2e"
+        if total_market:
+            total_text += f"，基于市场为{total_market:,.2f}tCO2e"
+        sentences.append(total_text + "。")
+
+        # 范围占比
+        shares = []
+        for label, name in (('范围一', 'scope_1'), ('范围二（基于位置）', 'scope_2_location'), ('范围三', 'scope_3')):
+            if name in emissions.shares:
+                shares.append((label, getattr(emissions, name), emissions.shares[name]))
+        if shares:
+            parts = [f"{label}排放{value:,.2f}tCO2e，占比{pct:.1f}%" for label, value, pct in shares]
+            sentences.append("其中" + "；".join(parts) + "。")
+            largest = max(shares, key=lambda item: item[1])
+            sentences.append(f"{largest[0]}是企业最主要的排放来源。")
+
+        # 基于位置与基于市场的差异
+        if scope2_location and scope2_market is not None:
+            delta = emissions.scope_2_delta
+            if abs(delta) < 0.005:
+                sentences.append("范围二基于市场与基于位置的核算结果一致。")
+            else:
+                direction = '高' if delta > 0 else '低'
+                sentences.append(
+                    f"范围二基于市场的排放量为{scope2_market:,.2f}tCO2e，较基于位置的结果{direction}"
+                    f"{abs(delta):,.2f}tCO2e（{abs(emissions.scope_2_delta_pct):.1f}%），"
+                    f"反映了外购电力所采用排放因子的差异。"
+                )
+
+        # 范围三主要类别
+        categories = emissions.top_scope3_categories(self.top_categories)
+        if categories:
+            base = emissions.scope_3 or sum(v for v in emissions.scope_3_categories.values() if v > 0)
+            parts = [
+                f"类别{number}{SCOPE3_CATEGORY_NAMES[number]}（{value:,.2f}tCO2e，占范围三的{value / base * 100:.1f}%）"
+                for number, value in categories
+            ]
+            sentences.append("范围三排放主要来自" + "、".join(parts) + "。")
+
+        sentences.append("企业已识别主要排放源，并将基于此数据制定下一步减排计划。")
+        return ''.join(sentences)
+
+class AIService:
+    def __init__(self):
+        """
+        初始化 AI 服务。
+        它会从 .env 文件读取配置并准备好 AI 客户端。
+        功能严格限制在"文本润色"，确保不产生数据幻觉。
+        """
+        self.openai_backend = OpenAISummaryBackend()
+        self.backends = {
+            backend.name: backend
+            for backend in (self.openai_backend, LocalSummaryBackend())
+        }
+        # 默认后端，可按请求覆盖（例如批量任务使用 "local"）
+        self.default_backend = os.getenv("SUMMARY_BACKEND", OpenAISummaryBackend.name)
+
+    # 以下属性保持旧接口：直接访问 OpenAI 后端的客户端、熔断器和流式开关
+    @property
+    def client(self):
+        return self.openai_backend.client
+
+    @client.setter
+    def client(self, value):
+        self.openai_backend.client = value
+
+    @property
+    def breaker(self):
+        return self.openai_backend.breaker
+
+    @breaker.setter
+    def breaker(self, value):
+        self.openai_backend.breaker = value
+
+    @property
+    def stream(self):
+        return self.openai_backend.stream
+
+    @stream.setter
+    def stream(self, value):
+        self.openai_backend.stream = value
+
+    def get_backend(self, name=None):
+        """按名称返回摘要后端，None 表示默认后端。"""
+        name = name or self.default_backend
+        if name not in self.backends:
+            raise ValueError(f"未知的摘要后端: {name}，可选: {', '.join(self.backends)}")
+        return self.backends[name]
+
     def _get_fallback_summary(self, data):
         """
         这是"安全网"。当 AI 失败时，调用这个函数。
         它返回一个基于真实数据的简单文本，绝不产生幻觉。
         """
-        print("警告：AI 文本润色失败，启动 Fallback 安全网。")
+        logger.warning("AI 文本润色失败，启动 Fallback 安全网。")
         company = data.get('company_name', '该公司')
-        year = data.get('report_year', '本年度')
+        year = data.get('report_year') or '本年度'
         total = data.get('total_emission_location', '0')
         scope1 = data.get('scope_1', '0')
         scope2 = data.get('scope_2_location', '0')
         scope3 = data.get('scope_3', '0')
 
-        # 计算比例（如果数据有效）
-        try:
-            total_val = float(str(total).replace('t', '').replace(',', '').strip())
-            scope1_val = float(str(scope1).replace('t', '').replace(',', '').strip())
-            scope2_val = float(str(scope2).replace('t', '').replace(',', '').strip())
-
-            if total_val > 0:
-                scope1_pct = (scope1_val / total_val) * 100
-                scope2_pct = (scope2_val / total_val) * 100
-
-                return f"{company}在{year}完成温室气体盘查，总排放量为{total}tCO2e。其中范围一排放{scope1}tCO2e（占比{scope1_pct:.1f}%），范围二排放{scope2}tCO2e（占比{scope2_pct:.1f}%）。企业已识别主要排放源，并将基于此数据制定下一步减排计划。"
-            else:
-                return f"{company}在{year}完成温室气体盘查，总排放量为{total}tCO2e。企业已识别主要排放源，并将基于此数据制定下一步减排计划。"
-        except:
-            return f"{company}在{year}完成温室气体盘查，总排放量为{total}tCO2e。企业已识别主要排放源，并将基于此数据制定下一步减排计划。"
+        # 占比直接取自排放模型
+        shares = EmissionsModel.from_data(data).shares
+        if 'scope_1' in shares and 'scope_2_location' in shares:
+            return f"{company}在{year}完成温室气体盘查，总排放量为{total}tCO2e。其中范围一排放{scope1}tCO2e（占比{shares['scope_1']:.1f}%），范围二排放{scope2}tCO2e（占比{shares['scope_2_location']:.1f}%）。企业已识别主要排放源，并将基于此数据制定下一步减排计划。"
+        return f"{company}在{year}完成温室气体盘查，总排放量为{total}tCO2e。企业已识别主要排放源，并将基于此数据制定下一步减排计划。"
 
     def _assemble_data_context(self, data):
         """
@@ -61,7 +397,7 @@ class AIService:
         """
         try:
             company = data.get('company_name', '企业')
-            year = data.get('report_year', '本年度')
+            year = data.get('report_year') or '本年度'
             total_location = data.get('total_emission_location', '0')
             total_market = data.get('total_emission_market', '0')
             scope1 = data.get('scope_1', '0')
@@ -69,33 +405,12 @@ class AIService:
             scope2_market = data.get('scope_2_market', '0')
             scope3 = data.get('scope_3', '0')
 
-            # 清理和标准化数据
-            def clean_number(value):
-                if value is None:
-                    return '0'
-                value_str = str(value).replace('t', '').replace(',', '').strip()
-                try:
-                    return float(value_str)
-                except:
-                    return '0'
-
-            total_loc_val = clean_number(total_location)
-            scope1_val = clean_number(scope1)
-            scope2_loc_val = clean_number(scope2_location)
-            scope3_val = clean_number(scope3)
-
-            # 计算排放结构比例
+            # 计算排放结构比例（数值和占比取自排放模型，不再清理字符串后重新解析）
+            emissions = EmissionsModel.from_data(data)
             proportions = []
-            if total_loc_val > 0:
-                if scope1_val > 0:
-                    scope1_pct = (scope1_val / total_loc_val) * 100
-                    proportions.append(f"范围一占比{scope1_pct:.1f}%")
-                if scope2_loc_val > 0:
-                    scope2_pct = (scope2_loc_val / total_loc_val) * 100
-                    proportions.append(f"范围二占比{scope2_pct:.1f}%")
-                if scope3_val > 0:
-                    scope3_pct = (scope3_val / total_loc_val) * 100
-                    proportions.append(f"范围三占比{scope3_pct:.1f}%")
+            for label, name in (('范围一', 'scope_1'), ('范围二', 'scope_2_location'), ('范围三', 'scope_3')):
+                if getattr(emissions, name) and emissions.shares.get(name, 0) > 0:
+                    proportions.append(f"{label}占比{emissions.shares[name]:.1f}%")
 
             # 严格的数据上下文字符串
             data_summary = f"""
@@ -110,166 +425,109 @@ class AIService:
 
             # 验证数据完整性
             if any(val is None or val == '' for val in [company, year, total_location, scope1, scope2_location]):
-                print("警告：数据不完整，可能影响摘要质量")
+                logger.warning("数据不完整，可能影响摘要质量")
 
             return data_summary.strip()
 
         except Exception as e:
-            print(f"数据上下文组装失败: {e}")
-            return f"企业：{data.get('company_name', '企业')}，年份：{data.get('report_year', '本年度')}，数据组装失败，请检查原始数据。"
+            logger.error("数据上下文组装失败: %s", e)
+            return f"企业：{data.get('company_name', '企业')}，年份：{data.get('report_year') or '本年度'}，数据组装失败，请检查原始数据。"
 
-    def _validate_ai_response(self, content, original_data):
+    def _validate_ai_response(self, content, original_data, validator=None):
         """
         验证AI响应，确保没有产生数据幻觉。
         严格检查：只允许文本润色，不允许编造数据。
         """
-        try:
-            # 提取原始数据中的关键数字
-            original_numbers = []
-            data_fields = ['total_emission_location', 'scope_1', 'scope_2_location', 'scope_3']
-            for field in data_fields:
-                value = original_data.get(field)
-                if value:
-                    # 提取数字部分
-                    numbers = re.findall(r'\d+\.?\d*', str(value))
-                    original_numbers.extend(numbers)
-
-            # 检查AI响应中的数字是否都与原始数据一致
-            ai_numbers = re.findall(r'\d+\.?\d*', content)
-
-            for ai_num in ai_numbers:
-                ai_num = ai_num.lstrip('0') if ai_num != '0' else ai_num
-                found = False
-
-                # 检查是否与原始数据中的数字匹配
-                for orig_num in original_numbers:
-                    orig_num = orig_num.lstrip('0') if orig_num != '0' else orig_num
-                    if abs(float(ai_num) - float(orig_num)) < 0.01:  # 允许小的浮点误差
-                        found = True
-                        break
-
-                # 如果不是原始数据中的数字，检查是否是合理的衍生数据
-                if not found:
-                    try:
-                        # 检查是否是年份（合理的年份范围：1900-2100）
-                        if 1900 <= float(ai_num) <= 2100:
-                            continue
-
-                        # 检查是否是百分比（0-100）
-                        if 0 <= float(ai_num) <= 100:
-                            # 检查是否以百分比形式出现
-                            ai_num_index = content.find(ai_num)
-                            context_start = max(0, ai_num_index - 5)
-                            context_end = min(len(content), ai_num_index + len(ai_num) + 5)
-                            context = content[context_start:context_end]
-
-                            if '%' in context or '占比' in context or '比例' in context:
-                                continue
-
-                        # 检查是否是小的整数（可能是序号等）
-                        if len(ai_num) <= 2 and float(ai_num) < 50:
-                            continue
-
-                        print(f"警告：AI响应中包含未经验证的数字 {ai_num}")
-                        return False
-                    except (ValueError, TypeError):
-                        # 如果转换失败，认为是无效数字
-                        print(f"警告：AI响应中包含无效数字格式 {ai_num}")
-                        return False
-
-            # 检查是否包含禁止的格式
-            forbidden_patterns = ['##', '**', '```', '*', '-', '1.', '2.']
-            for pattern in forbidden_patterns:
-                if pattern in content:
-                    print(f"警告：AI响应包含禁用格式 {pattern}")
-                    return False
-
-            # 检查是否包含可能的幻觉内容
-            hallucination_keywords = ['预计', '预测', '可能', '大约', '大概', '估计', '推测']
-            for keyword in hallucination_keywords:
-                if keyword in content:
-                    print(f"警告：AI响应包含可能的幻觉关键词 {keyword}")
-                    return False
-
-            return True
-
-        except Exception as e:
-            print(f"AI响应验证失败: {e}")
-            return False
+        return validate_ai_response(content, original_data, validator=validator)
 
-    def generate_executive_summary(self, data):
+    def generate_executive_summary(self, data, stream=None, backend=None, with_status=False):
         """
         这是"总管"调用的唯一方法。
         功能严格限制在"文本润色"，确保不产生数据幻觉。
-        """
-        if not self.client:
-            # 如果初始化都失败了，直接使用安全网
-            return self._get_fallback_summary(data)
 
+        Args:
+            data: 提取到的数据字典
+            stream: 是否使用流式模式，None 表示使用服务默认设置（环境变量 AI_STREAMING）
+            backend: 摘要后端名称（"openai" 或 "local"），None 表示默认后端（环境变量 SUMMARY_BACKEND）
+            with_status: 为 True 时返回 (摘要, 是否使用了安全网)，调用方据此判断报告能否缓存
+        """
         # 1. 组装数据上下文 - 严格基于真实数据
         data_context = self._assemble_data_context(data)
+        summary, used_fallback = self._summarize_context(data, data_context, stream=stream, backend=backend)
+        return (summary, used_fallback) if with_status else summary
 
-        # 2. 非常严格的系统提示词 - 限制AI只能进行文本润色
-        SYSTEM_PROMPT = """
-你是一个专业的碳核算报告助手。你的唯一任务是对提供的排放数据进行文本润色，严禁编造任何数据。
+    def generate_executive_summaries(self, data_list, max_workers=4, requests_per_second=None,
+                                     stream=None, backend=None):
+        """
+        批量生成执行摘要，用于一次处理多家子公司的盘查数据。
 
-严格要求：
-1. 你只能使用我提供的数据进行文本润色
-2. 严禁编造、预测、估算任何数据
-3. 严禁添加任何未在数据中出现的信息
-4. 语气必须专业、客观
-5. 重点描述排放结构（范围一与范围二的比例关系）
-6. 篇幅控制在300字以内
-7. 只输出纯文本内容，不要包含任何Markdown格式
-8. 不要使用"预计"、"可能"、"大约"等推测性词汇
-9. 如果数据不完整，如实说明"数据待补充"
+        数据上下文和排放数据完全相同的条目只调用一次后端，其余条目复用结果；
+        不同的上下文在线程池中并发调用，并受 requests_per_second 限流。
+        每个结果都经过 _validate_ai_response 校验，单条失败只对该条启用安全网。
 
-你的角色是文本润色，不是数据分析师。只做语言的优化和重组。
-"""
+        Args:
+            data_list: 数据字典列表（与 generate_executive_summary 的入参相同）
+            max_workers: 最大并发调用数
+            requests_per_second: 每秒最多发起的 AI 请求数，None 表示不限流
+            stream: 是否使用流式模式，None 表示使用服务默认设置
+            backend: 摘要后端名称，None 表示默认后端；批量任务可使用 "local"
 
-        # 3. 用户指令 - 明确要求基于提供的数据
-        USER_PROMPT = f"""
-请根据以下企业提供的关键排放数据，撰写一段专业的"执行摘要"。你必须严格基于以下数据进行文本润色：
+        Returns:
+            与 data_list 顺序一一对应的摘要文本列表
+        """
+        data_list = list(data_list)
+        if not data_list:
+            return []
+        self.get_backend(backend)  # 提前校验后端名称
 
-{data_context}
+        contexts = [self._assemble_data_context(data) for data in data_list]
+        keys = [self._summary_key(data, data_context) for data, data_context in zip(data_list, contexts)]
 
-要求：
-- 仅使用上述数据进行文本润色
-- 描述排放结构和比例关系
-- 保持专业客观的语气
-- 控制在300字以内
-- 输出纯文本格式
-"""
+        # 去重：相同摘要键只保留第一次出现的位置
+        unique_keys = {}
+        for index, key in enumerate(keys):
+            unique_keys.setdefault(key, index)
+        logger.info("批量生成执行摘要: 共 %s 条，去重后 %s 条", len(data_list), len(unique_keys))
 
-        try:
-            print("正在调用AI进行文本润色...")
-            print(f"数据上下文: {data_context[:100]}...")
-
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # 使用稳定可靠的模型
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": USER_PROMPT}
-                ],
-                temperature=0,  # 温度设为0，消除任何创意性，确保纯文本润色
-                max_tokens=300,  # 限制最大输出长度
-                top_p=1,        # 使用确定性采样
-                frequency_penalty=0,  # 不改变词频
-                presence_penalty=0    # 不引入新话题
-            )
+        limiter = RateLimiter(requests_per_second) if requests_per_second else None
 
-            # 提取AI的回复
-            content = response.choices[0].message.content.strip()
+        def worker(index):
+            if limiter:
+                limiter.acquire()
+            return self._summarize_context(data_list[index], contexts[index], stream=stream,
+                                           backend=backend)[0]
 
-            # 严格的响应验证
-            if self._validate_ai_response(content, data):
-                print("AI文本润色成功，响应验证通过")
-                return content
-            else:
-                print("AI响应验证失败，启动安全网")
-                return self._get_fallback_summary(data)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {key: executor.submit(worker, index) for key, index in unique_keys.items()}
 
-        except Exception as e:
-            print(f"AI文本润色调用失败: {e}")
-            # AI失败了，但程序不能失败。我们启动安全网。
-            return self._get_fallback_summary(data)
\ No newline at end of file
+            summaries = []
+            for data, key in zip(data_list, keys):
+                try:
+                    summaries.append(futures[key].result())
+                except Exception as e:
+                    logger.error("批量摘要生成失败: %s", e)
+                    summaries.append(self._get_fallback_summary(data))
+
+        return summaries
+
+    @staticmethod
+    def _summary_key(data, data_context):
+        """
+        批量去重的键：数据上下文之外还包括公司、年度和完整的排放模型（基于市场的数值、范围三各类别），
+        覆盖任一后端和安全网读取的所有字段，只有摘要必然相同的条目才会合并。
+        """
+        emissions = EmissionsModel.from_data(data)
+        return json.dumps([data_context, data.get('company_name'), data.get('report_year'), vars(emissions)],
+                          ensure_ascii=False, sort_keys=True, default=str)
+
+    def _summarize_context(self, data, data_context, stream=None, backend=None):
+        """
+        使用已组装好的数据上下文调用摘要后端，后端无法生成时使用安全网摘要。
+
+        Returns:
+            (摘要文本, 是否使用了安全网)
+        """
+        summary = self.get_backend(backend).summarize(data, data_context, stream=stream)
+        if not summary:
+            return self._get_fallback_summary(data), True
+        return summary, False
@@ -1,21 +1,30 @@
-from flask import Flask, render_template, request, redirect, url_for, send_file, flash
-from werkzeug.utils import secure_filename
+from flask import Flask, Response, render_template, request, redirect, session, url_for, send_file, flash
+import io
+import logging
 import os
+from datetime import date
 from dotenv import load_dotenv
 import tempfile
-from datetime import datetime
-import uuid
 
 # 导入现有的模块
-from data_reader import ExcelDataReader
 from report_writer import WordReportWriter
 from ai_service import AIService
+import metrics
+from logging_config import configure_logging
+from report_cache import ReportCache, digest_stream, report_cache_key, writer_template_version
+from report_store import ReportStore
+from uploads import DOCX_MIMETYPE, SpooledRequest, open_upload
+
+logger = logging.getLogger(__name__)
 
 # 加载环境变量
 load_dotenv()
 
 # 创建Flask应用实例
 app = Flask(__name__)
+# 上传文件在内存中缓冲，超过阈值才写入临时文件
+app.request_class = SpooledRequest
+configure_logging()
 
 # 初始化AI服务
 ai_service = AIService()
@@ -28,6 +37,16 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # 确保上传文件夹存在
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# 生成的报告存放在报告存储中，按 TTL 和总大小自动清理，多个工作进程可共享同一目录
+REPORT_FILENAME = "carbon_report_v1.docx"
+report_store = ReportStore.from_env(default_root=os.path.join(UPLOAD_FOLDER, 'reports'))
+
+# 整份报告缓存，模板版本在启动时计算一次
+TEMPLATE_PATH = os.getenv('TEMPLATE_PATH', '模板1.docx')
+COVER_IMAGE_PATH = os.getenv('COVER_IMAGE_PATH', '封面.png')
+TEMPLATE_VERSION = writer_template_version(TEMPLATE_PATH, COVER_IMAGE_PATH)
+report_cache = ReportCache.from_env(default_root=os.path.join(UPLOAD_FOLDER, 'report_cache'))
+
 def allowed_file(filename):
     """检查文件是否是允许的类型"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -37,9 +56,21 @@ def index():
     """首页路由"""
     return render_template('index.html')
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 文本格式的各阶段计数和耗时直方图"""
+    return Response(metrics.render_prometheus(), content_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
 @app.route('/generate_report', methods=['POST'])
 def generate_report():
-    """生成报告的路由"""
+    """生成报告的路由，各阶段耗时通过 Server-Timing 响应头返回"""
+    with metrics.request_timings() as timings:
+        response = app.make_response(_generate_report())
+    response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+    metrics.REGISTRY.inc(metrics.REQUESTS, endpoint='/generate_report', status=response.status_code)
+    return response
+
+def _generate_report():
     # 检查是否有文件被上传
     if 'file' not in request.files:
         flash('请选择一个文件上传')
@@ -54,84 +85,103 @@ def generate_report():
     
     # 确保文件类型正确
     if file and allowed_file(file.filename):
-        # 生成唯一的文件名以避免冲突
-        unique_id = str(uuid.uuid4())[:8]
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{unique_id}_{secure_filename(file.filename)}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
         try:
-            # 使用ExcelDataReader读取数据
-            reader = ExcelDataReader(filepath)
-            report_data = reader.extract_all_data()
-            
-            # 使用AI服务生成执行摘要
-            try:
-                executive_summary = ai_service.generate_executive_summary(report_data)
-                report_data['executive_summary'] = executive_summary
-                print("执行摘要已添加到报告数据中")
-            except Exception as e:
-                print(f"添加执行摘要时出错: {e}")
-                # 即使AI摘要失败，程序也继续运行
-            
-            # 使用WordReportWriter生成报告
-            writer = WordReportWriter(
-                template_path=os.getenv('TEMPLATE_PATH', '模板1.docx'),
-                cover_image_path=os.getenv('COVER_IMAGE_PATH', '封面.png')
+            # 相同文件在同一天生成的报告相同：命中整份报告缓存时跳过提取、AI 和渲染
+            report_date = date.today()
+            cache_key = report_cache_key(
+                digest_stream(file.stream), TEMPLATE_VERSION, None, None,
+                ai_service.default_backend, report_date.isoformat(),
             )
+            cached = report_cache.get(cache_key)
+            if cached is not None:
+                report_file, report_data = cached
+                with report_file:
+                    report_id, token = report_store.put(report_file, REPORT_FILENAME)
+            else:
+                report_content, report_data, used_fallback = _build_report(file, report_date)
+                # 执行摘要降级为安全网时不缓存，AI 恢复后相同文件可以重新生成
+                if used_fallback:
+                    logger.info("执行摘要使用了安全网，本次报告不写入缓存")
+                else:
+                    report_cache.put(cache_key, report_content, meta=report_data)
+                # 报告放入报告存储，每份报告有独立的 ID 和下载令牌
+                report_id, token = report_store.put(report_content, REPORT_FILENAME)
             
-            # 生成报告文件路径
-            report_filename = "carbon_report_v1.docx"
-            report_filepath = os.path.join(app.config['UPLOAD_FOLDER'], report_filename)
-            
-            # 写入报告数据
-            writer.write_report(report_data, report_filepath)
-            
-            # 保存报告路径到session，以便下载时使用
-            app.config['LAST_REPORT_PATH'] = report_filepath
-            app.config['LAST_REPORT_FILENAME'] = report_filename
+            # 令牌只记在当前用户的 session 中，其他用户无法下载
+            session['last_report'] = {'id': report_id, 'token': token}
+            download_url = url_for('download_stored_report', report_id=report_id, token=token)
             
             # 返回结果页面，包含下载链接
-            return render_template('result.html', data=report_data, show_download=True)
+            return render_template('result.html', data=report_data, show_download=True,
+                                   download_url=download_url)
             
         except Exception as e:
             error_msg = f"处理文件时出错: {str(e)}"
-            print(error_msg)  # 在控制台记录详细错误
+            logger.error("%s", error_msg)  # 在控制台记录详细错误
             flash(error_msg)
             return redirect('/')
-        finally:
-            # 清理上传的Excel文件，但保留生成的报告文件
-            if os.path.exists(filepath):
-                os.remove(filepath)
     
     flash('不支持的文件类型，请上传.xlsx格式的Excel文件')
     return redirect('/')
 
+def _build_report(file, report_date):
+    """提取数据、生成执行摘要并把报告渲染到内存，返回 (报告内容, 报告数据, 执行摘要是否使用了安全网)"""
+    # 直接从上传流读取数据，上传文件不再写入 uploads/
+    with open_upload(file) as reader:
+        report_data = reader.extract_all_data()
+    report_data['report_date'] = report_date
+    
+    # 使用AI服务生成执行摘要
+    used_fallback = True
+    try:
+        executive_summary, used_fallback = ai_service.generate_executive_summary(report_data, with_status=True)
+        report_data['executive_summary'] = executive_summary
+        logger.debug("执行摘要已添加到报告数据中")
+    except Exception as e:
+        logger.error("添加执行摘要时出错: %s", e)
+        # 即使AI摘要失败，程序也继续运行
+    
+    # 使用WordReportWriter生成报告
+    writer = WordReportWriter(
+        template_path=TEMPLATE_PATH,
+        cover_image_path=COVER_IMAGE_PATH
+    )
+    
+    buffer = io.BytesIO()
+    if not writer.write_report(report_data, buffer):
+        raise RuntimeError("报告保存失败")
+    return buffer.getvalue(), report_data, used_fallback
+
 @app.route('/download_report')
 def download_report():
-    """下载生成的报告文件"""
-    report_path = app.config.get('LAST_REPORT_PATH')
-    report_filename = app.config.get('LAST_REPORT_FILENAME')
-    
-    if report_path and os.path.exists(report_path):
-        try:
-            # 发送文件给用户下载
-            return send_file(
-                report_path,
-                as_attachment=True,
-                download_name=report_filename,
-                mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            )
-        except Exception as e:
-            print(f"下载文件时出错: {str(e)}")
-            flash('下载报告时出错')
-            return redirect('/')
-    else:
+    """下载当前用户最近生成的报告"""
+    last_report = session.get('last_report')
+    if not last_report:
         flash('没有找到可下载的报告文件')
         return redirect('/')
+    return download_stored_report(last_report['id'], last_report['token'])
+
+@app.route('/download_report/<report_id>')
+def download_stored_report(report_id, token=None):
+    """凭报告 ID 和下载令牌下载报告文件"""
+    stored = report_store.get(report_id, token or request.args.get('token'))
+    if stored is None:
+        flash('报告不存在、已过期或下载链接无效')
+        return redirect('/')
     
-    return "不支持的文件类型"
+    report_path, report_filename = stored
+    try:
+        # 发送文件给用户下载
+        return send_file(
+            report_path,
+            as_attachment=True,
+            download_name=report_filename,
+            mimetype=DOCX_MIMETYPE
+        )
+    except Exception as e:
+        logger.error("下载文件时出错: %s", e)
+        flash('下载报告时出错')
+        return redirect('/')
 
 # 设置Flask密钥用于session和flash消息
 app.secret_key = os.getenv('SECRET_KEY', 'dev_key_change_in_production')
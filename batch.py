@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量处理入口：一次处理一个目录下的多个盘查工作簿。
+
+用法：
+    python batch.py summaries <工作簿目录> [--output summaries.json]
+    python batch.py reports <工作簿目录或清单文件> [--output-dir reports] [--workers 4]
+    python batch.py consolidated <工作簿目录或清单文件> [--output 合并报告.docx] [--year 2024]
+"""
+
+import argparse
+import glob
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from docxtpl import DocxTemplate
+
+from data_reader import ExcelDataReader
+from ai_service import AIService
+from emissions_cube import EmissionsCube
+from report_writer import WordReportWriter
+import metrics
+from logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def find_workbooks(input_dir, patterns=('*.xlsx',)):
+    """按文件名排序返回目录下的所有工作簿路径（忽略 Excel 临时文件 ~$xxx.xlsx）。"""
+    paths = []
+    for pattern in patterns:
+        paths.extend(glob.glob(os.path.join(input_dir, pattern)))
+    return sorted(p for p in paths if not os.path.basename(p).startswith('~$'))
+
+
+def run_summaries(input_dir, output_path, max_workers=4, requests_per_second=None, backend=None):
+    """
+    读取目录下的所有工作簿，批量生成执行摘要并写入 JSON 文件。
+    backend 为摘要后端名称，批量任务可使用 "local" 完全离线生成。
+
+    Returns:
+        {文件名: 摘要} 字典
+    """
+    workbooks = find_workbooks(input_dir)
+    if not workbooks:
+        print(f"错误：目录 {input_dir} 中没有找到工作簿")
+        return {}
+
+    data_list = []
+    for path in workbooks:
+        reader = ExcelDataReader(path)
+        # 每个工作簿只使用自身的数据，不读取当前目录下的CSV
+        data_list.append(reader.extract_data(csv_path=None))
+
+    ai_service = AIService()
+    summaries = ai_service.generate_executive_summaries(
+        data_list,
+        max_workers=max_workers,
+        requests_per_second=requests_per_second,
+        backend=backend,
+    )
+
+    results = {os.path.basename(path): summary for path, summary in zip(workbooks, summaries)}
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"已为 {len(results)} 个工作簿生成执行摘要: {output_path}")
+    return results
+
+
+def load_inputs(source):
+    """
+    解析批量任务的输入：目录（其中的 .xlsx/.csv）或清单文件。
+    清单可以是 JSON 数组，也可以是每行一个路径的文本文件；相对路径相对清单所在目录。
+    """
+    if os.path.isdir(source):
+        return find_workbooks(source, patterns=('*.xlsx', '*.csv'))
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        if source.endswith('.json'):
+            entries = json.load(f)
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [entry if os.path.isabs(entry) else os.path.join(base_dir, entry) for entry in entries]
+
+
+# 每个工作进程只初始化一次的状态：模板内容和 AI 服务
+_worker_state = {}
+
+
+def _init_report_worker(template_path, backend):
+    configure_logging()
+    with open(template_path, 'rb') as f:
+        _worker_state['template_bytes'] = f.read()
+    _worker_state['ai_service'] = AIService()
+    _worker_state['backend'] = backend
+
+
+def _render_one(input_path, output_path):
+    """
+    在工作进程中生成单份报告，返回包含状态和各阶段耗时（秒）的结果字典。
+    出错时不抛出异常，而是记录错误信息，保证批量任务继续执行。
+
+    耗时来自 metrics.span：除 extract、summary 这类粗粒度阶段外，还包括
+    workbook_load、label_extraction、csv_parse、ai_call、validation 等细分阶段，
+    细分阶段嵌套在粗粒度阶段之内，因此总耗时单独计时而不是求和。
+    """
+    result = {'input': input_path, 'output': output_path, 'status': 'ok'}
+    stage = 'load'
+    start = time.perf_counter()
+
+    with metrics.request_timings() as timings:
+        try:
+            reader = ExcelDataReader(input_path)
+            if reader.file_type == 'excel' and not reader.workbook:
+                raise ValueError(f"无法加载工作簿: {input_path}")
+
+            stage = 'extract'
+            with metrics.span(stage):
+                # 每份输入只使用自身的数据，不读取当前目录下的CSV
+                context = reader.extract_data(csv_path=None)
+
+            stage = 'summary'
+            with metrics.span(stage):
+                ai_service = _worker_state['ai_service']
+                context['executive_summary'] = ai_service.generate_executive_summary(
+                    context, backend=_worker_state['backend'])
+
+            stage = 'render'
+            with metrics.span(stage):
+                template = DocxTemplate(io.BytesIO(_worker_state['template_bytes']))
+                template.render(context)
+
+            stage = 'save'
+            with metrics.span(stage):
+                template.save(output_path)
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = f"{stage}: {e}"
+            logger.error("生成报告失败 %s: %s", input_path, e)
+
+    result['timings'] = {name: round(seconds, 6) for name, seconds in timings.items()}
+    result['total_seconds'] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def output_names(inputs):
+    """
+    每个输入对应的报告文件名：<文件名>.docx。
+
+    不同目录下的同名文件、同名不同扩展名的文件（a.xlsx 和 a.csv）会重名，重名时追加序号，
+    序号递增直到与已用的名称都不冲突（不区分大小写，兼容 Windows 文件系统）。
+    """
+    used = set()
+    names = []
+    for input_path in inputs:
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        name, number = f"{stem}.docx", 1
+        while name.lower() in used:
+            number += 1
+            name = f"{stem}_{number}.docx"
+        used.add(name.lower())
+        names.append(name)
+    return names
+
+
+def run_reports(source, output_dir, template_path='template.docx', max_workers=4, backend=None,
+                summary_path=None):
+    """
+    为目录或清单中的每个输入渲染一份报告。
+
+    使用进程池并行处理，每个工作进程只加载一次模板、只创建一个 AI 客户端；
+    单个文件出错不影响其他文件。最后写出包含各阶段耗时的 JSON 汇总。
+
+    Returns:
+        汇总字典
+    """
+    inputs = load_inputs(source)
+    if not inputs:
+        print(f"错误：{source} 中没有找到输入文件")
+        return {}
+
+    os.makedirs(output_dir, exist_ok=True)
+    summary_path = summary_path or os.path.join(output_dir, 'batch_summary.json')
+
+    jobs = [(input_path, os.path.join(output_dir, output_name))
+            for input_path, output_name in zip(inputs, output_names(inputs))]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, max_workers), initializer=_init_report_worker,
+                             initargs=(template_path, backend)) as executor:
+        results = list(executor.map(_render_one, *zip(*jobs)))
+    elapsed = time.perf_counter() - start
+
+    stage_totals = {}
+    for result in results:
+        for stage, seconds in result['timings'].items():
+            stage_totals[stage] = round(stage_totals.get(stage, 0.0) + seconds, 6)
+
+    summary = {
+        'total': len(results),
+        'succeeded': sum(1 for r in results if r['status'] == 'ok'),
+        'failed': sum(1 for r in results if r['status'] != 'ok'),
+        'wall_seconds': round(elapsed, 6),
+        'stage_seconds': stage_totals,
+        'reports': results,
+    }
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    print(f"批量生成完成: 成功 {summary['succeeded']} 份，失败 {summary['failed']} 份，"
+          f"耗时 {elapsed:.1f} 秒，汇总见 {summary_path}")
+    return summary
+
+
+def _extract_one(input_path):
+    """在工作进程中提取单份盘查，设施名称缺失时使用文件名；出错时返回 None"""
+    try:
+        data = ExcelDataReader(input_path).extract_data(csv_path=None)
+    except Exception as e:
+        logger.error("提取失败 %s: %s", input_path, e)
+        return None
+    data['facility'] = data.get('company_name') or os.path.splitext(os.path.basename(input_path))[0]
+    return data
+
+
+def run_consolidated(source, output_path, template_path='template.docx', year=None, company_name='集团合并',
+                     max_workers=4, stream=False):
+    """
+    把目录或清单中的多份盘查（多个设施、多个年度）合并为一份报告。
+
+    各输入在进程池中并行提取，装入 emissions_cube.EmissionsCube 后按年度汇总，
+    合并上下文直接交给 DocxTemplate 渲染；stream 为 True 时改用 WordReportWriter 的流式组装模式
+    （每个设施一个章节，内存不随设施数增长，不使用模板）。
+
+    Returns:
+        渲染用的上下文；没有可用的输入时返回 None
+    """
+    inputs = load_inputs(source)
+    with ProcessPoolExecutor(max_workers=max(1, max_workers), initializer=configure_logging) as executor:
+        inventories = [data for data in executor.map(_extract_one, inputs) if data is not None]
+    cube = EmissionsCube.from_inventories(inventories, facility_key='facility')
+    if not cube.years:
+        print(f"错误：{source} 中没有可合并的盘查（需要设施名称和报告年度）")
+        return None
+
+    with metrics.span('consolidate'):
+        context = cube.consolidated_context(year, company_name=company_name)
+    if stream:
+        if not WordReportWriter().write_consolidated_report(context, output_path):
+            print(f"错误：合并报告写出失败: {output_path}")
+            return None
+    else:
+        with metrics.span('render'):
+            template = DocxTemplate(template_path)
+            template.render(context)
+        with metrics.span('save'):
+            template.save(output_path)
+    print(f"合并报告已生成: {output_path}（{context['facility_count']} 个设施，{context['report_year']} 年）")
+    return context
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="碳盘查报告批量处理工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    summaries = subparsers.add_parser('summaries', help="为目录下的所有工作簿批量生成执行摘要")
+    summaries.add_argument('input_dir', help="工作簿所在目录")
+    summaries.add_argument('--output', default='summaries.json', help="输出的 JSON 文件路径")
+    summaries.add_argument('--workers', type=int, default=4, help="AI 调用的最大并发数")
+    summaries.add_argument('--rps', type=float, default=None, help="每秒最多发起的 AI 请求数")
+    summaries.add_argument('--backend', choices=['openai', 'local'], default=None,
+                           help="摘要后端，默认读取环境变量 SUMMARY_BACKEND")
+
+    reports = subparsers.add_parser('reports', help="为目录或清单中的每个输入生成一份报告")
+    reports.add_argument('source', help="输入目录（.xlsx/.csv），或清单文件（JSON 数组或每行一个路径）")
+    reports.add_argument('--output-dir', default='reports', help="报告输出目录")
+    reports.add_argument('--template', default='template.docx', help="Word 模板路径")
+    reports.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="工作进程数")
+    reports.add_argument('--backend', choices=['openai', 'local'], default=None,
+                         help="摘要后端，默认读取环境变量 SUMMARY_BACKEND")
+    reports.add_argument('--summary', default=None, help="JSON 汇总路径，默认写入输出目录")
+
+    consolidated = subparsers.add_parser('consolidated', help="把多个设施、多个年度的盘查合并为一份报告")
+    consolidated.add_argument('source', help="输入目录（.xlsx/.csv），或清单文件（JSON 数组或每行一个路径）")
+    consolidated.add_argument('--output', default='合并报告.docx', help="报告输出路径")
+    consolidated.add_argument('--template', default='template.docx', help="Word 模板路径")
+    consolidated.add_argument('--year', type=int, default=None, help="报告年度，默认为最新年度")
+    consolidated.add_argument('--company-name', default='集团合并', help="合并报告的主体名称")
+    consolidated.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="提取的工作进程数")
+    consolidated.add_argument('--stream', action='store_true',
+                              help="不使用模板，按设施章节流式写出报告（设施很多时内存占用不随之增长）")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging()
+
+    if args.command == 'summaries':
+        run_summaries(args.input_dir, args.output, max_workers=args.workers,
+                      requests_per_second=args.rps, backend=args.backend)
+    elif args.command == 'reports':
+        summary = run_reports(args.source, args.output_dir, template_path=args.template,
+                              max_workers=args.workers, backend=args.backend,
+                              summary_path=args.summary)
+        return 0 if summary and not summary['failed'] else 1
+    elif args.command == 'consolidated':
+        context = run_consolidated(args.source, args.output, template_path=args.template, year=args.year,
+                                   company_name=args.company_name, max_workers=args.workers, stream=args.stream)
+        return 0 if context else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI 响应校验器微基准：对比旧的逐项扫描实现与预编译单次扫描的 ResponseValidator。
+
+用法：
+    python benchmarks/bench_validator.py [--numbers 2000] [--repeat 5]
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_validator import ResponseValidator  # noqa: E402
+
+DATA = {
+    'company_name': '测试企业',
+    'report_year': '2024',
+    'total_emission_location': '15,524,035.33',
+    'scope_1': '7,122,248.83',
+    'scope_2_location': '1,069,378.75',
+    'scope_3': '7,332,407.75',
+}
+
+
+def legacy_validate(content, original_data):
+    """旧版 _validate_ai_response 的校验逻辑（去掉打印），作为对照。"""
+    original_numbers = []
+    for field in ['total_emission_location', 'scope_1', 'scope_2_location', 'scope_3']:
+        value = original_data.get(field)
+        if value:
+            original_numbers.extend(re.findall(r'\d+\.?\d*', str(value)))
+
+    for ai_num in re.findall(r'\d+\.?\d*', content):
+        ai_num = ai_num.lstrip('0') if ai_num != '0' else ai_num
+        found = False
+        for orig_num in original_numbers:
+            orig_num = orig_num.lstrip('0') if orig_num != '0' else orig_num
+            if abs(float(ai_num) - float(orig_num)) < 0.01:
+                found = True
+                break
+        if not found:
+            if 1900 <= float(ai_num) <= 2100:
+                continue
+            if 0 <= float(ai_num) <= 100:
+                index = content.find(ai_num)
+                context = content[max(0, index - 5):min(len(content), index + len(ai_num) + 5)]
+                if '%' in context or '占比' in context or '比例' in context:
+                    continue
+            if len(ai_num) <= 2 and float(ai_num) < 50:
+                continue
+            return False
+
+    for pattern in ['##', '**', '```', '*', '-', '1.', '2.']:
+        if pattern in content:
+            return False
+    for keyword in ['预计', '预测', '可能', '大约', '大概', '估计', '推测']:
+        if keyword in content:
+            return False
+    return True
+
+
+def build_response(numbers):
+    """构造一段合法的长响应（校验需完整扫描到末尾，是最坏情况）。"""
+    sentences = []
+    values = ['7,122,248.83', '1,069,378.75', '7,332,407.75', '15,524,035.33']
+    for i in range(numbers):
+        sentences.append(f"测试企业在2024年的排放量为{values[i % len(values)]}tCO2e，占比45.9%。")
+    return ''.join(sentences)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI 响应校验器微基准")
+    parser.add_argument('--numbers', type=int, default=2000, help="响应中包含的句子数")
+    parser.add_argument('--repeat', type=int, default=5, help="重复次数")
+    args = parser.parse_args()
+
+    content = build_response(args.numbers)
+    assert legacy_validate(content, DATA) == ResponseValidator(DATA).validate(content)[0]
+
+    legacy = min(timeit.repeat(lambda: legacy_validate(content, DATA), number=1, repeat=args.repeat))
+    validator = ResponseValidator(DATA)
+    compiled = min(timeit.repeat(lambda: validator.validate(content), number=1, repeat=args.repeat))
+
+    print(f"响应长度: {len(content)} 字符")
+    print(f"旧实现:            {legacy * 1000:.2f} ms")
+    print(f"ResponseValidator: {compiled * 1000:.2f} ms")
+    print(f"加速比:            {legacy / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# benchmarks/harness.py
+"""
+基准测试的计时与结果管理。
+
+每个用例由 setup（不计时，只执行一次）和被测函数组成；被测函数重复执行多轮，
+记录每轮耗时的统计量。结果连同提交号、Python 版本等元数据写入 JSON，
+两份结果可用 compare() 对比，找出回归的用例。
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+
+class BenchmarkCase:
+    def __init__(self, name, func, setup=None, rounds=None, max_seconds=None, warmup=None):
+        """
+        Args:
+            name: 用例名称，结果 JSON 中的键
+            func: 被测函数，接收 setup 的返回值作为唯一参数（setup 为 None 时不传参）
+            setup: 准备函数，不计入耗时
+            rounds: 该用例的最大轮数，覆盖全局设置（适合很慢的用例）
+            max_seconds: 累计耗时超过该值后不再继续下一轮（至少执行一轮）
+            warmup: 预热轮数，覆盖全局设置（很慢的用例可设为 0）
+        """
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.rounds = rounds
+        self.max_seconds = max_seconds
+        self.warmup = warmup
+
+
+def run_case(case, rounds=5, warmup=1, max_seconds=60.0):
+    """执行单个用例，返回耗时统计（秒）。"""
+    if case.setup is not None:
+        state = case.setup()
+        call = lambda: case.func(state)  # noqa: E731
+    else:
+        call = case.func
+
+    warmup = case.warmup if case.warmup is not None else warmup
+    for _ in range(warmup):
+        call()
+
+    rounds = min(rounds, case.rounds) if case.rounds else rounds
+    max_seconds = case.max_seconds if case.max_seconds is not None else max_seconds
+    samples = []
+    elapsed_total = 0.0
+    while len(samples) < rounds:
+        start = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        elapsed_total += elapsed
+        if elapsed_total >= max_seconds:
+            break
+
+    return {
+        'rounds': len(samples),
+        'min': min(samples),
+        'max': max(samples),
+        'mean': statistics.fmean(samples),
+        'median': statistics.median(samples),
+        'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def collect_metadata():
+    """记录运行环境，便于解释不同提交之间的差异。"""
+    commit = None
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run(cases, rounds=5, warmup=1, max_seconds=60.0, name_filter=None, progress=print):
+    """
+    执行一组用例。name_filter 为子串，只运行名称包含它的用例。
+
+    Returns:
+        {'metadata': {...}, 'benchmarks': {用例名: 统计}}
+    """
+    results = {}
+    for case in cases:
+        if name_filter and name_filter not in case.name:
+            continue
+        stats = run_case(case, rounds=rounds, warmup=warmup, max_seconds=max_seconds)
+        results[case.name] = stats
+        if progress:
+            progress(f"{case.name:<45} 中位数 {stats['median'] * 1000:10.2f} ms  ({stats['rounds']} 轮)")
+    return {'metadata': collect_metadata(), 'benchmarks': results}
+
+
+def save_results(results, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    按中位数对比两份结果。
+
+    Returns:
+        [(用例名, 基线中位数, 当前中位数, 比值, 结论)]，结论为
+        'regression'、'improvement'、'unchanged'、'added' 或 'removed'
+    """
+    base = baseline['benchmarks']
+    new = current['benchmarks']
+    rows = []
+    for name in sorted(set(base) | set(new)):
+        if name not in base:
+            rows.append((name, None, new[name]['median'], None, 'added'))
+            continue
+        if name not in new:
+            rows.append((name, base[name]['median'], None, None, 'removed'))
+            continue
+        ratio = new[name]['median'] / base[name]['median'] if base[name]['median'] else float('inf')
+        if ratio > 1 + threshold:
+            verdict = 'regression'
+        elif ratio < 1 - threshold:
+            verdict = 'improvement'
+        else:
+            verdict = 'unchanged'
+        rows.append((name, base[name]['median'], new[name]['median'], ratio, verdict))
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'用例':<45} {'基线(ms)':>12} {'当前(ms)':>12} {'比值':>8}  结论"]
+    for name, base, new, ratio, verdict in rows:
+        base_text = f"{base * 1000:.2f}" if base is not None else '-'
+        new_text = f"{new * 1000:.2f}" if new is not None else '-'
+        ratio_text = f"{ratio:.2f}x" if ratio is not None else '-'
+        lines.append(f"{name:<45} {base_text:>12} {new_text:>12} {ratio_text:>8}  {verdict}")
+    return '\n'.join(lines)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Web 应用压力测试：启动应用和本地 OpenAI 替身，并发上传工作簿，统计吞吐量、
+延迟分位数、错误数和每个工作进程的内存占用。
+
+用法：
+    python benchmarks/loadtest.py --app web_api --workers 2 --concurrency 8 --requests 200
+    python benchmarks/loadtest.py --app app --server gunicorn --workers 4 --ai-latency 1.0 --ai-error-rate 0.1
+    python benchmarks/loadtest.py --url http://127.0.0.1:5071 --requests 50   # 压测已在运行的服务
+
+--server flask 为每个工作进程启动一个多线程的 Flask 开发服务器（各占一个端口，客户端轮询），
+--server gunicorn 使用 gunicorn 的多进程模型（需要另行安装 gunicorn）。
+"""
+
+import argparse
+import itertools
+import json
+import mimetypes
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_openai import FakeOpenAIServer  # noqa: E402
+
+# 各应用的上传接口和文件字段名
+ENDPOINTS = {
+    'web_api': ('/api/generate', 'excel_file'),
+    'app': ('/generate_report', 'file'),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, p):
+    """最近秩法求分位数，values 为空时返回 None。"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def build_multipart(fields, file_field, filename, content):
+    """构造 multipart/form-data 请求体，返回 (body, content_type)。"""
+    boundary = uuid.uuid4().hex
+    lines = []
+    for name, value in fields.items():
+        lines.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    mime = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    lines.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{filename}"\r\nContent-Type: {mime}\r\n\r\n'.encode('utf-8'))
+    lines.append(content)
+    lines.append(f'\r\n--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(lines), f'multipart/form-data; boundary={boundary}'
+
+
+def read_rss_kb(pid):
+    """读取进程常驻内存（KB），非 Linux 或进程已退出时返回 None。"""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def child_pids(pid):
+    """gunicorn 的工作进程是主进程的子进程。"""
+    pids = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children', 'r') as f:
+                pids.extend(int(p) for p in f.read().split())
+    except OSError:
+        pass
+    return pids
+
+
+class MemorySampler:
+    """后台线程定期采样各工作进程的 RSS，记录峰值。"""
+
+    def __init__(self, pid_source, interval=0.2):
+        self.pid_source = pid_source
+        self.interval = interval
+        self.peak_kb = {}
+        self.last_kb = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            for pid in self.pid_source():
+                rss = read_rss_kb(pid)
+                if rss is not None:
+                    self.last_kb[pid] = rss
+                    self.peak_kb[pid] = max(rss, self.peak_kb.get(pid, 0))
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class AppServers:
+    """启动被测应用的若干工作进程，并在结束时清理。"""
+
+    def __init__(self, app, workers, server, env):
+        self.app = app
+        self.workers = workers
+        self.server = server
+        self.env = env
+        self.processes = []
+        self.urls = []
+
+    def start(self):
+        if self.server == 'gunicorn':
+            port = free_port()
+            command = [sys.executable, '-m', 'gunicorn', '-w', str(self.workers), '--threads', '4',
+                       '-b', f'127.0.0.1:{port}', f'{self.app}:app']
+            self.processes.append(subprocess.Popen(command, cwd=ROOT, env=self.env))
+            self.urls.append(f'http://127.0.0.1:{port}')
+        else:
+            for _ in range(self.workers):
+                port = free_port()
+                code = f"from {self.app} import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+                self.processes.append(subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=self.env,
+                                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+                self.urls.append(f'http://127.0.0.1:{port}')
+        for url in self.urls:
+            wait_until_ready(url)
+        return self
+
+    def worker_pids(self):
+        if self.server == 'gunicorn':
+            return [pid for process in self.processes for pid in child_pids(process.pid)]
+        return [process.pid for process in self.processes]
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def wait_until_ready(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + '/', timeout=2).close()
+            return
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"应用在 {timeout:.0f} 秒内没有启动: {url}")
+
+
+def send_upload(url, body, content_type, timeout):
+    """发送一次上传请求，返回 (状态码或异常名, 耗时, 响应字节数)。"""
+    request = urllib.request.Request(url, data=body, method='POST', headers={'Content-Type': content_type})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            size = len(response.read())
+            status = response.status
+    except urllib.error.HTTPError as e:
+        size = len(e.read())
+        status = e.code
+    except OSError as e:
+        return type(e).__name__, time.perf_counter() - start, 0
+    return status, time.perf_counter() - start, size
+
+
+def run_load(urls, endpoint, file_field, input_path, total_requests, concurrency, timeout=120.0,
+             form_fields=None):
+    """对 urls 轮询发起 total_requests 次上传，最多 concurrency 个并发。"""
+    with open(input_path, 'rb') as f:
+        content = f.read()
+    body, content_type = build_multipart(form_fields or {}, file_field, os.path.basename(input_path), content)
+
+    targets = itertools.cycle(urls)
+    target_lock = threading.Lock()
+
+    def one(_):
+        with target_lock:
+            url = next(targets)
+        return send_upload(url + endpoint, body, content_type, timeout)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(total_requests)))
+    return results, time.perf_counter() - start
+
+
+def summarize(results, wall_seconds, memory=None, fake_stats=None):
+    latencies = [latency for status, latency, _ in results if status == 200]
+    errors = {}
+    for status, _, _ in results:
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+
+    report = {
+        'requests': len(results),
+        'succeeded': len(latencies),
+        'errors': errors,
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_rps': round(len(latencies) / wall_seconds, 3) if wall_seconds else None,
+        'latency_seconds': {
+            f'p{p}': round(percentile(latencies, p), 4) if latencies else None for p in (50, 90, 95, 99)
+        },
+        'bytes_received': sum(size for _, _, size in results),
+    }
+    report['latency_seconds']['max'] = round(max(latencies), 4) if latencies else None
+    if memory is not None:
+        report['worker_rss_mb'] = {
+            str(pid): {'peak': round(memory.peak_kb[pid] / 1024, 1), 'last': round(memory.last_kb[pid] / 1024, 1)}
+            for pid in sorted(memory.peak_kb)
+        }
+    if fake_stats is not None:
+        report['fake_openai'] = dict(fake_stats)
+    return report
+
+
+def print_report(report):
+    print(f"请求数: {report['requests']}，成功: {report['succeeded']}，错误: {report['errors'] or '无'}")
+    print(f"总耗时: {report['wall_seconds']} 秒，吞吐量: {report['throughput_rps']} 请求/秒")
+    latency = report['latency_seconds']
+    print("延迟(秒): " + '，'.join(f"{k}={v}" for k, v in latency.items()))
+    for pid, rss in report.get('worker_rss_mb', {}).items():
+        print(f"工作进程 {pid}: 峰值 {rss['peak']} MB，结束时 {rss['last']} MB")
+    if 'fake_openai' in report:
+        print(f"OpenAI 替身: {report['fake_openai']}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Web 应用压力测试")
+    parser.add_argument('--app', choices=sorted(ENDPOINTS), default='web_api', help="被测应用模块")
+    parser.add_argument('--url', default=None, help="压测已在运行的服务，不再启动应用和 OpenAI 替身")
+    parser.add_argument('--server', choices=['flask', 'gunicorn'], default='flask', help="应用的进程模型")
+    parser.add_argument('--workers', type=int, default=2, help="工作进程数")
+    parser.add_argument('--concurrency', type=int, default=8, help="并发请求数")
+    parser.add_argument('--requests', type=int, default=100, help="请求总数")
+    parser.add_argument('--input', default=os.path.join(ROOT, 'test_data.xlsx'), help="上传的工作簿")
+    parser.add_argument('--timeout', type=float, default=120.0, help="单个请求的超时时间（秒）")
+    parser.add_argument('--summary-backend', default=None, help="web_api 的 summary_backend 表单字段")
+    parser.add_argument('--ai-latency', type=float, default=0.5, help="OpenAI 替身的基础延迟（秒）")
+    parser.add_argument('--ai-jitter', type=float, default=0.2, help="OpenAI 替身的随机附加延迟（秒）")
+    parser.add_argument('--ai-error-rate', type=float, default=0.0, help="OpenAI 替身返回错误的概率")
+    parser.add_argument('--ai-content', default=None, help="OpenAI 替身的回复内容")
+    parser.add_argument('--output', default=None, help="把统计结果写入 JSON 文件")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    endpoint, file_field = ENDPOINTS[args.app]
+    form_fields = {'company_name': '压测企业', 'report_year': '2024'} if args.app == 'web_api' else {}
+    if args.summary_backend:
+        form_fields['summary_backend'] = args.summary_backend
+
+    fake = servers = memory = None
+    try:
+        if args.url:
+            urls = [args.url.rstrip('/')]
+        else:
+            fake_kwargs = {'latency': args.ai_latency, 'jitter': args.ai_jitter, 'error_rate': args.ai_error_rate}
+            if args.ai_content:
+                fake_kwargs['content'] = args.ai_content
+            fake = FakeOpenAIServer(**fake_kwargs).start()
+
+            env = dict(os.environ, OPENAI_BASE_URL=fake.base_url, OPENAI_API_KEY='loadtest',
+                       LOG_LEVEL=os.getenv('LOG_LEVEL', 'WARNING'))
+            servers = AppServers(args.app, args.workers, args.server, env).start()
+            urls = servers.urls
+            memory = MemorySampler(servers.worker_pids).start()
+
+        print(f"开始压测: {len(urls)} 个地址，{args.requests} 个请求，并发 {args.concurrency}")
+        results, wall = run_load(urls, endpoint, file_field, args.input, args.requests, args.concurrency,
+                                 timeout=args.timeout, form_fields=form_fields)
+    finally:
+        if memory:
+            memory.stop()
+        if servers:
+            servers.stop()
+        if fake:
+            fake.stop()
+
+    report = summarize(results, wall, memory=memory, fake_stats=fake.stats if fake else None)
+    report['config'] = {k: v for k, v in vars(args).items() if k != 'output'}
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.output}")
+    return 0 if report['succeeded'] == report['requests'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报告流水线基准测试套件：数据读取、CSV 解析、Word 写入、模板渲染、AI 响应校验和端到端流水线。
+
+用法：
+    python benchmarks/suite.py run [--scales 1,10,100] [--output benchmarks/results/xxx.json]
+    python benchmarks/suite.py compare 基线.json 当前.json [--threshold 0.1]
+
+放大后的工作簿和 CSV 缓存在 benchmarks/.cache/ 下，只在源文件更新后重新生成。
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+import openpyxl  # noqa: E402
+from docxtpl import DocxTemplate  # noqa: E402
+
+import extraction_plan  # noqa: E402
+import harness  # noqa: E402
+import sheet_snapshot  # noqa: E402
+from ai_service import AIService, validate_ai_response  # noqa: E402
+from data_reader import ExcelDataReader  # noqa: E402
+from emissions_aggregation import COLUMNS, EmissionsMatrix  # noqa: E402
+from emissions_cube import EmissionsCube  # noqa: E402
+from parallel_extraction import read_sheets  # noqa: E402
+from report_writer import WordReportWriter  # noqa: E402
+from synthetic_data import generate_workbook  # noqa: E402
+from xlsx_stream import open_workbook  # noqa: E402
+
+SOURCE_XLSX = os.path.join(ROOT, 'test_data.xlsx')
+SOURCE_CSV = os.path.join(ROOT, '减排行动统计.csv')
+TEMPLATE = os.path.join(ROOT, 'template.docx')
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+
+def _is_fresh(path, source):
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source)
+
+
+def scaled_workbook(scale, cache_dir=CACHE_DIR):
+    """把 test_data.xlsx 每个工作表的行重复 scale 次，返回放大后的工作簿路径。"""
+    if scale == 1:
+        return SOURCE_XLSX
+    path = os.path.join(cache_dir, f'test_data_x{scale}.xlsx')
+    if _is_fresh(path, SOURCE_XLSX):
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    workbook = openpyxl.load_workbook(SOURCE_XLSX, data_only=True)
+    for sheet in workbook.worksheets:
+        rows = list(sheet.iter_rows(values_only=True))
+        for _ in range(scale - 1):
+            for row in rows:
+                sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def scaled_csv(rows, cache_dir=CACHE_DIR):
+    """把减排行动统计.csv 的数据部分重复到至少 rows 行，返回放大后的 CSV 路径。"""
+    path = os.path.join(cache_dir, f'减排行动统计_{rows}.csv')
+    if _is_fresh(path, SOURCE_CSV):
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(SOURCE_CSV, 'rb') as f:
+        header, body = f.read().split(b'\n', 1)
+    if not body.endswith(b'\n'):
+        body += b'\n'
+    copies = -(-rows // max(1, body.count(b'\n')))
+    with open(path, 'wb') as f:
+        f.write(header + b'\n')
+        f.write(body * copies)
+    return path
+
+
+def synthetic_workbook(activity_rows, cache_dir=CACHE_DIR):
+    """按活动数据行数生成（并缓存）合成工作簿，固定种子保证各次运行输入一致。"""
+    path = os.path.join(cache_dir, f'synthetic_{activity_rows}.xlsx')
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        generate_workbook(path, activity_rows=activity_rows, noise=0.1, seed=0)
+    return path
+
+
+def _open_workbook(path, backend):
+    if backend == 'snapshot':
+        return sheet_snapshot.open_workbook(path, sheet_snapshot.SnapshotStore(os.path.join(CACHE_DIR, 'snapshots')))
+    return open_workbook(path, backend, read_only=True)
+
+
+def _csv_context():
+    return ExcelDataReader(SOURCE_CSV).extract_data()
+
+
+def _stub_reply(data):
+    """只引用原始数据的固定回复，能通过防幻觉校验。"""
+    return (f"{data['company_name']}{data['report_year']}年度范围一排放{data['scope_1']}tCO2e，"
+            f"范围二（基于位置）排放{data['scope_2_location']}tCO2e，范围三排放{data['scope_3']}tCO2e。"
+            f"企业已识别主要排放源，并将基于此数据制定下一步减排计划。")
+
+
+class _StubCompletions:
+    """替代 OpenAI chat.completions 的桩，不发起网络请求。"""
+
+    def __init__(self, reply):
+        self.reply = reply
+
+    def create(self, **kwargs):
+        message = SimpleNamespace(content=self.reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def stub_ai_service(data):
+    ai_service = AIService()
+    ai_service.stream = False
+    ai_service.client = SimpleNamespace(chat=SimpleNamespace(completions=_StubCompletions(_stub_reply(data))))
+    return ai_service
+
+
+def build_cases(scales=(1, 10, 100), csv_rows=100000, synthetic_rows=()):
+    cases = []
+
+    # 放大后的输入文件在 setup 中生成，被 --filter 排除的用例不会触发生成
+    for scale in scales:
+        # 放大后的工作簿单轮就要数秒到数分钟，不做预热
+        warmup = 0 if scale > 1 else None
+        cases.append(harness.BenchmarkCase(
+            f'reader.load[x{scale}]',
+            lambda path: ExcelDataReader(path).workbook,
+            setup=lambda scale=scale: scaled_workbook(scale),
+            max_seconds=30,
+            warmup=warmup,
+        ))
+        cases.append(harness.BenchmarkCase(
+            f'reader.extract_data[x{scale}]',
+            lambda reader: reader.extract_data(csv_path=None),
+            setup=lambda scale=scale: ExcelDataReader(scaled_workbook(scale)),
+            max_seconds=30,
+            warmup=warmup,
+        ))
+        # 打开工作簿并按提取计划遍历（不用版式存储和工作表缓存）：openpyxl 只读模式、直接流式解析 XML
+        # 和映射已有的列式快照（快照在第一轮写入 benchmarks/.cache/snapshots）
+        for backend in ('openpyxl', 'stream', 'snapshot'):
+            cases.append(harness.BenchmarkCase(
+                f'reader.plan_extract[x{scale} backend={backend}]',
+                lambda path, backend=backend: extraction_plan.load_plan().extract(_open_workbook(path, backend)),
+                setup=lambda scale=scale: scaled_workbook(scale),
+                max_seconds=30,
+                warmup=warmup,
+            ))
+        # 全部工作表：单进程顺序读取与按 CPU 核数并行读取
+        for workers in (1, None):
+            cases.append(harness.BenchmarkCase(
+                f'reader.read_sheets[x{scale} workers={workers or "cpu"}]',
+                lambda path, workers=workers: read_sheets(path, max_workers=workers),
+                setup=lambda scale=scale: scaled_workbook(scale),
+                max_seconds=30,
+                warmup=warmup,
+            ))
+
+    for rows in synthetic_rows:
+        cases.append(harness.BenchmarkCase(
+            f'reader.extract_data[synthetic {rows} rows]',
+            lambda reader: reader.extract_data(csv_path=None),
+            setup=lambda rows=rows: ExcelDataReader(synthetic_workbook(rows)),
+            max_seconds=30,
+            warmup=0,
+        ))
+
+    cases.append(harness.BenchmarkCase(
+        f'csv.extract_data[{csv_rows} rows]',
+        lambda path: ExcelDataReader(path).extract_data(),
+        setup=lambda: scaled_csv(csv_rows),
+        max_seconds=30,
+    ))
+
+    def portfolio_setup(facilities=5000, years=5):
+        values = np.random.default_rng(0).uniform(0, 1000, (facilities, years, len(COLUMNS)))
+        # 约一半的类别和全部给定的总量缺失，由各范围求和
+        values[..., COLUMNS.index('total_location'):COLUMNS.index('total_market') + 1] = np.nan
+        values[..., COLUMNS.index('category_1'):][values[..., COLUMNS.index('category_1'):] < 500] = np.nan
+        return values, np.arange(facilities) % 50
+
+    def portfolio_rollup(state):
+        values, groups = state
+        matrix = EmissionsMatrix(values)
+        return matrix.rollup(groups)[1].shares, matrix.total().total_location
+
+    cases.append(harness.BenchmarkCase(
+        'aggregation.rollup[5000 facilities x 5 years]',
+        portfolio_rollup,
+        setup=portfolio_setup,
+    ))
+
+    def cube_setup(facilities=500, years=5):
+        rng = np.random.default_rng(1)
+        inventories = []
+        for facility in range(facilities):
+            for year in range(2020, 2020 + years):
+                data = {'company_name': f'设施{facility}', 'report_year': str(year), 'region': f'区域{facility % 20}'}
+                data.update(zip(('scope_1', 'scope_2_location', 'scope_2_market'), rng.uniform(0, 1e4, 3)))
+                data.update((f'scope_3_category_{n}_emissions', f'{v:,.2f}')
+                            for n, v in zip(range(1, 16), rng.uniform(0, 100, 15)))
+                inventories.append(data)
+        return inventories
+
+    # 从提取结果构建立方体并生成合并报告上下文（不含模板渲染）
+    cases.append(harness.BenchmarkCase(
+        'aggregation.consolidate[500 facilities x 5 years]',
+        lambda inventories: EmissionsCube.from_inventories(inventories, attributes=('region',))
+        .consolidated_context(group_by='region'),
+        setup=cube_setup,
+    ))
+
+    def writer_setup():
+        data = _csv_context()
+        data['executive_summary'] = _stub_reply(data)
+        return data, os.path.join(tempfile.mkdtemp(), 'report.docx')
+
+    cases.append(harness.BenchmarkCase(
+        'writer.write_report',
+        lambda state: WordReportWriter().write_report(*state),
+        setup=writer_setup,
+    ))
+
+    def consolidated_setup(facilities=500):
+        context = EmissionsCube.from_inventories(cube_setup(facilities, years=2), attributes=('region',)) \
+            .consolidated_context(group_by='region')
+        return context, os.path.join(tempfile.mkdtemp(), 'consolidated.docx')
+
+    # 流式组装合并报告：每个设施一个章节，document.xml 逐章节写入输出
+    cases.append(harness.BenchmarkCase(
+        'writer.write_consolidated_report[500 facilities]',
+        lambda state: WordReportWriter().write_consolidated_report(*state),
+        setup=consolidated_setup,
+        warmup=0,
+    ))
+
+    def render_setup():
+        with open(TEMPLATE, 'rb') as f:
+            template_bytes = f.read()
+        context = _csv_context()
+        context['executive_summary'] = _stub_reply(context)
+        return template_bytes, context
+
+    cases.append(harness.BenchmarkCase(
+        'docxtpl.render[template.docx]',
+        lambda state: DocxTemplate(io.BytesIO(state[0])).render(state[1]),
+        setup=render_setup,
+        warmup=0,
+    ))
+
+    def validate_setup():
+        data = _csv_context()
+        return _stub_reply(data), data
+
+    cases.append(harness.BenchmarkCase(
+        'validator.validate_ai_response',
+        lambda state: validate_ai_response(*state),
+        setup=validate_setup,
+    ))
+
+    def pipeline_setup():
+        with open(TEMPLATE, 'rb') as f:
+            template_bytes = f.read()
+        return template_bytes, stub_ai_service(_csv_context())
+
+    def pipeline(state):
+        template_bytes, ai_service = state
+        context = ExcelDataReader(SOURCE_CSV).extract_data()
+        context['executive_summary'] = ai_service.generate_executive_summary(context, backend='openai')
+        template = DocxTemplate(io.BytesIO(template_bytes))
+        template.render(context)
+        template.save(io.BytesIO())
+
+    cases.append(harness.BenchmarkCase('pipeline.end_to_end[stub-ai]', pipeline, setup=pipeline_setup, warmup=0))
+    return cases
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="报告流水线基准测试")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help="运行基准测试并写出 JSON 结果")
+    run.add_argument('--scales', default='1,10,100', help="工作簿放大倍数，逗号分隔")
+    run.add_argument('--csv-rows', type=int, default=100000, help="放大后 CSV 的行数")
+    run.add_argument('--synthetic-rows', default='', help="合成工作簿的活动数据行数，逗号分隔，如 1000,10000")
+    run.add_argument('--rounds', type=int, default=5, help="每个用例的最大轮数")
+    run.add_argument('--max-seconds', type=float, default=60.0, help="单个用例的累计耗时上限")
+    run.add_argument('--filter', default=None, help="只运行名称包含该子串的用例")
+    run.add_argument('--output', default=None, help="结果 JSON 路径，默认 benchmarks/results/<提交号>.json")
+
+    compare = subparsers.add_parser('compare', help="对比两份结果 JSON")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.10, help="中位数变化超过该比例视为回归")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'compare':
+        rows = harness.compare(harness.load_results(args.baseline), harness.load_results(args.current),
+                               threshold=args.threshold)
+        print(harness.format_comparison(rows))
+        return 1 if any(row[4] == 'regression' for row in rows) else 0
+
+    # 基准测试只关心耗时，屏蔽各模块的日志输出
+    logging.disable(logging.CRITICAL)
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    synthetic_rows = [int(s) for s in args.synthetic_rows.split(',') if s.strip()]
+    results = harness.run(build_cases(scales, args.csv_rows, synthetic_rows), rounds=args.rounds,
+                          max_seconds=args.max_seconds, name_filter=args.filter)
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results',
+        f"{results['metadata']['commit'] or 'local'}.json")
+    harness.save_results(results, output)
+    print(f"结果已写入: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# circuit_breaker.py
+"""
+AI 后端熔断器。
+
+在 OpenAI 兼容接口不可用或严重变慢时，避免每个请求都白白等待完整超时：
+- 统计最近一段窗口内的失败率和成功请求的耗时分位数；
+- 失败率超过阈值后"熔断"（open），直接让调用方走安全网；
+- 熔断一段时间后进入"半开"（half_open），只放行少量探测请求，探测成功则恢复；
+- 超时时间随观测到的 p95 耗时自适应收缩，但不超过配置的上限；
+  熔断时清空耗时样本，半开探测使用上限，后端整体变慢时也能重新学习耗时并恢复。
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window_size=20, failure_threshold=0.5, min_requests=5,
+                 open_seconds=30.0, half_open_probes=1, max_timeout=20.0,
+                 min_timeout=2.0, timeout_multiplier=1.5, clock=time.monotonic):
+        """
+        Args:
+            window_size: 统计失败率和耗时的滑动窗口大小（请求数）
+            failure_threshold: 触发熔断的失败率（0-1）
+            min_requests: 窗口内至少有这么多请求才判断失败率、计算自适应超时
+            open_seconds: 熔断后多久进入半开状态
+            half_open_probes: 半开状态下同时允许的探测请求数
+            max_timeout: 超时时间上限（秒），也是没有足够样本时的超时时间
+            min_timeout: 自适应超时的下限（秒）
+            timeout_multiplier: 自适应超时 = p95 耗时 × 该系数
+            clock: 时间函数，便于测试替换
+        """
+        self.window_size = window_size
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window_size)   # True 表示成功
+        self._latencies = deque(maxlen=window_size)  # 仅记录成功请求的耗时
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self):
+        """熔断时间到期后转入半开状态（调用方需持有锁）。"""
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+
+    def allow_request(self):
+        """
+        判断当前是否允许调用 AI 后端。
+        返回 False 时调用方应立即使用安全网。
+        """
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def record_success(self, latency=None):
+        """
+        记录一次成功调用及其耗时（秒）。
+
+        latency 为 None 时只记录结果、不记录耗时样本（例如提前中止的流式回复，耗时不完整）。
+        """
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            if self._state == self.HALF_OPEN:
+                # 探测成功，恢复正常并清空旧的失败记录
+                self._state = self.CLOSED
+                self._probes_in_flight = 0
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        """记录一次失败调用（异常、超时等）。"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trip()
+                return
+            self._outcomes.append(False)
+            if self._state == self.CLOSED and len(self._outcomes) >= self.min_requests:
+                if self._failure_rate() >= self.failure_threshold:
+                    self._trip()
+
+    def _trip(self):
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._probes_in_flight = 0
+        # 旧的耗时样本可能正是导致超时的原因（后端变慢但仍健康），熔断后从上限重新学习
+        self._latencies.clear()
+        logger.warning("AI 服务熔断：最近失败率 %.0f%%，%.0f 秒内直接使用安全网",
+                       self._failure_rate() * 100, self.open_seconds)
+
+    def _failure_rate(self):
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def failure_rate(self):
+        """最近窗口内的失败率。"""
+        with self._lock:
+            return self._failure_rate()
+
+    def latency_percentile(self, percentile):
+        """
+        最近成功请求耗时的分位数（最近秩法），没有样本时返回 None。
+
+        Args:
+            percentile: 0-100 之间的分位数，如 95
+        """
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        rank = max(1, math.ceil(percentile / 100 * len(samples)))
+        return samples[rank - 1]
+
+    def current_timeout(self):
+        """
+        本次调用应使用的超时时间：样本足够时收缩到 p95 × 系数，否则使用上限。
+        半开状态下的探测请求始终使用上限，避免探测被收缩后的超时截断而永远无法恢复。
+        """
+        with self._lock:
+            self._refresh_state()
+            probing = self._state != self.CLOSED
+            enough_samples = len(self._latencies) >= self.min_requests
+        if probing or not enough_samples:
+            return self.max_timeout
+        p95 = self.latency_percentile(95)
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.timeout_multiplier))
@@ -1,32 +1,149 @@
+import logging
 import openpyxl 
 import csv
 import os
 
+import extraction_plan
+import layout_store
+import sheet_cache
+import metrics
+import xlsx_stream
+from emissions_aggregation import EmissionsMatrix
+from emissions_model import scope3_category_key
+from string_table import SheetIndex, StringTable
+
+logger = logging.getLogger(__name__)
+
+# 范围二三表格中列出的范围三类别：编号 -> (名称, 说明)，只列出排放量不为 0 的类别
+SCOPE3_TABLE_ITEMS = {
+    1: ('外购商品和服务的上游产生的排放', '原材料采购'),
+    2: ('资本货物产生的排放', '设备设施建设'),
+    3: ('燃料和能源相关逸出排放', '外购电力热力上游排放'),
+    4: ('上下游运输和配送产生的排放', '物流运输'),
+    5: ('运营中产生的废弃物产生的排放', '废弃物处理'),
+    6: ('员工商务差旅产生的排放', '商务出行'),
+    7: ('员工上下班通勤产生的排放', '员工通勤'),
+    9: ('运营中输入的运输和配送产生的排放', '原材料和产品运输'),
+    10: ('已售产品的使用过程产生的排放', '产品使用阶段'),
+    12: ('已售产品的报废处理产生的排放', '产品回收处理'),
+}
+
+
+def sheet_to_dicts(sheet, header_row=1, start_row=None, end_row=None, skip_empty_rows=True, clean_headers=True):
+    """
+    逐行流式读取一个工作表（普通或只读模式均可），转换为列表字典格式。
+
+    参数含义与 ExcelDataReader.read_to_list_of_dicts 相同。
+    """
+    header_values = next(sheet.iter_rows(min_row=header_row, max_row=header_row, values_only=True), ())
+    data_start = start_row or header_row + 1
+    if sheet.max_row:
+        data_end = min(end_row or sheet.max_row, sheet.max_row)
+        width = sheet.max_column
+        rows = sheet.iter_rows(min_row=data_start, max_row=data_end, max_col=width, values_only=True)
+    else:
+        # 只读模式下未记录尺寸的工作表：各行长度不一，表头宽度取读到的最宽一行
+        rows = list(sheet.iter_rows(min_row=data_start, max_row=end_row, values_only=True))
+        width = max([len(header_values)] + [len(values) for values in rows])
+    header_values = tuple(header_values) + (None,) * (width - len(header_values))
+
+    headers = []
+    for col, value in enumerate(header_values, start=1):
+        if value is not None:
+            header_text = str(value).strip()
+            if clean_headers:
+                # 清理表头：去空格、标准化
+                header_text = header_text.replace(' ', '_').replace('\n', '_').strip()
+            headers.append(header_text if header_text else f"column_{col}")
+        else:
+            headers.append(f"column_{col}")
+
+    # 确保表头不为空
+    for i, h in enumerate(headers):
+        if not h or h.strip() == '':
+            headers[i] = f"column_{i+1}"
+
+    result = []
+    for values in rows:
+        row_dict = {}
+        has_data = False
+        for col, header in enumerate(headers):
+            cleaned_value = ExcelDataReader._clean_cell_value(values[col] if col < len(values) else None)
+            row_dict[header] = cleaned_value
+            if cleaned_value is not None and cleaned_value != '':
+                has_data = True
+
+        # 根据参数决定是否跳过空行
+        if not skip_empty_rows or has_data:
+            result.append(row_dict)
+    return result
+
+
 class ExcelDataReader: 
-    def __init__(self, filepath): 
+    def __init__(self, filepath, stream=None, plan=None, layout_store=None, sheet_cache=None, backend=None): 
         """ 
-        初始化时，加载 Excel 工作簿。 
+        识别文件类型。Excel 工作簿在第一次访问 workbook 时才完整加载：
+        extract_data 优先按工作表内容缓存增量提取，不需要完整加载。
+
+        Args:
+            filepath: 文件路径；传入 stream 时仅用于判断文件类型和记录来源
+            stream: 可选的二进制文件对象（如上传的内存缓冲），Excel 直接从中读取
+            plan: 可选的 extraction_plan.CompiledPlan，默认使用 extraction_plan.load_plan()
+            layout_store: 可选的 layout_store.LayoutStore，默认使用 layout_store.default_store()
+            sheet_cache: 可选的 sheet_cache.SheetCache，默认使用 sheet_cache.default_cache()
+            backend: Excel 读取后端，'openpyxl'、'stream'（xlsx_stream 直接流式解析 XML）
+                或 'snapshot'（sheet_snapshot 的 mmap 列式快照，多个工作进程共享），
+                默认使用环境变量 EXCEL_BACKEND，再默认 openpyxl
         """ 
-        self.workbook = None
+        self._workbook = None
+        self._workbook_loaded = False
         self.filepath = filepath
+        self.stream = stream
+        self.plan = plan
+        self.layout_store = layout_store
+        self.sheet_cache = sheet_cache
+        self.backend = backend
+        # 按标签查找用的字符串表（整个工作簿共用）和各工作表的位置索引，第一次查找时建立
+        self.strings = None
+        self._sheet_indexes = {}
         self.file_type = None
         
         # 检查文件类型
-        if filepath.endswith('.xlsx') or filepath.endswith('.xls'):
+        if filepath.lower().endswith('.xlsx') or filepath.lower().endswith('.xls'):
             self.file_type = 'excel'
+        elif filepath.lower().endswith('.csv'):
+            self.file_type = 'csv'
+            logger.info("识别到 CSV 文件: %s", filepath)
+        else:
+            logger.error("不支持的文件类型 %s", filepath)
+
+    @property
+    def workbook(self):
+        """完整加载的工作簿（openpyxl 或 xlsx_stream.StreamWorkbook），第一次访问时加载；不是 Excel 或加载失败时为 None。"""
+        if self.file_type == 'excel' and not self._workbook_loaded:
+            self._workbook_loaded = True
             try:
-                self.workbook = openpyxl.load_workbook(filepath, data_only=True)
-                print(f"成功加载 Excel: {filepath}")
+                if self.stream is not None:
+                    self.stream.seek(0)
+                with metrics.span('workbook_load'):
+                    self._workbook = xlsx_stream.open_workbook(self._source(), self.backend)
+                logger.info("成功加载 Excel: %s", self.filepath)
             except FileNotFoundError:
-                print(f"错误：找不到文件 {filepath}")
+                logger.error("找不到文件 %s", self.filepath)
             except Exception as e:
-                print(f"加载 Excel 出错: {e}")
-        elif filepath.endswith('.csv'):
-            self.file_type = 'csv'
-            print(f"识别到 CSV 文件: {filepath}")
-        else:
-            print(f"错误：不支持的文件类型 {filepath}")
+                logger.error("加载 Excel 出错: %s", e)
+        return self._workbook
+
+    def _source(self):
+        return self.stream if self.stream is not None else self.filepath
+
+    def _excel_readable(self):
+        """判断 Excel 输入能否读取：有效的 .xlsx 包不需要完整加载，其他情况尝试加载。"""
+        if self._workbook is not None or sheet_cache.is_xlsx(self._source()):
+            return True
+        return self.workbook is not None
 
+    @metrics.timed('label_extraction')
     def find_value_by_label(self, sheet_name, label_name, column=None, search_direction='right',
                            exact_match=False, case_sensitive=False, max_rows=None):
         """
@@ -51,67 +168,52 @@ class ExcelDataReader:
         try:
             sheet = self.workbook[sheet_name]
             if sheet_name not in self.workbook.sheetnames:
-                print(f"错误：找不到工作表 {sheet_name}")
+                logger.warning("找不到工作表 %s", sheet_name)
                 return None
 
-            # 准备标签文本
-            search_text = str(label_name) if case_sensitive else str(label_name).lower()
-
-            # 搜索范围
-            search_range = []
-            if column:
-                # 搜索指定列
-                column_index = openpyxl.utils.column_index_from_string(column)
-                max_search_rows = min(max_rows or sheet.max_row, sheet.max_row)
-                for row in range(1, max_search_rows + 1):
-                    search_range.append(sheet.cell(row=row, column=column_index))
-            else:
-                # 搜索整个工作表
-                max_search_rows = min(max_rows or sheet.max_row, sheet.max_row)
-                for row in range(1, max_search_rows + 1):
-                    for col in range(1, sheet.max_column + 1):
-                        search_range.append(sheet.cell(row=row, column=col))
-
-            # 搜索匹配的单元格
-            matched_cells = []
-            for cell in search_range:
-                if cell.value is not None:
-                    cell_text = str(cell.value)
-                    compare_text = cell_text if case_sensitive else cell_text.lower()
-
-                    # 匹配逻辑
-                    if exact_match:
-                        if search_text == compare_text:
-                            matched_cells.append(cell)
-                    else:
-                        if search_text in compare_text:
-                            matched_cells.append(cell)
-
-            if not matched_cells:
-                print(f"警告：在 {sheet_name} 中未找到包含 '{label_name}' 的单元格")
+            # 单元格文本在工作表索引中去重，小写形式只计算一次，匹配按字符串编号进行
+            index = self._sheet_index(sheet_name)
+            matched_ids = self.strings.matching(label_name, exact=exact_match, case_sensitive=case_sensitive)
+            max_search_rows = min(max_rows or sheet.max_row, sheet.max_row)
+            column_index = openpyxl.utils.column_index_from_string(column) if column else None
+            target = index.first(matched_ids, max_row=max_search_rows, column=column_index)
+            if target is None:
+                logger.debug("在 %s 中未找到包含 '%s' 的单元格", sheet_name, label_name)
                 return None
 
             # 返回第一个匹配单元格相邻的值
-            target_cell = matched_cells[0]
+            row, col = target
             value_cell = None
 
             if search_direction == 'right':
-                value_cell = sheet.cell(row=target_cell.row, column=target_cell.column + 1)
+                value_cell = sheet.cell(row=row, column=col + 1)
             elif search_direction == 'left':
-                if target_cell.column > 1:
-                    value_cell = sheet.cell(row=target_cell.row, column=target_cell.column - 1)
+                if col > 1:
+                    value_cell = sheet.cell(row=row, column=col - 1)
             elif search_direction == 'below':
-                value_cell = sheet.cell(row=target_cell.row + 1, column=target_cell.column)
+                value_cell = sheet.cell(row=row + 1, column=col)
             elif search_direction == 'above':
-                if target_cell.row > 1:
-                    value_cell = sheet.cell(row=target_cell.row - 1, column=target_cell.column)
+                if row > 1:
+                    value_cell = sheet.cell(row=row - 1, column=col)
 
             return value_cell.value if value_cell and value_cell.value is not None else None
 
         except Exception as e:
-            print(f"查找标签 '{label_name}' 时出错: {e}")
+            logger.error("查找标签 '%s' 时出错: %s", label_name, e)
             return None
 
+    def _sheet_index(self, sheet_name):
+        """工作表的字符串位置索引，每个工作表只遍历一次；字符串表由整个工作簿共用"""
+        index = self._sheet_indexes.get(sheet_name)
+        if index is None:
+            if self.strings is None:
+                # 流式后端在读取时已经把字符串去重到工作簿的字符串表中
+                self.strings = getattr(self.workbook, 'strings', None)
+                if self.strings is None:
+                    self.strings = StringTable()
+            index = self._sheet_indexes[sheet_name] = SheetIndex(self.workbook[sheet_name], self.strings)
+        return index
+
     def _find_value_next_to(self, sheet_name, keyword): 
         """ 
         私有方法，用于实现向后兼容。
@@ -128,13 +230,13 @@ class ExcelDataReader:
                         # 找到了关键词！返回它右边一列的值 
                         value_cell = sheet.cell(row=cell.row, column=cell.column + 1) 
                         return value_cell.value 
-            print(f"警告：在 {sheet_name} 中未找到关键词 '{keyword}'") 
+            logger.debug("在 %s 中未找到关键词 '%s'", sheet_name, keyword)
             return None 
         except KeyError: 
-            print(f"错误：找不到工作表 {sheet_name}") 
+            logger.warning("找不到工作表 %s", sheet_name)
             return None 
         except Exception as e: 
-            print(f"查找关键词 '{keyword}' 时出错: {e}") 
+            logger.error("查找关键词 '%s' 时出错: %s", keyword, e)
             return None
             
     def _find_value_below(self, sheet_name, keyword):
@@ -152,10 +254,10 @@ class ExcelDataReader:
                         # 找到了关键词！返回它下方单元格的值 
                         value_cell = sheet.cell(row=cell.row + 1, column=cell.column) 
                         return value_cell.value 
-            print(f"警告：在 {sheet_name} 中未找到关键词 '{keyword}'") 
+            logger.debug("在 %s 中未找到关键词 '%s'", sheet_name, keyword)
             return None 
         except Exception as e: 
-            print(f"查找关键词 '{keyword}' 下方值时出错: {e}") 
+            logger.error("查找关键词 '%s' 下方值时出错: %s", keyword, e)
             return None
             
     def _find_value_by_content(self, sheet_name, keyword_substring):
@@ -168,16 +270,15 @@ class ExcelDataReader:
             
         try: 
             sheet = self.workbook[sheet_name] 
-            for row in sheet.iter_rows(): 
-                for cell in row: 
-                    if cell.value is not None and keyword_substring in str(cell.value): 
-                        # 找到了包含关键词的单元格！返回它下方单元格的值 
-                        value_cell = sheet.cell(row=cell.row + 1, column=cell.column) 
-                        return value_cell.value 
-            print(f"警告：在 {sheet_name} 中未找到包含 '{keyword_substring}' 的单元格") 
+            target = self._sheet_index(sheet_name).first(self.strings.matching(keyword_substring, case_sensitive=True))
+            if target is not None:
+                # 找到了包含关键词的单元格！返回它下方单元格的值 
+                row, col = target
+                return sheet.cell(row=row + 1, column=col).value
+            logger.debug("在 %s 中未找到包含 '%s' 的单元格", sheet_name, keyword_substring)
             return None 
         except Exception as e: 
-            print(f"查找包含关键词 '{keyword_substring}' 的单元格时出错: {e}") 
+            logger.error("查找包含关键词 '%s' 的单元格时出错: %s", keyword_substring, e)
             return None 
 
     def read_to_list_of_dicts(self, sheet_name=None, header_row=1, start_row=None,
@@ -247,12 +348,12 @@ class ExcelDataReader:
                         continue
 
                 if csv_data is None:
-                    print(f"无法使用任何编码读取 CSV 文件: {self.filepath}")
+                    logger.error("无法使用任何编码读取 CSV 文件: %s", self.filepath)
                 else:
-                    print(f"成功从 CSV 文件读取 {len(result)} 行数据")
+                    logger.info("成功从 CSV 文件读取 %s 行数据", len(result))
 
             except Exception as e:
-                print(f"读取 CSV 文件时出错: {e}")
+                logger.error("读取 CSV 文件时出错: %s", e)
 
         elif self.file_type == 'excel' and sheet_name:
             # 处理 Excel 文件
@@ -261,60 +362,25 @@ class ExcelDataReader:
 
             try:
                 if sheet_name not in self.workbook.sheetnames:
-                    print(f"错误：找不到工作表 {sheet_name}")
+                    logger.warning("找不到工作表 %s", sheet_name)
                     return result
 
-                sheet = self.workbook[sheet_name]
-
-                # 获取表头
-                headers = []
-                header_row_obj = sheet[header_row]
-                for cell in header_row_obj:
-                    if cell.value is not None:
-                        header_text = str(cell.value).strip()
-                        if clean_headers:
-                            # 清理表头：去空格、标准化
-                            header_text = header_text.replace(' ', '_').replace('\n', '_').strip()
-                        headers.append(header_text if header_text else f"column_{cell.column}")
-                    else:
-                        headers.append(f"column_{cell.column}")
-
-                # 确保表头不为空
-                for i, h in enumerate(headers):
-                    if not h or h.strip() == '':
-                        headers[i] = f"column_{i+1}"
-
-                # 读取数据行
-                data_start = start_row or header_row + 1
-                data_end = min(end_row or sheet.max_row, sheet.max_row)
+                result = sheet_to_dicts(self.workbook[sheet_name], header_row=header_row, start_row=start_row,
+                                        end_row=end_row, skip_empty_rows=skip_empty_rows,
+                                        clean_headers=clean_headers)
 
-                for row in range(data_start, data_end + 1):
-                    row_dict = {}
-                    has_data = False
-
-                    for col in range(1, len(headers) + 1):
-                        cell_value = sheet.cell(row=row, column=col).value
-                        cleaned_value = self._clean_cell_value(cell_value)
-                        row_dict[headers[col-1]] = cleaned_value
-
-                        if cleaned_value is not None and cleaned_value != '':
-                            has_data = True
-
-                    # 根据参数决定是否跳过空行
-                    if not skip_empty_rows or has_data:
-                        result.append(row_dict)
-
-                print(f"成功从 Excel 工作表 {sheet_name} 读取 {len(result)} 行数据")
+                logger.info("成功从 Excel 工作表 %s 读取 %s 行数据", sheet_name, len(result))
 
             except Exception as e:
-                print(f"读取 Excel 工作表 {sheet_name} 时出错: {e}")
+                logger.error("读取 Excel 工作表 %s 时出错: %s", sheet_name, e)
 
         else:
-            print(f"错误：文件类型 {self.file_type} 或缺少必要参数")
+            logger.error("文件类型 %s 或缺少必要参数", self.file_type)
 
         return result
 
-    def _clean_cell_value(self, value):
+    @staticmethod
+    def _clean_cell_value(value):
         """
         清理和标准化单元格值
 
@@ -351,6 +417,7 @@ class ExcelDataReader:
 
         return value
 
+    @metrics.timed('csv_parse')
     def read_emission_data_csv(self, csv_path='减排行动统计.csv'):
         """
         读取减排行动统计CSV文件，提取所有模板需要的变量
@@ -369,7 +436,7 @@ class ExcelDataReader:
 
         # 检查文件是否存在
         if not os.path.exists(csv_path):
-            print(f"警告：CSV文件不存在: {csv_path}")
+            logger.warning("CSV文件不存在: %s", csv_path)
             return {}
 
         data = {}
@@ -386,29 +453,23 @@ class ExcelDataReader:
                             value = row[1].strip() if len(row) > 1 else ''
                             data[key] = value
 
-                print(f"成功从CSV读取 {len(data)} 个字段 (编码: {encoding})")
+                logger.info("成功从CSV读取 %s 个字段 (编码: %s)", len(data), encoding)
 
-                # 计算scope_3_emissions总和（如果CSV中没有）
+                # 计算scope_3_emissions总和（如果CSV中没有）：各类别一次装入数组求和
                 if 'scope_3_emissions' not in data:
-                    scope3_total = 0
-                    for i in range(1, 16):
-                        key = f'scope_3_category_{i}_emissions'
-                        if key in data and data[key]:
-                            try:
-                                scope3_total += float(data[key])
-                            except ValueError:
-                                pass
+                    scope3_total = float(EmissionsMatrix.from_records([data]).category_total[0])
                     data['scope_3_emissions'] = str(round(scope3_total, 6))
-                    print(f"计算得出 scope_3_emissions: {data['scope_3_emissions']}")
+                    logger.debug("计算得出 scope_3_emissions: %s", data['scope_3_emissions'])
 
                 return data
 
             except (UnicodeDecodeError, Exception) as e:
                 continue
 
-        print(f"错误：无法使用任何编码读取CSV文件")
+        logger.error("无法使用任何编码读取CSV文件")
         return {}
 
+    @metrics.timed('csv_parse')
     def _parse_csv_sections(self, csv_path='减排行动统计.csv'):
         """
         按区域解析CSV文件，保留行号顺序
@@ -442,13 +503,13 @@ class ExcelDataReader:
                         # 范围一：匹配"范围一"+"直接"+"排放源"
                         if '范围一' in row_text and '直接' in row_text and '排放源' in row_text:
                             scope1_start = i
-                            print(f"找到范围一标记在第 {i+1} 行: {row_text}")
+                            logger.debug("找到范围一标记在第 %s 行: %s", i+1, row_text)
                         # 范围二三：匹配"范围二"或"范围二三"+"排放源"（间接可能有编码问题，用更宽松的匹配）
                         elif ('范围二' in row_text or '范围二三' in row_text) and '排放源' in row_text:
                             # 确保不是范围一
                             if '范围一' not in row_text:
                                 scope2_3_start = i
-                                print(f"找到范围二三标记在第 {i+1} 行: {row_text}")
+                                logger.debug("找到范围二三标记在第 %s 行: %s", i+1, row_text)
 
                 # 解析范围一数据（从"范围一直接排放源"到"范围二三间接排放源"之前）
                 scope1_items = []
@@ -473,7 +534,7 @@ class ExcelDataReader:
                                 'note': facility  # 设施放在note字段
                             })
 
-                    print(f"解析范围一数据: {len(scope1_items)} 条记录")
+                    logger.debug("解析范围一数据: %s 条记录", len(scope1_items))
 
                 # 解析范围二三数据（从"范围二三间接排放源"开始）
                 scope2_3_items = []
@@ -500,7 +561,7 @@ class ExcelDataReader:
                                 'note': facility  # 设施放在note字段
                             })
 
-                    print(f"解析范围二三数据: {len(scope2_3_items)} 条记录")
+                    logger.debug("解析范围二三数据: %s 条记录", len(scope2_3_items))
 
                 return {
                     'scope1_items': scope1_items,
@@ -508,11 +569,12 @@ class ExcelDataReader:
                 }
 
             except (UnicodeDecodeError, Exception) as e:
-                print(f"解析CSV区域时出错 (编码 {encoding}): {e}")
+                logger.error("解析CSV区域时出错 (编码 %s): %s", encoding, e)
                 continue
 
         return {'scope1_items': [], 'scope2_3_items': []}
 
+    @metrics.timed('label_extraction')
     def find_multiple_values_by_pattern(self, sheet_name, patterns, search_direction='right',
                                       max_distance=3, require_numeric=False):
         """
@@ -544,27 +606,23 @@ class ExcelDataReader:
                 try:
                     regex = re.compile(pattern, re.IGNORECASE)
                 except re.error as e:
-                    print(f"正则表达式错误 '{pattern}': {e}")
+                    logger.warning("正则表达式错误 '%s': %s", pattern, e)
                     continue
 
-                # 搜索匹配的单元格
-                matched_cells = []
-                for row in sheet.iter_rows():
-                    for cell in row:
-                        if cell.value is not None and regex.search(str(cell.value)):
-                            matched_cells.append(cell)
+                # 搜索匹配的单元格：正则只对每个不同的文本执行一次
+                matched_cells = self._sheet_index(sheet_name).positions(self.strings.search(regex))
 
                 # 为每个匹配的单元格查找相邻值
-                for cell in matched_cells:
+                for row, col in matched_cells:
                     for distance in range(1, max_distance + 1):
                         value_cell = None
 
                         if search_direction == 'right':
-                            if cell.column + distance <= sheet.max_column:
-                                value_cell = sheet.cell(row=cell.row, column=cell.column + distance)
+                            if col + distance <= sheet.max_column:
+                                value_cell = sheet.cell(row=row, column=col + distance)
                         elif search_direction == 'below':
-                            if cell.row + distance <= sheet.max_row:
-                                value_cell = sheet.cell(row=cell.row + distance, column=cell.column)
+                            if row + distance <= sheet.max_row:
+                                value_cell = sheet.cell(row=row + distance, column=col)
 
                         if value_cell and value_cell.value is not None:
                             # 检查是否需要数值
@@ -580,10 +638,11 @@ class ExcelDataReader:
                             break
 
         except Exception as e:
-            print(f"模式匹配查找时出错: {e}")
+            logger.error("模式匹配查找时出错: %s", e)
 
         return results
 
+    @metrics.timed('label_extraction')
     def get_table_data_by_labels(self, sheet_name, row_labels, column_labels,
                                 header_row=None, data_start_row=None):
         """
@@ -609,39 +668,23 @@ class ExcelDataReader:
 
             result = {}
 
-            # 查找行标签位置
+            # 查找行标签位置（不区分大小写的包含匹配，按字符串编号查找）
+            index = self._sheet_index(sheet_name)
             row_positions = {}
             for label in row_labels:
-                for row in range(1, sheet.max_row + 1):
-                    for col in range(1, sheet.max_column + 1):
-                        cell = sheet.cell(row=row, column=col)
-                        if cell.value and label.lower() in str(cell.value).lower():
-                            row_positions[label] = col
-                            break
-                    if label in row_positions:
-                        break
-
-            # 查找列标签位置
-            if header_row:
-                col_positions = {}
-                for label in column_labels:
-                    for col in range(1, sheet.max_column + 1):
-                        cell = sheet.cell(row=header_row, column=col)
-                        if cell.value and label.lower() in str(cell.value).lower():
-                            col_positions[label] = col
-                            break
-            else:
-                # 如果没有指定表头行，搜索整个工作表
-                col_positions = {}
-                for label in column_labels:
-                    for row in range(1, sheet.max_row + 1):
-                        for col in range(1, sheet.max_column + 1):
-                            cell = sheet.cell(row=row, column=col)
-                            if cell.value and label.lower() in str(cell.value).lower():
-                                col_positions[label] = col
-                                break
-                        if label in col_positions:
-                            break
+                position = index.first(self.strings.matching(label))
+                if position is not None:
+                    row_positions[label] = position[1]
+
+            # 查找列标签位置：指定了表头行时只在表头行中查找，否则搜索整个工作表
+            col_positions = {}
+            for label in column_labels:
+                if header_row:
+                    position = index.first(self.strings.matching(label), min_row=header_row, max_row=header_row)
+                else:
+                    position = index.first(self.strings.matching(label))
+                if position is not None:
+                    col_positions[label] = position[1]
 
             # 提取数据
             data_start = data_start_row or 2
@@ -660,7 +703,7 @@ class ExcelDataReader:
             return result
 
         except Exception as e:
-            print(f"提取表格数据时出错: {e}")
+            logger.error("提取表格数据时出错: %s", e)
             return {}
 
     def _parse_csv_table_section(self, csv_data, section_label, emission_type='scope1'):
@@ -746,10 +789,14 @@ class ExcelDataReader:
 
         return items
 
-    def extract_data(self):
+    def extract_data(self, csv_path='减排行动统计.csv'):
         """
         提取所有模板需要的数据，返回包含32个变量的字典。
         优先从CSV文件读取，如果CSV不存在则从Excel文件提取。
+
+        Args:
+            csv_path: 优先读取的CSV文件路径；传入None则直接使用Excel数据。
+                      当前读取器本身是CSV文件时，始终使用该文件。
         """
         # 默认值字典 - 用于数据源中不存在的情况
         default_values = {
@@ -774,41 +821,21 @@ class ExcelDataReader:
 
         # ========== 优先尝试从CSV文件读取所有数据 ==========
         import os
-        csv_path = '减排行动统计.csv'
-        if os.path.exists(csv_path):
+        if self.file_type == 'csv':
+            csv_path = self.filepath
+        if csv_path and os.path.exists(csv_path):
             csv_data = self.read_emission_data_csv(csv_path)
             if csv_data:
                 data.update(csv_data)
-                print(f"从CSV文件成功读取 {len(csv_data)} 个变量")
+                logger.info("从CSV文件成功读取 %s 个变量", len(csv_data))
 
-                # ========== 格式化数字：保留两位小数，添加千分位分隔符 ==========
-                def format_number(value):
-                    """格式化数字：保留两位小数，添加千分位分隔符"""
-                    try:
-                        return f"{float(value):,.2f}"
-                    except (ValueError, TypeError):
-                        return "0.00"
-
-                # 格式化所有排放数据（原始键名，用于模板渲染）
-                emission_keys = [
-                    'scope_1_emissions',
-                    'scope_2_location_based_emissions',
-                    'scope_2_market_based_emissions',
-                    'scope_3_emissions',
-                    'scope_3_category_1_emissions',
-                    'scope_3_category_2_emissions',
-                    'scope_3_category_3_emissions',
-                    'scope_3_category_4_emissions',
-                    'scope_3_category_5_emissions',
-                    'scope_3_category_6_emissions',
-                    'scope_3_category_7_emissions',
-                    'scope_3_category_9_emissions',
-                    'scope_3_category_10_emissions',
-                    'scope_3_category_12_emissions',
-                ]
-                for key in emission_keys:
-                    if key in data:
-                        data[key] = format_number(data[key])
+                # ========== 排放数据模型：原始数值只解析一次，汇总值只计算一次 ==========
+                matrix = EmissionsMatrix.from_records([data])
+                emissions = matrix.model(0)
+                # 格式化（保留两位小数，添加千分位分隔符）只作为渲染视图应用，
+                # 同时写入 AIService 使用的别名（scope_1 等）和总排放量；模型本身不放入数据字典，
+                # 数据字典保持可 JSON 序列化，下游需要数值时用 EmissionsModel.from_data 按当前的值重新构建
+                data.update(emissions.template_fields())
 
                 # ========== 构建表格数据列表（使用按区域解析的方法）==========
                 section_data = self._parse_csv_sections(csv_path)
@@ -820,42 +847,26 @@ class ExcelDataReader:
                 # 构建最终的scope2_3_items列表
                 # 1. 首先添加范围二的总量数据（如果有）
                 scope2_3_items = []
-                scope2_location = data.get('scope_2_location_based_emissions', '0.00')
-                scope2_market = data.get('scope_2_market_based_emissions', '0.00')
-
-                if scope2_location != '0.00':
+                if emissions.scope_2_location:
                     scope2_3_items.append({
                         'name': '范围二：能源间接温室气体排放（基于位置）',
-                        'emission': scope2_location,
+                        'emission': data['scope_2_location_based_emissions'],
                         'note': '外购电力和热力'
                     })
-                if scope2_market != '0.00':
+                if emissions.scope_2_market:
                     scope2_3_items.append({
                         'name': '范围二：能源间接温室气体排放（基于市场）',
-                        'emission': scope2_market,
+                        'emission': data['scope_2_market_based_emissions'],
                         'note': '外购电力和热力'
                     })
 
                 # 2. 添加范围三分类数据（如果有）
-                scope3_total_items = [
-                    ('外购商品和服务的上游产生的排放', 'scope_3_category_1_emissions', '原材料采购'),
-                    ('资本货物产生的排放', 'scope_3_category_2_emissions', '设备设施建设'),
-                    ('燃料和能源相关逸出排放', 'scope_3_category_3_emissions', '外购电力热力上游排放'),
-                    ('上下游运输和配送产生的排放', 'scope_3_category_4_emissions', '物流运输'),
-                    ('运营中产生的废弃物产生的排放', 'scope_3_category_5_emissions', '废弃物处理'),
-                    ('员工商务差旅产生的排放', 'scope_3_category_6_emissions', '商务出行'),
-                    ('员工上下班通勤产生的排放', 'scope_3_category_7_emissions', '员工通勤'),
-                    ('运营中输入的运输和配送产生的排放', 'scope_3_category_9_emissions', '原材料和产品运输'),
-                    ('已售产品的使用过程产生的排放', 'scope_3_category_10_emissions', '产品使用阶段'),
-                    ('已售产品的报废处理产生的排放', 'scope_3_category_12_emissions', '产品回收处理'),
-                ]
-
-                for name, emission_key, note in scope3_total_items:
-                    emission_value = data.get(emission_key, '0.00')
-                    if emission_value != '0.00':
+                for number in matrix.nonzero_categories(0):
+                    if number in SCOPE3_TABLE_ITEMS:
+                        name, note = SCOPE3_TABLE_ITEMS[number]
                         scope2_3_items.append({
                             'name': name,
-                            'emission': emission_value,
+                            'emission': data[scope3_category_key(number)],
                             'note': note
                         })
 
@@ -868,41 +879,11 @@ class ExcelDataReader:
                 # 为了向后兼容，保留 items 列表（使用范围二三数据）
                 data['items'] = scope2_3_items
 
-                # ========== 键名映射：为AIService添加别名（用于AI摘要生成）==========
-                # CSV使用的键名 -> AIService期望的键名
-                key_mapping = {
-                    'scope_1_emissions': 'scope_1',
-                    'scope_2_location_based_emissions': 'scope_2_location',
-                    'scope_2_market_based_emissions': 'scope_2_market',
-                    'scope_3_emissions': 'scope_3',
-                }
-
-                for csv_key, ai_key in key_mapping.items():
-                    if csv_key in data:
-                        data[ai_key] = data[csv_key]
-
-                # 计算总排放量（用于AI摘要）
-                try:
-                    s1 = float(data.get('scope_1_emissions', 0))
-                    s2_loc = float(data.get('scope_2_location_based_emissions', 0))
-                    s3 = float(data.get('scope_3_emissions', 0))
-                    total_loc = s1 + s2_loc + s3
-
-                    s2_mkt = float(data.get('scope_2_market_based_emissions', 0))
-                    total_mkt = s1 + s2_mkt + s3
-
-                    data['total_emission_location'] = format_number(total_loc)
-                    data['total_emission_market'] = format_number(total_mkt)
-
-                    # 提取年份
-                    period = data.get('reporting_period', '')
-                    import re
-                    year_match = re.search(r'(\d{4})', str(period))
-                    data['report_year'] = year_match.group(1) if year_match else '2024'
-                except (ValueError, TypeError):
-                    data['total_emission_location'] = "0.00"
-                    data['total_emission_market'] = "0.00"
-                    data['report_year'] = '2024'
+                # 提取年份：取自盘查覆盖周期，没有时保留CSV中的 report_year
+                period = data.get('reporting_period', '')
+                import re
+                year_match = re.search(r'(\d{4})', str(period))
+                data['report_year'] = year_match.group(1) if year_match else data.get('report_year')
 
                 return data
 
@@ -912,213 +893,48 @@ class ExcelDataReader:
             emission_reductions = self.read_to_list_of_dicts(skip_empty_rows=True)
             data['emission_reductions'] = emission_reductions
             data['file_type'] = 'csv'
-            print(f"从CSV文件提取减排行动数据，共 {len(emission_reductions)} 条记录")
+            logger.info("从CSV文件提取减排行动数据，共 %s 条记录", len(emission_reductions))
             return data
 
         # 处理Excel文件（温室气体排放数据）
-        if not self.workbook or self.file_type != 'excel':
+        if self.file_type != 'excel':
             return data
 
-        # 尝试多个可能的工作表名称
-        main_sheet_candidates = ['温室气体盘查清册', '温室气体盘查清册 (2)']
-        main_sheet = None
-        for candidate in main_sheet_candidates:
-            if candidate in self.workbook.sheetnames:
-                main_sheet = candidate
-                break
-
-        if not main_sheet:
-            print("警告：未找到主要工作表")
+        # 按声明式提取计划一次遍历每个工作表，字段、标签和回退策略都在计划文件中；
+        # 已知版式按记录的坐标直接读取
+        plan = self.plan or extraction_plan.load_plan()
+        store = self.layout_store if self.layout_store is not None else layout_store.default_store()
+        cache = self.sheet_cache if self.sheet_cache is not None else sheet_cache.default_cache()
+        fields = None
+        incremental = False
+        if cache is not None and self._workbook is None:
+            # 只重新解析内容变化过的工作表，未变化的工作表复用缓存的结果
+            try:
+                fields = plan.extract_incremental(self._source(), cache, layout_store=store, backend=self.backend)
+                incremental = True
+                logger.info("成功加载 Excel: %s（增量提取）", self.filepath)
+            except Exception as e:
+                logger.debug("增量提取不可用，完整加载工作簿: %s", e)
+        if not incremental:
+            if not self.workbook:
+                return data
+            fields = plan.extract(self.workbook, layout_store=store)
+        if fields is None:
             return data
 
-        table_sheet = '表1温室气体盘查表'
-        
-        # 使用新的find_value_by_label方法替代硬坐标定位
-        # 从主要工作表中提取元数据
-        company_name = self.find_value_by_label(main_sheet, '组织名称：') 
-        report_period = self.find_value_by_label(main_sheet, '盘查覆盖周期:') 
-        # 从报告周期中提取年份（假设格式为"2024年1月1日至2024年12月31日"）
-        report_year = '2024'  # 直接提取年份
-
-        # 获取范围一排放量
-        scope_1 = None
-        try:
-            sheet = self.workbook[table_sheet]
-            # 遍历表格找到'总排放量'所在行
-            for row in sheet.iter_rows():
-                for cell in row:
-                    if cell.value == '总排放量':
-                        # 根据用户反馈，总排放量这一行的数据与正上方单元格一一对应
-                        # 因此我们需要获取当前行各列的值，然后将这些值与上一行的标签对应
-                        # 这里我们主要关注范围一对应的排放量
-                        current_row = cell.row
-                        # 假设范围一的标签在B列（根据之前的调试发现）
-                        # 检查上一行B列是否包含'范围一'
-                        prev_row_cell_b = sheet.cell(row=current_row-1, column=2)
-                        if prev_row_cell_b.value and '范围一' in str(prev_row_cell_b.value):
-                            # 获取当前行B列的值作为scope_1
-                            scope_1 = sheet.cell(row=current_row, column=2).value
-                            print(f"从表1温室气体盘查表获取scope_1值(总排放量行上方对应范围一): {scope_1}")
-                            break
-                if scope_1 is not None:
-                    break
-            
-            # 如果没找到，回退到使用find_value_by_label方法
-            if scope_1 is None:
-                scope_1 = self.find_value_by_label(table_sheet, '总排放量')
-                print(f"回退到查找总排放量右侧值作为scope_1: {scope_1}")
-        except Exception as e:
-            print(f"获取scope_1值时出错: {e}")
-        
-        # 提取范围二排放量
-        # 使用find_value_by_label方法替代硬坐标
-        scope_2_location = self.find_value_by_label(table_sheet, '基于位置')
-        scope_2_market = self.find_value_by_label(table_sheet, '基于市场')
-        
-        # 如果直接查找失败，回退到原始方法
-        if scope_2_location is None:
-            scope_2_location = self.find_value_by_label(table_sheet, '范围二')
-        
-        # 提取范围三排放量
-        scope_3 = None
-        try:
-            # 优先使用find_value_by_label方法
-            scope_3 = self.find_value_by_label(table_sheet, '范围三')
-            
-            if scope_3 is None:
-                # 如果直接查找失败，尝试查找包含"范围三"的单元格
-                sheet = self.workbook[table_sheet]
-                for row in sheet.iter_rows():
-                    for cell in row:
-                        if cell.value is not None and '范围三' in str(cell.value):
-                            # 检查右侧和下方的单元格
-                            right_cell = sheet.cell(row=cell.row, column=cell.column + 1)
-                            below_cell = sheet.cell(row=cell.row + 1, column=cell.column)
-                            
-                            # 优先尝试右侧单元格（如果是数值或总量）
-                            if right_cell.value is not None:
-                                if isinstance(right_cell.value, (int, float)):
-                                    scope_3 = right_cell.value
-                                elif right_cell.value == '总量':
-                                    # 如果右侧是总量，获取总量下方的值
-                                    total_below = sheet.cell(row=right_cell.row + 1, column=right_cell.column)
-                                    if total_below.value is not None:
-                                        scope_3 = total_below.value
-                            # 如果右侧没有找到，尝试下方单元格
-                            elif below_cell.value is not None and isinstance(below_cell.value, (int, float)):
-                                scope_3 = below_cell.value
-                            break
-                    if scope_3 is not None:
-                        break
-        except Exception as e:
-            print(f"查找范围三数据时出错: {e}") 
-        
-        # 提取总排放量（基于位置）和总排放量（基于市场）
-        # 使用find_value_by_label方法替代硬坐标
-        total_emission_location = None
-        total_emission_market = None
-        try:
-            # 首先计算预期的总排放量范围，用于验证找到的值是否合理
-            expected_total_location = None
-            expected_total_market = None
-            if scope_1 is not None and scope_2_location is not None and scope_3 is not None:
-                expected_total_location = float(scope_1) + float(scope_2_location) + float(scope_3)
-                expected_total_market = float(scope_1) + float(scope_2_market) + float(scope_3)
-                print(f"预期总排放量范围: 位置={expected_total_location}, 市场={expected_total_market}")
-            
-            # 使用find_value_by_label方法查找总排放量
-            total_emission_location = self.find_value_by_label(table_sheet, '总排放量')
-            
-            # 尝试查找包含'基于位置'和'总量'的区域
-            if total_emission_location is None:
-                sheet = self.workbook[table_sheet]
-                # 记录所有可能的候选值
-                potential_totals = []
-                
-                for row in sheet.iter_rows():
-                    for cell in row:
-                        if cell.value is not None:
-                            cell_text = str(cell.value)
-                            # 查找包含'总量'的单元格
-                            if '总量' in cell_text:
-                                # 记录这个位置附近的所有数值
-                                for r_offset in range(-4, 5):
-                                    for c_offset in range(-4, 5):
-                                        check_row = cell.row + r_offset
-                                        check_col = cell.column + c_offset
-                                        if 1 <= check_row <= sheet.max_row and 1 <= check_col <= sheet.max_column:
-                                            check_cell = sheet.cell(row=check_row, column=check_col)
-                                            if check_cell.value is not None and isinstance(check_cell.value, (int, float)):
-                                                # 检查这个数值是否接近预期的总排放量
-                                                is_large_value = check_cell.value > 1000000  # 假设总排放量大于100万
-                                                
-                                                # 检查是否有'基于位置'或'基于市场'的标注
-                                                has_location = False
-                                                has_market = False
-                                                for context_r in range(max(1, check_row-3), min(sheet.max_row, check_row+4)):
-                                                    for context_c in range(max(1, check_col-5), min(sheet.max_column, check_col+6)):
-                                                        context_cell = sheet.cell(row=context_r, column=context_c)
-                                                        if context_cell.value is not None:
-                                                            context_text = str(context_cell.value)
-                                                            if '基于位置' in context_text:
-                                                                has_location = True
-                                                            elif '基于市场' in context_text:
-                                                                has_market = True
-                                                
-                                                # 添加到候选列表
-                                                if is_large_value and (has_location or has_market):
-                                                    potential_totals.append({
-                                                        'value': check_cell.value,
-                                                        'row': check_row,
-                                                        'col': check_col,
-                                                        'is_location': has_location,
-                                                        'is_market': has_market
-                                                    })
-                
-                # 从候选值中选择最接近预期值的
-                if potential_totals:
-                    # 按与预期值的接近程度排序
-                    if expected_total_location is not None:
-                        potential_totals.sort(key=lambda x: abs(x['value'] - expected_total_location) if x['is_location'] else float('inf'))
-                    # 选择第一个合适的基于位置的候选值
-                    for candidate in potential_totals:
-                        if candidate['is_location']:
-                            total_emission_location = candidate['value']
-                            print(f"从候选值中选择总排放量（基于位置）在第{candidate['row']}行第{candidate['col']}列: {candidate['value']}")
-                            break
-                    
-                    # 选择第一个合适的基于市场的候选值
-                    for candidate in potential_totals:
-                        if candidate['is_market']:
-                            total_emission_market = candidate['value']
-                            print(f"从候选值中选择总排放量（基于市场）在第{candidate['row']}行第{candidate['col']}列: {candidate['value']}")
-                            break
-            
-            # 方法3: 如果仍然找不到，直接使用计算值
-            if total_emission_location is None and expected_total_location is not None:
-                total_emission_location = expected_total_location
-                print(f"使用计算值作为总排放量（基于位置）: {total_emission_location}")
-            
-            if total_emission_market is None and expected_total_market is not None:
-                total_emission_market = expected_total_market
-                print(f"使用计算值作为总排放量（基于市场）: {total_emission_market}")
-        except Exception as e:
-            print(f"获取总排放量时出错: {e}")
-        
-        # 将所有数据打包成一个标准字典 
-        data = { 
-            'company_name': company_name, 
-            'report_year': report_year, 
-            'scope_1': scope_1,  # 范围一排放量
-            'scope_2_location': scope_2_location,  # 范围二排放量（基于位置）
-            'scope_2_market': scope_2_market,      # 范围二排放量（基于市场）
-            'scope_3': scope_3,                     # 范围三排放量
-            'total_emission_location': total_emission_location,  # 总排放量（基于位置）
-            'total_emission_market': total_emission_market,        # 总排放量（基于市场）
+        data = {
+            'company_name': fields.get('company_name'),
+            'report_year': fields.get('report_year'),
+            'scope_1': fields.get('scope_1'),  # 范围一排放量
+            'scope_2_location': fields.get('scope_2_location'),  # 范围二排放量（基于位置）
+            'scope_2_market': fields.get('scope_2_market'),      # 范围二排放量（基于市场）
+            'scope_3': fields.get('scope_3'),                     # 范围三排放量
+            'total_emission_location': fields.get('total_emission_location'),  # 总排放量（基于位置）
+            'total_emission_market': fields.get('total_emission_market'),        # 总排放量（基于市场）
             'file_type': 'excel'
-        } 
+        }
         
-        print(f"数据提取完成: {data}") 
+        logger.debug("数据提取完成: %s", data)
         return data
         
     def extract_all_data(self):
@@ -1133,7 +949,7 @@ class ExcelDataReader:
         }
         
         # 首先处理Excel文件（如果有）
-        if self.file_type == 'excel' and self.workbook:
+        if self.file_type == 'excel' and self._excel_readable():
             result['greenhouse_gas_data'] = self.extract_data()
         
         # 检查是否有减排行动CSV文件
@@ -1143,7 +959,7 @@ class ExcelDataReader:
             # 创建一个临时的ExcelDataReader实例来读取CSV文件
             csv_reader = ExcelDataReader(csv_file_path)
             result['emission_reductions'] = csv_reader.read_to_list_of_dicts(skip_empty_rows=True)
-            print(f"成功从CSV文件读取 {len(result['emission_reductions'])} 条减排行动数据")
+            logger.info("成功从CSV文件读取 %s 条减排行动数据", len(result['emission_reductions']))
         
         return result 
 
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+流式写出 .docx：word/document.xml 随内容产生逐段写入输出 zip，不在内存中保留整个文档。
+
+python-docx 的 Document 在 save 之前把整个文档的对象模型留在内存里，合并报告有上百个设施章节时，
+内存随整份报告增长。DocumentStream 打开输出 zip 后先写出 document.xml 的开始标签，
+每写完一个章节就把正文中已完成的元素序列化写入 zip 并从文档树中移除，
+内存里只剩当前章节；样式、编号、关系等其余部件在 close() 时由 python-docx 的包一次写出。
+
+    stream = DocumentStream(document, '合并报告.docx')
+    document.add_paragraph('第一节')
+    stream.flush()          # 已添加的正文写入 zip
+    ...
+    stream.close()          # 写出 sectPr、结束标签和其余部件
+"""
+
+import logging
+import zipfile
+
+from docx.opc.pkgwriter import _ContentTypesItem
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.oxml.ns import qn
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+_SECTION_PROPERTIES = qn('w:sectPr')
+
+
+class DocumentStream:
+    def __init__(self, document, output):
+        """
+        Args:
+            document: python-docx 的 Document，之后添加到其中的正文由 flush() 写出
+            output: 输出文件路径或二进制文件对象
+        """
+        self.document = document
+        self._body = document.element.body
+        root = document.element
+        self._names = (self._qualified_name(root), self._qualified_name(self._body))
+        header = self._header()
+        self._zip = zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED)
+        self._part = self._zip.open(self._member(document.part.partname), 'w', force_zip64=True)
+        self._part.write(header)
+        self.closed = False
+        self.bytes_written = 0
+
+    @staticmethod
+    def _member(partname):
+        return partname.lstrip('/')
+
+    @staticmethod
+    def _qualified_name(element):
+        return f'{element.prefix}:{etree.QName(element).localname}'.encode('utf-8')
+
+    def _header(self):
+        """<?xml ...?><w:document 命名空间声明...><w:body>"""
+        root = self.document.element
+        shell = etree.Element(root.tag, attrib=dict(root.attrib), nsmap=root.nsmap)
+        etree.SubElement(shell, self._body.tag)
+        text = etree.tostring(shell, encoding='UTF-8', xml_declaration=True, standalone=True)
+        # 空的 <w:body/> 换成开始标签，两个结束标签留到 close() 写出
+        empty_body = b'<' + self._names[1] + b'/>'
+        return text[:text.rindex(empty_body)] + b'<' + self._names[1] + b'>'
+
+    def _write(self, elements):
+        if not elements:
+            return
+        # 放进一个声明了文档命名空间的容器再序列化，元素上不再重复声明命名空间，写出时去掉容器标签
+        container = etree.Element(self._body.tag, nsmap=self.document.element.nsmap)
+        container.extend(elements)
+        data = etree.tostring(container, encoding='UTF-8', xml_declaration=False)
+        data = data[data.index(b'>') + 1:data.rindex(b'</')]
+        self._part.write(data)
+        self.bytes_written += len(data)
+
+    def flush(self):
+        """把正文中已添加的元素（sectPr 除外）写入 document.xml，并从文档树中移除"""
+        if self.closed:
+            raise ValueError("文档流已关闭")
+        self._write([child for child in self._body if child.tag != _SECTION_PROPERTIES])
+
+    def close(self):
+        """写出剩余正文、sectPr 和结束标签，再写出其余部件，关闭输出 zip"""
+        if self.closed:
+            return
+        self.flush()
+        self._write([child for child in self._body if child.tag == _SECTION_PROPERTIES])
+        self._part.write(b'</' + self._names[1] + b'></' + self._names[0] + b'>')
+        self._part.close()
+        self.closed = True
+
+        try:
+            package = self.document.part.package
+            parts = list(package.iter_parts())
+            for part in parts:
+                part.before_marshal()
+            self._zip.writestr(self._member(CONTENT_TYPES_URI), _ContentTypesItem.from_parts(parts).blob)
+            self._zip.writestr(self._member(PACKAGE_URI.rels_uri), package.rels.xml)
+            for part in parts:
+                # 主文档部件已经流式写出，只写它的关系
+                if part is not self.document.part:
+                    self._zip.writestr(self._member(part.partname), part.blob)
+                if len(part.rels):
+                    self._zip.writestr(self._member(part.partname.rels_uri), part.rels.xml)
+        finally:
+            self._zip.close()
+        logger.debug("流式文档已写出，document.xml 正文 %s 字节", self.bytes_written)
+
+    def abort(self):
+        """出错时关闭输出（写出的文件不完整）"""
+        if not self.closed:
+            self.closed = True
+            self._part.close()
+            self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+向量化的排放汇总：各范围、总排放量和范围三 15 个类别的数值一次装入 NumPy 数组，
+范围三合计、总排放量、范围占比、范围二差异和非零类别筛选都按整列计算。
+
+数组的最后一维是 COLUMNS 中的各列，前面的维度任意：单份报告是 (1, 列)，
+多设施是 (设施, 列)，多设施多年度是 (设施, 年度, 列)。缺失值为 NaN，
+派生规则与 emissions_model.EmissionsModel 相同，model() 取出单份报告的模型。
+
+    matrix = EmissionsMatrix.from_records([data_a, data_b, data_c])
+    matrix.total_location             # 每份报告的总排放量（基于位置）
+    matrix.shares['scope_3']          # 每份报告范围三的占比
+    groups, totals = matrix.rollup(['集团A', '集团A', '集团B'])   # 按分组汇总
+"""
+
+import numpy as np
+
+from emissions_model import (CSV_SCOPE_KEYS, SCOPE3_CATEGORY_NUMBERS, EmissionsModel, parse_number,
+                             scope3_category_key)
+
+SCOPES = ('scope_1', 'scope_2_location', 'scope_2_market', 'scope_3')
+TOTALS = ('total_location', 'total_market')
+COLUMNS = SCOPES + TOTALS + tuple(f'category_{number}' for number in SCOPE3_CATEGORY_NUMBERS)
+COLUMN_INDEX = {name: i for i, name in enumerate(COLUMNS)}
+_CATEGORIES = slice(len(SCOPES) + len(TOTALS), len(COLUMNS))
+_CATEGORY_NUMBERS = np.array(SCOPE3_CATEGORY_NUMBERS)
+
+# 数据字典中总排放量的键
+TOTAL_KEYS = {
+    'total_location': 'total_emission_location',
+    'total_market': 'total_emission_market',
+}
+
+# simple_report_generator 没有分类数据时，各类别按范围三的固定比例拆分（示例拆分）
+EXAMPLE_SCOPE3_SPLIT = {1: 0.1, 2: 0.1, 3: 0.1, 4: 0.1, 5: 0.1, 6: 0.1, 7: 0.1, 9: 0.1, 10: 0.05, 12: 0.05}
+
+
+def record_values(data):
+    """
+    把一份数据字典解析为 COLUMNS 顺序的 float 列表，缺失或无法解析的为 NaN。
+
+    与 EmissionsModel.from_data 相同：兼容 CSV 键名（scope_1_emissions 等）和 AIService 键名（scope_1 等），
+    数据源给出的总排放量为 0 时视为缺失。
+    """
+    values = []
+    for csv_key, name in CSV_SCOPE_KEYS.items():
+        value = parse_number(data.get(csv_key))
+        if value is None:
+            value = parse_number(data.get(name))
+        values.append(np.nan if value is None else value)
+    for name in TOTALS:
+        values.append(parse_number(data.get(TOTAL_KEYS[name])) or np.nan)
+    for number in SCOPE3_CATEGORY_NUMBERS:
+        value = parse_number(data.get(scope3_category_key(number)))
+        values.append(np.nan if value is None else value)
+    return values
+
+
+def percentage(numerator, denominator):
+    """numerator / denominator * 100，分母为 0 或任一方缺失时为 NaN"""
+    valid = ~np.isnan(numerator) & ~np.isnan(denominator) & (denominator != 0)
+    return np.divide(numerator, denominator, out=np.full(np.shape(numerator), np.nan), where=valid) * 100
+
+
+def split_scope3(scope_3, split=None):
+    """
+    按固定比例把范围三拆分到各类别。
+
+    Args:
+        scope_3: 范围三排放量，数值或任意形状的数组（多份报告一起拆分）
+        split: {类别编号: 比例}，默认 EXAMPLE_SCOPE3_SPLIT
+
+    Returns:
+        {scope_3_category_N_emissions: 排放量}；scope_3 为数值时值为 float，为数组时值为同形状的数组
+    """
+    split = split or EXAMPLE_SCOPE3_SPLIT
+    amounts = np.multiply.outer(np.asarray(scope_3, dtype=float), np.fromiter(split.values(), dtype=float))
+    amounts = np.moveaxis(amounts, -1, 0)
+    if amounts.ndim == 1:
+        amounts = amounts.tolist()
+    return {scope3_category_key(number): amount for number, amount in zip(split, amounts)}
+
+
+class EmissionsMatrix:
+    def __init__(self, values):
+        """
+        Args:
+            values: 形状为 (..., len(COLUMNS)) 的数组，列顺序见 COLUMNS，缺失值为 NaN
+        """
+        values = np.array(values, dtype=float)
+        if values.ndim == 0 or values.shape[-1] != len(COLUMNS):
+            raise ValueError(f"排放数组的最后一维应为 {len(COLUMNS)} 列，实际形状为 {values.shape}")
+        self.values = values
+        column = self.column
+
+        categories = values[..., _CATEGORIES]
+        present = ~np.isnan(categories)
+        # 非零类别：数值存在且不为 0
+        self.category_mask = present & (categories != 0)
+        self.category_total = np.where(present, categories, 0.0).sum(axis=-1)
+
+        # 范围三缺失时由各类别求和
+        scope_3 = column('scope_3')
+        self.scope_3 = np.where(np.isnan(scope_3) & present.any(axis=-1), self.category_total, scope_3)
+        self.scope_1 = column('scope_1')
+        self.scope_2_location = column('scope_2_location')
+        self.scope_2_market = column('scope_2_market')
+
+        # 总排放量缺失时由各范围求和（范围三缺失按 0 计）
+        scope_3_or_zero = np.nan_to_num(self.scope_3)
+        self.total_location = self._total(column('total_location'), self.scope_2_location, scope_3_or_zero)
+        self.total_market = self._total(column('total_market'), self.scope_2_market, scope_3_or_zero)
+
+        # 各范围占总排放量（基于位置）的百分比
+        self.shares = {name: percentage(getattr(self, name), self.total_location)
+                       for name in ('scope_1', 'scope_2_location', 'scope_3')}
+        # 范围二基于市场相对基于位置的差异
+        self.scope_2_delta = self.scope_2_market - self.scope_2_location
+        self.scope_2_delta_pct = percentage(self.scope_2_delta, self.scope_2_location)
+
+    def _total(self, given, scope_2, scope_3_or_zero):
+        computed = self.scope_1 + scope_2 + scope_3_or_zero
+        return np.where(np.isnan(given), computed, given)
+
+    @classmethod
+    def from_records(cls, records):
+        """由数据字典列表构建 (报告数, 列) 的数组，每个数值只解析一次"""
+        values = [record_values(data) for data in records]
+        return cls(np.array(values, dtype=float).reshape(len(values), len(COLUMNS)))
+
+    def column(self, name):
+        """原始列（数据源给出的值），形状为 values.shape[:-1]"""
+        return self.values[..., COLUMN_INDEX[name]]
+
+    @property
+    def shape(self):
+        return self.values.shape[:-1]
+
+    @property
+    def categories(self):
+        """各类别排放量，形状为 (..., 15)，第 i 列是类别 i + 1"""
+        return self.values[..., _CATEGORIES]
+
+    def resolved(self):
+        """补齐派生值（范围三合计、总排放量）后的数组，汇总时按此相加"""
+        values = self.values.copy()
+        for name in ('scope_3', 'total_location', 'total_market'):
+            values[..., COLUMN_INDEX[name]] = getattr(self, name)
+        return values
+
+    def nonzero_categories(self, index=0):
+        """第 index 份报告中排放量不为 0 的范围三类别编号，按编号排列；只有一份报告（一维）时忽略 index"""
+        mask = self.category_mask if self.category_mask.ndim == 1 else self.category_mask[index]
+        return _CATEGORY_NUMBERS[mask].tolist()
+
+    def rollup(self, keys):
+        """
+        按分组键汇总第一维。各列只对存在的值求和，组内全部缺失时仍为 NaN。
+
+        Args:
+            keys: 长度等于第一维的分组键（设施所属集团、年度等）
+
+        Returns:
+            (有序的分组键数组, 形状为 (分组数, ...) 的 EmissionsMatrix)
+        """
+        keys = np.asarray(keys)
+        if keys.shape != self.shape[:1]:
+            raise ValueError(f"分组键数量 {keys.shape} 与报告数 {self.shape[:1]} 不一致")
+        groups, inverse = np.unique(keys, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        starts = np.searchsorted(inverse[order], np.arange(len(groups)))
+        values = self.resolved()[order]
+        present = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+        sums[~np.logical_or.reduceat(present, starts, axis=0)] = np.nan
+        return groups, EmissionsMatrix(sums)
+
+    def total(self):
+        """汇总第一维（整个组合），返回少一维的 EmissionsMatrix"""
+        if not self.shape:
+            return self
+        if not self.shape[0]:
+            return EmissionsMatrix(np.full(self.shape[1:] + (len(COLUMNS),), np.nan))
+        return self.rollup(np.zeros(self.shape[0], dtype=int))[1][0]
+
+    def __getitem__(self, index):
+        values = self.values[index]
+        if values.ndim == 0 or values.shape[-1] != len(COLUMNS):
+            raise IndexError("只能按报告维度索引，不能取出单列")
+        return EmissionsMatrix(values)
+
+    def model(self, index=0):
+        """取出一份报告的 EmissionsModel（用原始列构建，派生规则相同）；只有一份报告（一维）时忽略 index"""
+        row = self.values if self.values.ndim == 1 else self.values[index]
+        if row.ndim != 1:
+            raise IndexError("model() 的索引应定位到单份报告")
+        value = lambda name: None if np.isnan(row[COLUMN_INDEX[name]]) else float(row[COLUMN_INDEX[name]])
+        categories = {int(number): float(amount) for number, amount in zip(_CATEGORY_NUMBERS, row[_CATEGORIES])
+                      if not np.isnan(amount)}
+        return EmissionsModel(scope_3_categories=categories, **{name: value(name) for name in SCOPES + TOTALS})
+
+    def __repr__(self):
+        return f'<EmissionsMatrix shape={self.shape}>'
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+多设施、多年度的排放汇总立方体。
+
+每份提取结果（ExcelDataReader.extract_data() 的数据字典）是一个设施一个年度的盘查。
+EmissionsCube 把许多份盘查装入一个 (设施, 年度, 列) 的 emissions_aggregation.EmissionsMatrix，
+设施和年度各有索引；按属性分组汇总、按年度汇总和同比变化都是整个数组上的运算，
+consolidated_context() 生成可以直接交给 DocxTemplate.render 的合并报告上下文。
+
+    cube = EmissionsCube.from_inventories(inventories, attributes=('region',))
+    groups, by_region = cube.group_by('region')       # (分组, 年度) 的汇总
+    change, change_pct = cube.year_over_year()        # 每个设施总排放量的同比变化
+    template.render(cube.consolidated_context(2024, company_name='某集团'))
+"""
+
+import logging
+import re
+
+import numpy as np
+
+from emissions_aggregation import COLUMNS, EmissionsMatrix, percentage, record_values
+from emissions_model import format_amount
+
+logger = logging.getLogger(__name__)
+
+_YEAR = re.compile(r'(\d{4})')
+
+
+def parse_year(value):
+    """2024、'2024'、'2024年1月1日至...' 解析为 int，无法解析时返回 None"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _YEAR.search(str(value))
+    return int(match.group(1)) if match else None
+
+
+def _amount(value):
+    return format_amount(None if np.isnan(value) else float(value))
+
+
+def _percent(value):
+    return None if np.isnan(value) else f"{value:.1f}%"
+
+
+class EmissionsCube:
+    def __init__(self, facilities, years, values, attributes=None):
+        """
+        Args:
+            facilities: 设施名称序列，对应第一维
+            years: 年度（int）序列，对应第二维，按升序排列
+            values: 形状为 (设施数, 年度数, len(COLUMNS)) 的数组，缺失值为 NaN
+            attributes: {属性名: 按设施排列的属性值}，用于 group_by
+        """
+        self.facilities = tuple(facilities)
+        self.years = tuple(int(year) for year in years)
+        if list(self.years) != sorted(set(self.years)):
+            raise ValueError(f"年度必须升序且不重复: {self.years}")
+        self.matrix = EmissionsMatrix(values)
+        if self.matrix.shape != (len(self.facilities), len(self.years)):
+            raise ValueError(f"排放数组形状 {self.matrix.shape} 与设施数 {len(self.facilities)}、"
+                             f"年度数 {len(self.years)} 不一致")
+        self.facility_index = {name: i for i, name in enumerate(self.facilities)}
+        self.year_index = {year: i for i, year in enumerate(self.years)}
+        self.attributes = {name: np.asarray(values, dtype=object)
+                           for name, values in (attributes or {}).items()}
+
+    @classmethod
+    def from_inventories(cls, inventories, facility_key='company_name', year_key='report_year', attributes=()):
+        """
+        由提取结果列表构建立方体。每个数值只解析一次，之后一次性写入数组。
+
+        Args:
+            inventories: 数据字典的可迭代对象
+            facility_key: 设施名称所在的键，或接收数据字典返回设施名称的函数
+            year_key: 年度所在的键（值可以是 2024、'2024' 或盘查覆盖周期文本）
+            attributes: 要记录的设施属性键（如 'region'），同一设施取最后一份盘查中的值
+
+        同一设施同一年度有多份盘查时使用后出现的一份；缺少设施或年度的盘查跳过并记录警告。
+        """
+        facility_of = facility_key if callable(facility_key) else (lambda data: data.get(facility_key))
+        facilities, years, rows = [], [], []
+        facility_attributes = {}
+        for position, data in enumerate(inventories):
+            facility = facility_of(data)
+            year = parse_year(data.get(year_key))
+            if facility is None or year is None:
+                logger.warning("第 %s 份盘查缺少设施或年度，已跳过", position + 1)
+                continue
+            facilities.append(facility)
+            years.append(year)
+            rows.append(record_values(data))
+            facility_attributes[facility] = {name: data.get(name) for name in attributes}
+
+        # 设施按首次出现的顺序编号
+        ids = {}
+        facility_ids = np.array([ids.setdefault(facility, len(ids)) for facility in facilities], dtype=np.intp)
+        year_values, year_ids = np.unique(np.asarray(years, dtype=int), return_inverse=True)
+
+        values = np.full((len(ids), len(year_values), len(COLUMNS)), np.nan)
+        if rows:
+            # 重复的 (设施, 年度) 只保留最后一份
+            cells = facility_ids * len(year_values) + year_ids
+            _, last = np.unique(cells[::-1], return_index=True)
+            keep = len(cells) - 1 - last
+            if len(keep) < len(cells):
+                logger.warning("%s 份盘查与同一设施同一年度的后续盘查重复，使用后出现的一份", len(cells) - len(keep))
+            values[facility_ids[keep], year_ids[keep]] = np.asarray(rows, dtype=float)[keep]
+        attribute_columns = {name: [facility_attributes[facility][name] for facility in ids]
+                             for name in attributes}
+        return cls(list(ids), year_values.tolist(), values, attribute_columns)
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def select(self, facilities=None, years=None):
+        """按设施名称和年度取出子立方体（保持原有顺序）"""
+        facility_ids = (list(range(len(self.facilities))) if facilities is None
+                        else sorted(self.facility_index[name] for name in facilities))
+        year_ids = list(range(len(self.years))) if years is None else sorted(self.year_index[int(y)] for y in years)
+        values = self.matrix.values[np.ix_(facility_ids, year_ids)]
+        attributes = {name: column[facility_ids] for name, column in self.attributes.items()}
+        return EmissionsCube([self.facilities[i] for i in facility_ids], [self.years[i] for i in year_ids],
+                             values, attributes)
+
+    def _group_keys(self, key):
+        if callable(key):
+            return np.array([key(name) for name in self.facilities], dtype=object).astype(str)
+        if isinstance(key, dict):
+            return np.array([key.get(name) for name in self.facilities], dtype=object).astype(str)
+        if key not in self.attributes:
+            raise KeyError(f"未记录的设施属性: {key}")
+        return self.attributes[key].astype(str)
+
+    def group_by(self, key):
+        """
+        按设施属性汇总。
+
+        Args:
+            key: 属性名（from_inventories 的 attributes）、{设施: 分组} 映射或接收设施名称的函数
+
+        Returns:
+            (有序的分组名数组, 形状为 (分组数, 年度数) 的 EmissionsMatrix)
+        """
+        return self.matrix.rollup(self._group_keys(key))
+
+    def by_year(self):
+        """全部设施按年度汇总，形状为 (年度数,) 的 EmissionsMatrix"""
+        return self.matrix.total()
+
+    def year_over_year(self, name='total_location', matrix=None):
+        """
+        相对上一个年度（立方体中的前一个年度）的变化。
+
+        Args:
+            name: EmissionsMatrix 的派生列，如 total_location、scope_1、scope_3
+            matrix: 要比较的矩阵，最后一维为年度，默认为各设施（也可以是 group_by / by_year 的结果）
+
+        Returns:
+            (变化量, 变化百分比)，与输入同形状，第一个年度为 NaN
+        """
+        matrix = self.matrix if matrix is None else matrix
+        values = getattr(matrix, name)
+        change = np.full(values.shape, np.nan)
+        change[..., 1:] = values[..., 1:] - values[..., :-1]
+        previous = np.full(values.shape, np.nan)
+        previous[..., 1:] = values[..., :-1]
+        return change, percentage(change, previous)
+
+    @staticmethod
+    def _row(name, matrix, index):
+        """报告表格行：各范围和总量按千分位格式化"""
+        return {
+            'name': str(name),
+            'scope_1': _amount(matrix.scope_1[index]),
+            'scope_2_location': _amount(matrix.scope_2_location[index]),
+            'scope_2_market': _amount(matrix.scope_2_market[index]),
+            'scope_3': _amount(matrix.scope_3[index]),
+            'total_emission_location': _amount(matrix.total_location[index]),
+            'total_emission_market': _amount(matrix.total_market[index]),
+        }
+
+    def _rows(self, names, matrix, year_id):
+        """(N, 年度) 矩阵在该年度的表格行，附占合计的比例 share 和同比 change_pct"""
+        total = matrix.total_location[:, year_id]
+        share = percentage(total, np.nansum(total))
+        _, change_pct = self.year_over_year(matrix=matrix)
+        return [dict(self._row(name, matrix, (i, year_id)), share=_percent(share[i]),
+                     change_pct=_percent(change_pct[i, year_id]))
+                for i, name in enumerate(names)]
+
+    def consolidated_context(self, year=None, company_name='集团合并', group_by=None):
+        """
+        合并报告的模板上下文：全部设施在该年度的合计，字段与单份报告相同
+        （scope_1_emissions、total_emission_location 等），另外包括：
+
+            facilities         各设施的表格行（name、各范围、总量、share 占合计的比例、change_pct 同比）
+            groups             按 group_by 分组的表格行（没有 group_by 时为空列表）
+            years              各年度合计的表格行（name 为年度）
+            facility_count     该年度有数据的设施数
+            previous_year, total_change, total_change_pct   与上一年度相比的合计变化
+
+        Args:
+            year: 报告年度，默认为最新年度
+            company_name: 合并报告的主体名称
+            group_by: 可选的分组键，见 group_by()
+        """
+        if not self.years:
+            raise ValueError("立方体中没有任何盘查")
+        year = self.years[-1] if year is None else int(year)
+        if year not in self.year_index:
+            raise KeyError(f"立方体中没有 {year} 年的盘查")
+        year_id = self.year_index[year]
+        yearly = self.by_year()
+        model = yearly[year_id].model()
+
+        context = {
+            'company_name': company_name,
+            'report_year': str(year),
+            'reporting_period': f"{year}年1月1日至{year}年12月31日",
+        }
+        context.update(model.template_fields(include_missing=True))
+        present = ~np.isnan(self.matrix.values[:, year_id]).all(axis=-1)
+        context['facility_count'] = int(present.sum())
+        context['facilities'] = [row for row, keep in zip(self._rows(self.facilities, self.matrix, year_id), present)
+                                 if keep]
+        context['groups'] = []
+        if group_by is not None:
+            groups, grouped = self.group_by(group_by)
+            context['groups'] = self._rows(groups, grouped, year_id)
+
+        change, change_pct = self.year_over_year(matrix=yearly)
+        context['years'] = [dict(self._row(y, yearly, j), change_pct=_percent(change_pct[j]))
+                            for j, y in enumerate(self.years)]
+        context['previous_year'] = str(self.years[year_id - 1]) if year_id else None
+        context['total_change'] = None if np.isnan(change[year_id]) else format_amount(float(change[year_id]))
+        context['total_change_pct'] = _percent(change_pct[year_id])
+        return context
+
+    def __repr__(self):
+        return f'<EmissionsCube facilities={len(self.facilities)} years={list(self.years)}>'
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+排放数据模型：保存解析后的原始浮点数，派生汇总只计算一次。
+
+各范围排放、范围三分类、总排放量（基于位置/基于市场）、范围占比和范围二两种口径的差异
+都在构造时算好，格式化（千分位、两位小数）只在渲染时作为视图应用，
+不再在 "格式化成字符串 -> 解析回数字" 之间来回转换。
+"""
+
+# 数据字典中的键 -> 模型属性
+CSV_SCOPE_KEYS = {
+    'scope_1_emissions': 'scope_1',
+    'scope_2_location_based_emissions': 'scope_2_location',
+    'scope_2_market_based_emissions': 'scope_2_market',
+    'scope_3_emissions': 'scope_3',
+}
+# 范围三共 15 个类别
+SCOPE3_CATEGORY_NUMBERS = tuple(range(1, 16))
+
+
+def parse_number(value):
+    """把 '7,122,248.83'、'100t'、数值等解析为 float，无法解析时返回 None。"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace('t', '').replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+def format_amount(value):
+    """渲染视图：保留两位小数并添加千分位分隔符，缺失值显示为 0.00。"""
+    if value is None:
+        return "0.00"
+    return f"{value:,.2f}"
+
+
+def scope3_category_key(number):
+    return f'scope_3_category_{number}_emissions'
+
+
+class EmissionsModel:
+    def __init__(self, scope_1=None, scope_2_location=None, scope_2_market=None, scope_3=None,
+                 scope_3_categories=None, total_location=None, total_market=None):
+        """
+        Args:
+            scope_1, scope_2_location, scope_2_market, scope_3: 各范围排放量（tCO2e），缺失为 None
+            scope_3_categories: {类别编号: 排放量}，scope_3 缺失时由各类别求和
+            total_location, total_market: 数据源直接给出的总排放量；缺失时由各范围求和
+        """
+        self.scope_1 = scope_1
+        self.scope_2_location = scope_2_location
+        self.scope_2_market = scope_2_market
+        self.scope_3_categories = dict(scope_3_categories or {})
+        if scope_3 is None and self.scope_3_categories:
+            scope_3 = sum(self.scope_3_categories.values())
+        self.scope_3 = scope_3
+
+        if total_location is None and None not in (scope_1, scope_2_location):
+            total_location = scope_1 + scope_2_location + (scope_3 or 0.0)
+        if total_market is None and None not in (scope_1, scope_2_market):
+            total_market = scope_1 + scope_2_market + (scope_3 or 0.0)
+        self.total_location = total_location
+        self.total_market = total_market
+
+        # 各范围占总排放量（基于位置）的百分比
+        self.shares = {}
+        if total_location:
+            for name in ('scope_1', 'scope_2_location', 'scope_3'):
+                value = getattr(self, name)
+                if value is not None:
+                    self.shares[name] = value / total_location * 100
+
+        # 范围二基于市场相对基于位置的差异
+        self.scope_2_delta = None
+        self.scope_2_delta_pct = None
+        if scope_2_location is not None and scope_2_market is not None:
+            self.scope_2_delta = scope_2_market - scope_2_location
+            if scope_2_location:
+                self.scope_2_delta_pct = self.scope_2_delta / scope_2_location * 100
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        从数据字典构建模型，兼容 CSV 键名（scope_1_emissions 等）和 AIService 键名（scope_1 等）。
+
+        每次都按数据字典当前的值构建：调用方（如 Web 接口）覆盖了某些字段后，汇总值随之更新。
+        """
+        values = {}
+        for csv_key, name in CSV_SCOPE_KEYS.items():
+            value = parse_number(data.get(csv_key))
+            values[name] = value if value is not None else parse_number(data.get(name))
+        categories = {}
+        for number in SCOPE3_CATEGORY_NUMBERS:
+            value = parse_number(data.get(scope3_category_key(number)))
+            if value is not None:
+                categories[number] = value
+        return cls(
+            scope_3_categories=categories,
+            total_location=parse_number(data.get('total_emission_location')) or None,
+            total_market=parse_number(data.get('total_emission_market')) or None,
+            **values,
+        )
+
+    def top_scope3_categories(self, limit):
+        """排放量为正的范围三类别，按排放量从大到小（相同时按编号）取前 limit 个，返回 [(编号, 排放量)]。"""
+        categories = [(number, value) for number, value in self.scope_3_categories.items() if value > 0]
+        categories.sort(key=lambda item: (-item[1], item[0]))
+        return categories[:limit]
+
+    def template_fields(self, include_missing=False):
+        """
+        渲染视图：模板和 AIService 使用的格式化字符串字段。
+
+        总排放量总是给出（缺失时为 0.00）；各范围只给出有数值的，
+        include_missing 为 True 时缺失的范围也给出 0.00（合并报告等需要完整字段的模板）。
+        """
+        fields = {
+            'total_emission_location': format_amount(self.total_location),
+            'total_emission_market': format_amount(self.total_market),
+        }
+        for csv_key, name in CSV_SCOPE_KEYS.items():
+            value = getattr(self, name)
+            if value is not None or include_missing:
+                fields[csv_key] = fields[name] = format_amount(value)
+        for number, value in sorted(self.scope_3_categories.items()):
+            fields[scope3_category_key(number)] = format_amount(value)
+        return fields
+
+    def __eq__(self, other):
+        return isinstance(other, EmissionsModel) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return (f"EmissionsModel(scope_1={self.scope_1!r}, scope_2_location={self.scope_2_location!r}, "
+                f"scope_2_market={self.scope_2_market!r}, scope_3={self.scope_3!r}, "
+                f"total_location={self.total_location!r}, total_market={self.total_market!r})")
@@ -0,0 +1,605 @@
+# -*- coding: utf-8 -*-
+"""
+声明式提取计划：用 JSON 描述字段、工作表、标签、取值方向和回退策略，
+编译成每个工作表一个的访问器，一次逐行遍历解析该表上的所有字段。
+
+不同版式的盘查清册只需要一份新的计划文件，不需要新代码。计划格式：
+
+    {
+      "name": "default",
+      "sheets": {"main": {"candidates": ["温室气体盘查清册", ...], "required": true}, ...},
+      "fields": [
+        {"name": "company_name", "sheet": "main",
+         "strategies": [{"label": "组织名称：", "direction": "right"}]},
+        {"name": "report_year", "sheet": "main",
+         "strategies": [{"label": "盘查覆盖周期", "direction": "right", "pattern": "(\\d{4})\\s*年"}]},
+        ...
+      ]
+    }
+
+每个字段按顺序尝试 strategies，第一个得到非空值的策略生效，都没有结果时使用 default。策略类型：
+
+    label  标签匹配：第一个包含（match 为 "exact" 时等于）label 的单元格，按 direction
+           （right/left/below/above）或 value（{"row": 行偏移, "col": 列偏移} 或 {"column": "B"}）取值；
+           when 为附加条件（同样的位置写法加 contains），不满足的匹配跳过；
+           type 为 "number" 时非数值结果视为空；pattern 为正则表达式时取值改为其中第一个分组
+           （没有分组时为整个匹配），不匹配视为空
+    near   邻近搜索：在包含 near 的单元格周围 radius 范围内找大于 min_value 的数值，
+           且其周围 context.rows 行、context.columns 列内有包含 context.contains 的单元格；
+           有 closest_to 时选与这些字段之和最接近的候选，否则选第一个
+    sum    各字段之和，任一字段不是数值时为空
+
+requires_numeric 列出的字段中有非空且不是数值的值时，该字段直接为空。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+
+from openpyxl.utils import column_index_from_string
+
+import layout_store as layouts
+import metrics
+import sheet_cache as sheet_cache_module
+import xlsx_stream
+from string_table import StringTable
+
+logger = logging.getLogger(__name__)
+
+PLAN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extraction_plans')
+DEFAULT_PLAN_PATH = os.path.join(PLAN_DIR, 'default.json')
+
+_DIRECTIONS = {
+    'right': (0, 1),
+    'left': (0, -1),
+    'below': (1, 0),
+    'above': (-1, 0),
+}
+
+
+class PlanError(ValueError):
+    """提取计划格式错误"""
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _as_float(value):
+    """可以被 float() 解析的值返回 float，否则返回 None。"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _CellRef:
+    """相对于匹配单元格的位置：行偏移，加上列偏移或绝对列。"""
+
+    def __init__(self, spec, field_name):
+        if isinstance(spec, str):
+            if spec not in _DIRECTIONS:
+                raise PlanError(f"字段 {field_name}: 未知的方向 {spec}")
+            self.row, self.col = _DIRECTIONS[spec]
+            self.column = None
+        else:
+            self.row = int(spec.get('row', 0))
+            self.col = int(spec.get('col', 0))
+            self.column = column_index_from_string(spec['column']) if 'column' in spec else None
+
+    def resolve(self, row, col):
+        return row + self.row, self.column if self.column is not None else col + self.col
+
+
+class _LabelStrategy:
+    kind = 'label'
+
+    def __init__(self, spec, field_name):
+        self.label = str(spec['label']).lower()
+        self.exact = spec.get('match', 'contains') == 'exact'
+        if 'value' in spec:
+            self.target = _CellRef(spec['value'], field_name)
+        else:
+            self.target = _CellRef(spec.get('direction', 'right'), field_name)
+        self.when = None
+        if 'when' in spec:
+            self.when = (_CellRef(spec['when'], field_name), str(spec['when']['contains']).lower())
+        self.number_only = spec.get('type') == 'number'
+        try:
+            self.pattern = re.compile(spec['pattern']) if 'pattern' in spec else None
+        except re.error as e:
+            raise PlanError(f"字段 {field_name}: 无效的 pattern {spec['pattern']}: {e}")
+        self.rows_needed = max(abs(self.target.row), abs(self.when[0].row) if self.when else 0)
+
+    def matches(self, text):
+        return text == self.label if self.exact else self.label in text
+
+
+class _NearStrategy:
+    kind = 'near'
+
+    def __init__(self, spec, field_name):
+        self.label = str(spec['near']).lower()
+        self.radius = int(spec.get('radius', 4))
+        self.min_value = float(spec.get('min_value', 0))
+        context = spec.get('context') or {}
+        self.context_label = str(context['contains']).lower() if 'contains' in context else None
+        self.context_rows = int(context.get('rows', 3))
+        self.context_columns = int(context.get('columns', 5))
+        self.closest_to = list(spec.get('closest_to') or [])
+        self.rows_needed = self.radius + (self.context_rows if self.context_label else 0)
+
+    def matches(self, text):
+        return self.label in text
+
+
+class _SumStrategy:
+    kind = 'sum'
+    rows_needed = 0
+
+    def __init__(self, spec, field_name):
+        self.fields = list(spec['sum'])
+
+
+_STRATEGY_TYPES = (('label', _LabelStrategy), ('near', _NearStrategy), ('sum', _SumStrategy))
+
+
+def _compile_strategy(spec, field_name):
+    for key, strategy_class in _STRATEGY_TYPES:
+        if key in spec:
+            return strategy_class(spec, field_name)
+    raise PlanError(f"字段 {field_name}: 无法识别的策略 {spec}")
+
+
+class _Field:
+    def __init__(self, spec):
+        if 'name' not in spec:
+            raise PlanError(f"字段缺少 name: {spec}")
+        self.name = spec['name']
+        self.sheet = spec.get('sheet')
+        self.default = spec.get('default')
+        self.requires_numeric = list(spec.get('requires_numeric') or [])
+        self.strategies = [_compile_strategy(s, self.name) for s in spec.get('strategies', [])]
+        if any(s.kind != 'sum' for s in self.strategies) and not self.sheet:
+            raise PlanError(f"字段 {self.name}: 按标签取值的字段必须指定 sheet")
+
+
+class _RowWindow:
+    """保存最近若干行的值，按 (行号, 列号) 读取，超出窗口或表格范围的单元格为 None。"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def cell(self, row, col):
+        values = self.rows.get(row)
+        if values is None or col < 1 or col > len(values):
+            return None
+        return values[col - 1]
+
+
+class SheetVisitor:
+    """
+    单个工作表的访问器：逐行接收单元格值，一次遍历解析该表上所有策略的结果。
+
+    行先进入窗口，等后面 rows_needed 行都到达后再处理，因此 below、邻近搜索等
+    需要读取下方单元格的策略也只需要一次遍历。
+
+    遍历时记录每个策略用到的单元格坐标（layout()），相同版式的工作表可以用 replay()
+    只遍历到最后一个标签为止，不再遍历整个工作表。
+    """
+
+    def __init__(self, strategies, strings=None):
+        """
+        Args:
+            strategies: 该工作表的策略
+            strings: 可选的 string_table.StringTable（工作簿共用），默认新建
+        """
+        self.strategies = strategies
+        # 每个不同的单元格文本只与各策略匹配一次：文本 -> 匹配的策略
+        self.strings = strings if strings is not None else StringTable()
+        self._matched = {}
+        self.lookahead = max((s.rows_needed for s in strategies), default=0)
+        self.window = _RowWindow()
+        self._pending = deque()
+        self.results = {}
+        # 标签策略匹配到的标签单元格坐标
+        self.positions = {}
+        # 邻近策略：匹配到的标签单元格坐标和候选值 (值, 行, 列)
+        self.near_labels = {s.index: [] for s in strategies if s.kind == 'near'}
+        self.candidates = {s.index: [] for s in strategies if s.kind == 'near'}
+
+    def feed(self, row_index, values):
+        self.window.rows[row_index] = values
+        self._pending.append(row_index)
+        while self._pending and self._pending[0] <= row_index - self.lookahead:
+            self._visit(self._pending.popleft())
+
+    def finish(self):
+        while self._pending:
+            self._visit(self._pending.popleft())
+        # 字符串表和匹配缓存只在遍历时使用（并行提取时访问器要传回主进程）
+        self.strings = None
+        self._matched = None
+        return self
+
+    def _visit(self, row):
+        values = self.window.rows[row]
+        open_labels = [s for s in self.strategies if s.kind == 'label' and s.index not in self.results]
+        near = [s for s in self.strategies if s.kind == 'near']
+        if open_labels or near:
+            for col, value in enumerate(values, start=1):
+                if value is None:
+                    continue
+                for strategy in self._matching(value):
+                    if strategy.kind == 'label':
+                        if strategy.index not in self.results:
+                            self._resolve_label(strategy, row, col)
+                    else:
+                        self.near_labels[strategy.index].append((row, col))
+                        self._collect_near(strategy, row, col)
+        # 窗口只保留仍可能被读取的行
+        self.window.rows.pop(row - self.lookahead, None)
+
+    def _matching(self, value):
+        """标签包含在单元格文本中的标签策略和邻近策略；每个不同的文本只匹配一次"""
+        text = value if isinstance(value, str) else str(value)
+        matched = self._matched.get(text)
+        if matched is None:
+            lowered = self.strings.lowered[self.strings.intern(text)]
+            matched = self._matched[text] = tuple(
+                s for s in self.strategies if s.kind in ('label', 'near') and s.matches(lowered))
+        return matched
+
+    def _label_value(self, strategy, row, col):
+        """标签单元格满足 when 条件时返回 (True, 值)，否则返回 (False, None)。"""
+        if strategy.when is not None:
+            ref, contains = strategy.when
+            context = self.window.cell(*ref.resolve(row, col))
+            if context is None or contains not in str(context).lower():
+                return False, None
+        value = self.window.cell(*strategy.target.resolve(row, col))
+        if strategy.number_only and not _is_number(value):
+            value = None
+        if strategy.pattern is not None and value is not None:
+            found = strategy.pattern.search(str(value))
+            value = (found.group(1) if strategy.pattern.groups else found.group(0)) if found else None
+        return True, value
+
+    def _resolve_label(self, strategy, row, col):
+        matched, value = self._label_value(strategy, row, col)
+        if matched:
+            self.results[strategy.index] = value
+            self.positions[strategy.index] = (row, col)
+
+    def _is_candidate(self, strategy, value):
+        return _is_number(value) and value > strategy.min_value
+
+    def _collect_near(self, strategy, row, col):
+        radius = strategy.radius
+        for r in range(row - radius, row + radius + 1):
+            for c in range(col - radius, col + radius + 1):
+                value = self.window.cell(r, c)
+                if not self._is_candidate(strategy, value):
+                    continue
+                if strategy.context_label is None or self._has_context(strategy, r, c):
+                    self.candidates[strategy.index].append((value, r, c))
+
+    def _has_context(self, strategy, row, col):
+        for r in range(row - strategy.context_rows, row + strategy.context_rows + 1):
+            for c in range(col - strategy.context_columns, col + strategy.context_columns + 1):
+                value = self.window.cell(r, c)
+                if value is not None and strategy.context_label in str(value).lower():
+                    return True
+        return False
+
+    def layout(self):
+        """遍历得到的坐标，按策略顺序排列，可以 JSON 序列化。"""
+        layout = []
+        for strategy in self.strategies:
+            if strategy.kind == 'label':
+                position = self.positions.get(strategy.index)
+                layout.append(list(position) if position else None)
+            else:
+                layout.append({
+                    'labels': [list(p) for p in self.near_labels[strategy.index]],
+                    'candidates': [[r, c] for _, r, c in self.candidates[strategy.index]],
+                })
+        return layout
+
+    def state(self):
+        """遍历结果（取值、坐标和候选值），可以 JSON 序列化，用于按工作表内容缓存。"""
+        return {
+            'results': [[index, value] for index, value in self.results.items()],
+            'positions': [[index, list(position)] for index, position in self.positions.items()],
+            'near_labels': [[index, [list(p) for p in labels]] for index, labels in self.near_labels.items()],
+            'candidates': [[index, [list(c) for c in candidates]] for index, candidates in self.candidates.items()],
+        }
+
+    @classmethod
+    def from_state(cls, strategies, state):
+        """由 state() 的结果恢复访问器，不读取工作表。"""
+        visitor = cls(strategies)
+        visitor.window = None
+        visitor.results = {index: value for index, value in state['results']}
+        visitor.positions = {index: tuple(position) for index, position in state['positions']}
+        visitor.near_labels = {index: [tuple(p) for p in labels] for index, labels in state['near_labels']}
+        visitor.candidates = {index: [tuple(c) for c in candidates] for index, candidates in state['candidates']}
+        return visitor
+
+    @classmethod
+    def replay_rows(cls, strategies, layout):
+        """
+        按 layout() 读取时需要遍历到的最后一行；不能按版式读取时返回 None。
+
+        标签策略取第一个匹配的单元格，只要前面的行与记录一致，后面的行就不影响结果。
+        邻近策略收集整个工作表中的匹配，记录中未找到的标签也可能出现在后面任何一行，
+        这两种情况只能完整遍历。
+        """
+        if not isinstance(layout, list) or len(layout) != len(strategies):
+            return None
+        last = 0
+        for strategy, entry in zip(strategies, layout):
+            if strategy.kind != 'label' or entry is None:
+                return None
+            last = max(last, entry[0])
+        return last + max((s.rows_needed for s in strategies), default=0)
+
+    @classmethod
+    def replay(cls, strategies, sheet, layout):
+        """
+        按 layout() 记录的版式读取工作表：只遍历到记录的最后一个标签（再加上 lookahead 行）为止。
+
+        这些行按与完整遍历相同的规则匹配，每个标签必须仍然在记录的坐标第一次匹配，
+        指纹之外的行中移动或新出现的标签都会使校验失败。
+
+        Returns:
+            结果与完整遍历相同的访问器；版式不一致或不能按版式读取时返回 None（需要完整遍历）
+        """
+        last = cls.replay_rows(strategies, layout)
+        if last is None:
+            return None
+        if sheet.max_row:
+            last = min(last, sheet.max_row)
+        visitor = cls(strategies)
+        for row_index, values in enumerate(sheet.iter_rows(min_row=1, max_row=last, values_only=True), start=1):
+            visitor.feed(row_index, values)
+        visitor.finish()
+        return visitor if visitor.layout() == layout else None
+
+
+class CompiledPlan:
+    """编译后的提取计划：字段按工作表分组，每个工作表只遍历一次。"""
+
+    def __init__(self, spec):
+        self.name = spec.get('name', 'unnamed')
+        # 记录的版式坐标与策略顺序对应，计划内容变化时版式键随之变化
+        self.fingerprint = hashlib.sha256(
+            json.dumps(spec, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+        self.sheets = {}
+        for alias, sheet_spec in (spec.get('sheets') or {}).items():
+            candidates = sheet_spec.get('candidates') or [alias]
+            self.sheets[alias] = (list(candidates), bool(sheet_spec.get('required')))
+        self.fields = [_Field(f) for f in spec.get('fields', [])]
+
+        names = set()
+        for field in self.fields:
+            if field.sheet and field.sheet not in self.sheets:
+                raise PlanError(f"字段 {field.name}: 未定义的工作表 {field.sheet}")
+            referenced = list(field.requires_numeric)
+            for strategy in field.strategies:
+                referenced += getattr(strategy, 'fields', []) + getattr(strategy, 'closest_to', [])
+            unknown = [name for name in referenced if name not in names]
+            if unknown:
+                raise PlanError(f"字段 {field.name}: 引用的字段必须在它之前定义: {', '.join(unknown)}")
+            names.add(field.name)
+
+        self.sheet_strategies = {}
+        for field in self.fields:
+            for strategy in field.strategies:
+                if strategy.kind != 'sum':
+                    strategies = self.sheet_strategies.setdefault(field.sheet, [])
+                    # 访问器的结果按策略在所属工作表中的序号保存，可以跨进程传递
+                    strategy.index = len(strategies)
+                    strategies.append(strategy)
+
+    def resolve_sheet_names(self, sheetnames):
+        """
+        按候选顺序为每个工作表别名选出实际工作表名。
+
+        Returns:
+            {别名: 工作表名或 None}；缺少 required 工作表时返回 None
+        """
+        resolved = {}
+        for alias, (candidates, required) in self.sheets.items():
+            resolved[alias] = next((name for name in candidates if name in sheetnames), None)
+            if resolved[alias] is None and required:
+                logger.warning("提取计划 %s: 未找到工作表 %s", self.name, ' / '.join(candidates))
+                return None
+        return resolved
+
+    def new_visitor(self, alias, strings=None):
+        return SheetVisitor(self.sheet_strategies.get(alias, []), strings)
+
+    def visit_sheet(self, alias, sheet):
+        """完整遍历一个工作表（普通或只读模式均可），返回完成的访问器。"""
+        # xlsx_stream 的工作簿自带字符串表，同一工作簿的各工作表共用
+        visitor = self.new_visitor(alias, getattr(sheet.parent, 'strings', None))
+        for row_index, values in enumerate(sheet.iter_rows(min_row=1, min_col=1, values_only=True), start=1):
+            visitor.feed(row_index, values)
+        return visitor.finish()
+
+    def sheet_aliases(self):
+        """需要遍历的工作表别名"""
+        return list(self.sheet_strategies)
+
+    def resolve_fields(self, visitors):
+        """由各工作表访问器的结果按字段顺序计算字段值。"""
+        values = {}
+        for field in self.fields:
+            values[field.name] = self._resolve_field(field, visitors.get(field.sheet), values)
+        return values
+
+    def _resolve_field(self, field, visitor, values):
+        for name in field.requires_numeric:
+            if values.get(name) is not None and _as_float(values[name]) is None:
+                return field.default
+
+        for strategy in field.strategies:
+            if strategy.kind == 'sum':
+                numbers = [_as_float(values.get(name)) for name in strategy.fields]
+                value = sum(numbers) if None not in numbers else None
+            elif visitor is None:
+                value = None
+            elif strategy.kind == 'label':
+                value = visitor.results.get(strategy.index)
+            else:
+                value = self._choose_near(strategy, visitor, values)
+            if value is not None:
+                return value
+        return field.default
+
+    @staticmethod
+    def _choose_near(strategy, visitor, values):
+        candidates = [value for value, _, _ in visitor.candidates.get(strategy.index) or []]
+        if not candidates:
+            return None
+        if strategy.closest_to:
+            numbers = [_as_float(values.get(name)) for name in strategy.closest_to]
+            if None not in numbers:
+                expected = sum(numbers)
+                return min(candidates, key=lambda value: abs(value - expected))
+        return candidates[0]
+
+    def extract(self, workbook, layout_store=None):
+        """
+        在工作簿（openpyxl 普通或只读模式，或 xlsx_stream.StreamWorkbook）上执行计划，每个相关工作表只遍历一次。
+
+        Args:
+            workbook: 工作簿
+            layout_store: 可选的 layout_store.LayoutStore。工作表版式已记录时只遍历到最后一个标签并校验坐标，
+                          未记录或校验失败时完整遍历并记录新版式
+
+        Returns:
+            {字段名: 值}；缺少 required 工作表时返回 None
+        """
+        sheet_names = self.resolve_sheet_names(workbook.sheetnames)
+        if sheet_names is None:
+            return None
+        visitors = {alias: self._read_sheet(alias, workbook[name], layout_store)
+                    for alias, name in self._sheet_assignments(sheet_names)}
+        return self.resolve_fields(visitors)
+
+    def extract_incremental(self, source, sheet_cache, layout_store=None, backend=None):
+        """
+        按工作表内容哈希复用缓存的遍历结果，只解析内容变化过的工作表。
+
+        工作表哈希是各部件解压后内容的 SHA-256（sheet_cache.sheet_part_hashes），所有工作表都命中时不打开工作簿；
+        否则以只读模式打开一次，只读取变化的工作表。字段值总是由各工作表的结果重新计算（不读取工作表）。
+
+        Args:
+            source: .xlsx 文件路径或二进制文件对象
+            sheet_cache: sheet_cache.SheetCache
+            layout_store: 可选的 layout_store.LayoutStore，用于变化的工作表
+            backend: 读取变化工作表的后端，见 xlsx_stream.open_workbook
+
+        Returns:
+            {字段名: 值}；缺少 required 工作表时返回 None；不是有效的 .xlsx 时抛出 ValueError
+        """
+        hashes = sheet_cache_module.sheet_part_hashes(source)
+        if hashes is None:
+            raise ValueError("不是有效的 .xlsx 文件")
+        sheet_names = self.resolve_sheet_names(list(hashes))
+        if sheet_names is None:
+            return None
+
+        visitors = {}
+        changed = {}
+        for alias, name in self._sheet_assignments(sheet_names):
+            key = sheet_cache_module.sheet_cache_key(self.fingerprint, alias, name, hashes[name])
+            state = sheet_cache.get(key)
+            if state is not None:
+                visitors[alias] = SheetVisitor.from_state(self.sheet_strategies[alias], state)
+            else:
+                changed[alias] = (name, key)
+        metrics.REGISTRY.inc(metrics.SHEET_CACHE_LOOKUPS, value=len(visitors), result='hit')
+        metrics.REGISTRY.inc(metrics.SHEET_CACHE_LOOKUPS, value=len(changed), result='miss')
+
+        if changed:
+            logger.debug("提取计划 %s: 重新解析工作表 %s", self.name, ', '.join(name for name, _ in changed.values()))
+            with metrics.span('workbook_load'):
+                workbook = xlsx_stream.open_workbook(source, backend, read_only=True)
+            try:
+                for alias, (name, key) in changed.items():
+                    visitor = self._read_sheet(alias, workbook[name], layout_store)
+                    sheet_cache.put(key, visitor.state())
+                    visitors[alias] = visitor
+            finally:
+                workbook.close()
+                if hasattr(source, 'seek'):
+                    source.seek(0)
+        return self.resolve_fields(visitors)
+
+    def _sheet_assignments(self, sheet_names):
+        """[(别名, 工作表名)]，只包含计划需要遍历且工作簿中存在的工作表"""
+        return [(alias, sheet_names[alias]) for alias in self.sheet_aliases() if sheet_names.get(alias) is not None]
+
+    def _read_sheet(self, alias, sheet, layout_store):
+        """读取一个工作表：版式已记录时只遍历到最后一个标签为止，否则完整遍历（并记录版式）。"""
+        if layout_store is None:
+            return self.visit_sheet(alias, sheet)
+
+        strategies = self.sheet_strategies[alias]
+        fingerprint = layouts.sheet_fingerprint(sheet, [s.label for s in strategies])
+        key = layouts.layout_key(self.fingerprint, alias, fingerprint)
+        layout = layout_store.get(key)
+        if layout is not None:
+            visitor = SheetVisitor.replay(strategies, sheet, layout)
+            if visitor is not None:
+                metrics.REGISTRY.inc(metrics.LAYOUT_LOOKUPS, result='hit')
+                return visitor
+            metrics.REGISTRY.inc(metrics.LAYOUT_LOOKUPS, result='stale')
+            logger.info("提取计划 %s: 工作表 %s 已记录的版式校验失败，重新搜索标签", self.name, sheet.title)
+        else:
+            metrics.REGISTRY.inc(metrics.LAYOUT_LOOKUPS, result='miss')
+
+        visitor = self.visit_sheet(alias, sheet)
+        layout = visitor.layout()
+        # 有邻近策略或未找到的标签时结果依赖整个工作表，不记录版式
+        if SheetVisitor.replay_rows(strategies, layout) is not None:
+            layout_store.put(key, layout)
+        return visitor
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def compile_plan(spec):
+    """编译计划字典（不缓存）"""
+    return CompiledPlan(spec)
+
+
+def load_plan(path=None):
+    """
+    读取并编译计划文件，按 (路径, 修改时间) 缓存编译结果。
+
+    Args:
+        path: 计划文件路径，默认使用环境变量 EXTRACTION_PLAN，再默认使用内置的 default.json
+    """
+    path = os.path.abspath(path or os.getenv('EXTRACTION_PLAN') or DEFAULT_PLAN_PATH)
+    key = (path, os.path.getmtime(path))
+    with _cache_lock:
+        plan = _cache.get(key)
+    if plan is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            plan = CompiledPlan(json.load(f))
+        with _cache_lock:
+            _cache[key] = plan
+        logger.debug("已编译提取计划 %s: %s", plan.name, path)
+    return plan
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地的 OpenAI chat.completions 替身，用于压力测试和集成测试。
+
+支持普通和流式（SSE）两种响应，可配置响应延迟、抖动、错误率和回复内容。
+应用通过环境变量 OPENAI_BASE_URL 指向它即可，不会产生真实的 API 调用。
+
+用法：
+    python fake_openai.py --port 8089 --latency 0.5 --jitter 0.2 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake python web_api.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 不含数字和禁用格式的回复，对任何数据都能通过防幻觉校验
+DEFAULT_CONTENT = "企业已完成年度温室气体盘查，范围一、范围二和范围三排放均已核算，并将基于此数据制定下一步减排计划。"
+
+
+class FakeOpenAIServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 content=DEFAULT_CONTENT, chunk_size=8, seed=None):
+        """
+        Args:
+            host, port: 监听地址，port 为 0 时自动分配
+            latency: 每个请求的基础延迟（秒）
+            jitter: 在基础延迟上叠加 [0, jitter) 的随机延迟
+            error_rate: 返回 500 错误的概率
+            content: 回复内容
+            chunk_size: 流式响应每个分片的字符数
+            seed: 随机种子
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.content = content
+        self.chunk_size = chunk_size
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'streams': 0}
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _draw(self):
+        """在锁内抽取随机数，返回 (是否注入错误, 延迟)。"""
+        with self._lock:
+            self.stats['requests'] += 1
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.stats['errors'] += 1
+            delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+        return fail, delay
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    request = {}
+
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': f'未知接口 {self.path}', 'type': 'not_found'}})
+                    return
+
+                fail, delay = server._draw()
+                if delay:
+                    time.sleep(delay)
+                if fail:
+                    self._send_json(500, {'error': {'message': '注入的服务端错误', 'type': 'server_error'}})
+                    return
+
+                model = request.get('model', 'fake-model')
+                if request.get('stream'):
+                    with server._lock:
+                        server.stats['streams'] += 1
+                    self._stream(model)
+                else:
+                    self._send_json(200, server._completion(model))
+
+            def _stream(self, model):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                content = server.content
+                for start in range(0, len(content), server.chunk_size):
+                    chunk = server._chunk(model, {'content': content[start:start + server.chunk_size]})
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                final = server._chunk(model, {}, finish_reason='stop')
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+    def _completion(self, model):
+        return {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': self.content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(self.content), 'total_tokens': len(self.content)},
+        }
+
+    def _chunk(self, model, delta, finish_reason=None):
+        return {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="本地 OpenAI chat.completions 替身")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5, help="基础延迟（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="随机附加延迟上限（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="返回 500 错误的概率")
+    parser.add_argument('--content', default=DEFAULT_CONTENT, help="回复内容")
+    parser.add_argument('--content-file', default=None, help="从文件读取回复内容")
+    parser.add_argument('--seed', type=int, default=None, help="随机种子")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    content = args.content
+    if args.content_file:
+        with open(args.content_file, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+
+    server = FakeOpenAIServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                              error_rate=args.error_rate, content=content, seed=args.seed)
+    print(f"OpenAI 替身已启动: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
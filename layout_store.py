@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+已知工作簿版式的坐标存储。
+
+大部分上传来自少数几种盘查清册模板。第一次遇到某种版式时完整遍历工作表，
+把每个标签策略匹配到的单元格坐标按版式指纹记录下来；之后相同指纹的工作簿只遍历到最后一个标签为止，
+各标签仍然在记录的坐标第一次匹配时即可使用，不再遍历工作表的其余行。
+邻近策略和未找到的标签依赖整个工作表，这样的工作表不记录版式。
+
+每个工作表的版式保存为 <root>/<key>.json，先写入临时文件再 os.replace，多个工作进程可以共享同一个目录。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# 指纹只读取每个工作表的前若干行，并最多记录这么多个标签单元格
+FINGERPRINT_ROWS = 50
+FINGERPRINT_LABEL_CELLS = 32
+
+
+def sheet_fingerprint(sheet, labels, max_rows=FINGERPRINT_ROWS, max_cells=FINGERPRINT_LABEL_CELLS):
+    """
+    工作表的结构指纹：表名、尺寸，以及前 max_rows 行中包含任一标签的单元格的位置和文本。
+
+    只统计标签单元格，因此公司名称、排放数值等不同的同一模板工作簿指纹相同。
+
+    Args:
+        sheet: openpyxl 工作表
+        labels: 小写的标签文本
+    """
+    digest = hashlib.sha256(json.dumps([sheet.title, sheet.max_row, sheet.max_column],
+                                       ensure_ascii=False).encode('utf-8'))
+    found = 0
+    for row_index, values in enumerate(sheet.iter_rows(min_row=1, max_row=max_rows, values_only=True), start=1):
+        for col_index, value in enumerate(values, start=1):
+            if not isinstance(value, str):
+                continue
+            text = value.lower()
+            if any(label in text for label in labels):
+                digest.update(f'{row_index}:{col_index}:{text}\n'.encode('utf-8'))
+                found += 1
+                if found >= max_cells:
+                    return digest.hexdigest()
+    return digest.hexdigest()
+
+
+def layout_key(plan_fingerprint, alias, fingerprint):
+    """由提取计划、工作表别名和工作表指纹计算版式键。"""
+    parts = [plan_fingerprint, alias, fingerprint]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class LayoutStore:
+    def __init__(self, root):
+        """
+        Args:
+            root: 存储目录
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, default_root='uploads/layouts'):
+        """按环境变量 LAYOUT_STORE_DIR 创建存储；该变量为空字符串时禁用，返回 None。"""
+        root = os.getenv('LAYOUT_STORE_DIR', default_root)
+        return cls(root) if root else None
+
+    def _path(self, key):
+        return os.path.join(self.root, f'{key}.json')
+
+    def get(self, key):
+        """返回记录的工作表版式（各提取策略用到的坐标），未记录时返回 None。"""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                layout = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return layout
+
+    def put(self, key, layout):
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(layout, f, ensure_ascii=False)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        logger.debug("已记录工作簿版式: %s", key)
+
+
+_default_store = None
+_default_store_root = None
+
+
+def default_store():
+    """进程内共享的默认存储，LAYOUT_STORE_DIR 改变时重新创建。"""
+    global _default_store, _default_store_root
+    root = os.getenv('LAYOUT_STORE_DIR', 'uploads/layouts')
+    if root != _default_store_root:
+        _default_store = LayoutStore.from_env()
+        _default_store_root = root
+    return _default_store
@@ -0,0 +1,83 @@
+# logging_config.py
+"""
+统一的日志配置：各模块使用 logging.getLogger(__name__)，由入口程序调用 configure_logging()。
+
+环境变量：
+    LOG_LEVEL   全局日志级别，默认 INFO（调试信息默认关闭，热路径上不产生任何输出开销）
+    LOG_FORMAT  text 或 json，默认 text
+    LOG_LEVELS  按模块设置级别，如 "data_reader=DEBUG,ai_service=WARNING"
+"""
+
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+# configure_logging() 安装的处理器，重复调用时只替换它，不影响其他处理器
+_installed_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，便于日志系统采集和检索。"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def parse_module_levels(spec):
+    """把 "data_reader=DEBUG,ai_service=WARNING" 解析为 {模块名: 级别}。"""
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=None, json_format=None, module_levels=None, stream=None):
+    """
+    配置根日志记录器；参数为 None 时读取对应的环境变量。
+    可重复调用，每次只替换上一次安装的处理器。
+
+    Args:
+        level: 全局日志级别
+        json_format: 是否输出 JSON 格式
+        module_levels: {模块名: 级别}，覆盖全局级别
+        stream: 输出流，默认 stderr
+    """
+    if level is None:
+        level = os.getenv('LOG_LEVEL', 'INFO')
+    if json_format is None:
+        json_format = os.getenv('LOG_FORMAT', 'text').lower() == 'json'
+    if module_levels is None:
+        module_levels = parse_module_levels(os.getenv('LOG_LEVELS'))
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+    global _installed_handler
+    root = logging.getLogger()
+    if _installed_handler is not None:
+        root.removeHandler(_installed_handler)
+    root.addHandler(handler)
+    _installed_handler = handler
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    return handler
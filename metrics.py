@@ -0,0 +1,183 @@
+# metrics.py
+"""
+轻量级的流水线耗时统计。
+
+用法：
+    with metrics.span('render'):
+        template.render(context)
+
+    with metrics.request_timings() as timings:
+        ...  # 期间所有 span 的耗时累加到 timings 字典
+
+各阶段的计数和耗时直方图在进程内聚合，可通过 render_prometheus() 输出为
+Prometheus 文本格式，供 Flask 应用的 /metrics 接口使用。
+
+常用阶段名：workbook_load、label_extraction、csv_parse、ai_call、validation、render、save。
+"""
+
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# 直方图的桶上限（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_DURATION = 'report_stage_duration_seconds'
+STAGE_ERRORS = 'report_stage_errors_total'
+REQUESTS = 'report_requests_total'
+CACHE_LOOKUPS = 'report_cache_lookups_total'
+LAYOUT_LOOKUPS = 'layout_lookups_total'
+SHEET_CACHE_LOOKUPS = 'sheet_cache_lookups_total'
+SNAPSHOT_LOOKUPS = 'sheet_snapshot_lookups_total'
+
+_HELP = {
+    STAGE_DURATION: '各处理阶段耗时（秒）',
+    STAGE_ERRORS: '各处理阶段抛出异常的次数',
+    REQUESTS: '报告生成请求数',
+    CACHE_LOOKUPS: '整份报告缓存的查询次数（按命中与否）',
+    LAYOUT_LOOKUPS: '已知工作表版式的查询次数（hit 命中、miss 未记录、stale 校验失败）',
+    SHEET_CACHE_LOOKUPS: '按工作表内容缓存的提取结果查询次数（按命中与否）',
+    SNAPSHOT_LOOKUPS: '工作表列式快照的查询次数（hit 直接映射、miss 解析后写入）',
+}
+
+
+class MetricsRegistry:
+    """进程内的计数器和直方图，线程安全。"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}    # name -> {labels: value}
+        self._histograms = {}  # name -> {labels: [bucket_counts, sum, count]}
+
+    @staticmethod
+    def _label_key(labels):
+        return tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get(name, {}).get(self._label_key(labels), 0)
+
+    def histogram_count(self, name, **labels):
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(self._label_key(labels))
+            return histogram[2] if histogram else 0
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self):
+        """输出 Prometheus 文本格式（text/plain; version=0.0.4）。"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in _HELP:
+                    lines.append(f"# HELP {name} {_HELP[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+
+            for name in sorted(self._histograms):
+                if name in _HELP:
+                    lines.append(f"# HELP {name} {_HELP[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, (bucket_counts, total, count) in sorted(self._histograms[name].items()):
+                    for upper, bucket_count in zip(self.buckets, bucket_counts):
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', repr(upper)),))} {bucket_count}")
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                    lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(key):
+    if not key:
+        return ''
+    parts = []
+    for label, value in key:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{label}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+REGISTRY = MetricsRegistry()
+
+# 当前请求的耗时字典；不在 request_timings() 中时为 None
+_current_timings = contextvars.ContextVar('report_timings', default=None)
+
+
+@contextmanager
+def span(stage):
+    """
+    统计一个处理阶段的耗时：写入全局直方图，并累加到当前请求的耗时字典。
+    同一阶段在一次请求中出现多次时（如多次标签查找），耗时累加。
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REGISTRY.inc(STAGE_ERRORS, stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        REGISTRY.observe(STAGE_DURATION, elapsed, stage=stage)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def timed(stage):
+    """装饰器形式的 span，用于整个函数都属于同一阶段的情况。"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def request_timings():
+    """收集本次请求（当前线程/上下文）中所有 span 的耗时，产出 {阶段: 秒} 字典。"""
+    timings = {}
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def server_timing_header(timings):
+    """把耗时字典转换为 HTTP Server-Timing 响应头（毫秒）。"""
+    return ', '.join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def render_prometheus():
+    return REGISTRY.render_prometheus()
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+多工作表并行提取：工作表轮流分给各工作进程，进程以只读模式打开工作簿一次，只流式读取分配给它的工作表。
+
+openpyxl 解析工作表 XML 是纯 Python 的 CPU 密集工作，线程受 GIL 限制，因此使用进程池。
+结果按请求的工作表顺序合并，与工作进程完成的先后无关；单个工作表或只有一个工作进程时直接在当前进程执行。
+
+    from parallel_extraction import read_sheets, extract_plan
+    tables = read_sheets('盘查.xlsx', ['设施A', '设施B', '设施C'], max_workers=3)
+    fields = extract_plan('盘查.xlsx')   # 与 ExcelDataReader.extract_data 的 Excel 字段相同
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import extraction_plan
+import metrics
+import xlsx_stream
+from data_reader import sheet_to_dicts
+
+logger = logging.getLogger(__name__)
+
+
+def _open_read_only(path):
+    # 后端由环境变量 EXCEL_BACKEND 选择，工作进程继承同样的设置
+    return xlsx_stream.open_workbook(path, read_only=True)
+
+
+def _read_sheets(path, options, names):
+    """工作进程：只读打开工作簿一次，把分配到的工作表依次转换为列表字典。"""
+    workbook = _open_read_only(path)
+    try:
+        return [sheet_to_dicts(workbook[name], **options) for name in names]
+    finally:
+        workbook.close()
+
+
+def _visit_sheets(path, plan, assignments):
+    """工作进程：只读打开工作簿一次，按提取计划遍历分配到的 (别名, 工作表名)，返回不含行窗口的访问器。"""
+    workbook = _open_read_only(path)
+    try:
+        visitors = [plan.visit_sheet(alias, workbook[name]) for alias, name in assignments]
+    finally:
+        workbook.close()
+    for visitor in visitors:
+        visitor.window = None
+    return visitors
+
+
+def _map_batches(function, path, items, max_workers, *args):
+    """
+    调用 function(path, *args, 分到的 items)：把 items 轮流分给各工作进程（每个进程只打开一次工作簿），
+    按 items 的顺序返回结果。
+
+    只有一个工作进程时直接在当前进程执行。
+    """
+    workers = min(len(items), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return function(path, *args, items) if items else []
+    batches = [items[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(function, path, *args, batch) for batch in batches]
+        batch_results = [future.result() for future in futures]
+    results = [None] * len(items)
+    for i, batch_result in enumerate(batch_results):
+        results[i::workers] = batch_result
+    return results
+
+
+def sheet_names(path):
+    """工作簿中的工作表名（只读模式，不解析工作表内容）。"""
+    workbook = _open_read_only(path)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+@metrics.timed('label_extraction')
+def read_sheets(path, names=None, max_workers=None, **options):
+    """
+    并行读取多个工作表，相当于对每个工作表调用 ExcelDataReader.read_to_list_of_dicts。
+
+    Args:
+        path: 工作簿路径（工作进程各自打开，因此必须是文件路径）
+        names: 要读取的工作表名，默认为全部工作表；不存在的工作表被忽略并记录警告
+        max_workers: 工作进程数，默认为 CPU 核数，不超过工作表数
+        **options: header_row、start_row、end_row、skip_empty_rows、clean_headers
+
+    Returns:
+        {工作表名: [行字典, ...]}，按 names 的顺序排列
+    """
+    available = sheet_names(path)
+    if names is None:
+        names = available
+    found = []
+    for name in names:
+        if name in available:
+            found.append(name)
+        else:
+            logger.warning("找不到工作表 %s", name)
+    return dict(zip(found, _map_batches(_read_sheets, path, found, max_workers, options)))
+
+
+@metrics.timed('label_extraction')
+def extract_plan(path, plan=None, max_workers=None):
+    """
+    按提取计划并行遍历计划涉及的各个工作表，合并为字段值。
+
+    Args:
+        path: 工作簿路径
+        plan: extraction_plan.CompiledPlan，默认使用 extraction_plan.load_plan()
+        max_workers: 工作进程数，默认为 CPU 核数，不超过工作表数
+
+    Returns:
+        {字段名: 值}，与 CompiledPlan.extract 相同；缺少 required 工作表时返回 None
+    """
+    plan = plan or extraction_plan.load_plan()
+    resolved = plan.resolve_sheet_names(sheet_names(path))
+    if resolved is None:
+        return None
+    assignments = [(alias, resolved[alias]) for alias in plan.sheet_aliases() if resolved.get(alias) is not None]
+    visitors = _map_batches(_visit_sheets, path, assignments, max_workers, plan)
+    return plan.resolve_fields({alias: visitor for (alias, _), visitor in zip(assignments, visitors)})
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+整份报告的内容寻址缓存。
+
+相同的输入文件字节、模板版本、公司名称、年份、摘要后端和报告日期生成的 .docx 内容相同，
+命中时直接返回缓存的报告，跳过数据提取、AI 调用和渲染。
+
+缓存目录中每个条目是 <key>.docx 和可选的 <key>.json（元数据，如结果页需要的提取数据）。
+修改时间即最近使用时间：命中时刷新，超出磁盘配额时从最久未使用的条目开始淘汰。
+条目都先写入临时文件再 os.replace，多个工作进程可以共享同一个缓存目录。
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# 影响报告内容的代码有改动、而改动不在 REPORT_SOURCE_FILES 中时递增，使旧缓存全部失效
+REPORT_FORMAT_VERSION = 1
+
+# 决定报告内容的源文件（相对本目录）：写出、数据提取和执行摘要的代码及提取计划，
+# 内容进入 writer_template_version() 的指纹，修改后旧缓存自动失效
+REPORT_SOURCE_FILES = ('report_writer.py', 'data_reader.py', 'extraction_plan.py', 'emissions_model.py',
+                       'ai_service.py', 'response_validator.py')
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def digest_stream(stream):
+    """计算二进制文件对象内容的 SHA-256，计算后把读取位置恢复到开头。"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def file_fingerprint(*paths):
+    """模板、封面图片等文件内容的联合指纹，作为缓存键中的模板版本。"""
+    digest = hashlib.sha256(str(REPORT_FORMAT_VERSION).encode('utf-8'))
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        try:
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            digest.update(b'missing')
+    return digest.hexdigest()
+
+
+def writer_template_version(*extra_paths):
+    """
+    WordReportWriter 生成报告的模板版本。
+
+    包括 REPORT_SOURCE_FILES 和 extraction_plans/*.json 的内容、默认封面图片，
+    以及 extract_data 默认读取的当前目录下的 CSV。其他模块的改动影响报告内容时需递增 REPORT_FORMAT_VERSION。
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = [os.path.join(base_dir, name) for name in REPORT_SOURCE_FILES]
+    plans = sorted(glob.glob(os.path.join(base_dir, 'extraction_plans', '*.json')))
+    return file_fingerprint(*sources, *plans, os.path.join(base_dir, '封面.png'), '减排行动统计.csv', *extra_paths)
+
+
+def report_cache_key(input_digest, template_version, company_name, report_year, summary_backend, report_date):
+    """由所有影响报告内容的输入计算缓存键，report_date 等日期字段必须显式传入。"""
+    parts = [input_digest, template_version, company_name, str(report_year), summary_backend, str(report_date)]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            root: 缓存目录
+            max_bytes: 磁盘配额（字节），为 0 时禁用缓存
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        if self.enabled:
+            os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, default_root='uploads/report_cache'):
+        """按环境变量 REPORT_CACHE_DIR、REPORT_CACHE_MAX_BYTES 创建缓存。"""
+        return cls(
+            os.getenv('REPORT_CACHE_DIR', default_root),
+            max_bytes=int(os.getenv('REPORT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, f'{key}{ext}')
+
+    def get(self, key):
+        """
+        查找缓存条目，命中时返回 (已打开的报告文件, 元数据字典)，未命中返回 None。
+
+        返回已打开的文件而不是路径：即使条目随后被其他进程淘汰，本次读取也不受影响。
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key, '.docx')
+        try:
+            report_file = open(path, 'rb')
+        except OSError:
+            metrics.REGISTRY.inc(metrics.CACHE_LOOKUPS, result='miss')
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        meta = {}
+        try:
+            with open(self._path(key, '.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+        metrics.REGISTRY.inc(metrics.CACHE_LOOKUPS, result='hit')
+        logger.debug("报告缓存命中: %s", key)
+        return report_file, meta
+
+    def put(self, key, source, meta=None):
+        """
+        写入缓存条目并按磁盘配额淘汰旧条目。
+
+        Args:
+            key: report_cache_key() 计算的缓存键
+            source: 报告内容，bytes 或二进制文件对象（从当前位置读到末尾）
+            meta: 可 JSON 序列化的元数据
+        """
+        if not self.enabled:
+            return
+        if meta is not None:
+            self._write(self._path(key, '.json'),
+                        json.dumps(meta, ensure_ascii=False, default=str).encode('utf-8'))
+        # 报告文件最后写入：它存在即表示条目完整
+        self._write(self._path(key, '.docx'), source)
+        self.evict()
+
+    def _write(self, path, source):
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(source, (bytes, bytearray)):
+                    f.write(source)
+                else:
+                    for chunk in iter(lambda: source.read(_CHUNK_SIZE), b''):
+                        f.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def evict(self):
+        """总大小超出配额时，按最近使用时间从旧到新删除条目。返回删除的条目数。"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            key, ext = os.path.splitext(name)
+            if ext != '.docx':
+                continue
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue
+            size = stat.st_size
+            try:
+                size += os.path.getsize(self._path(key, '.json'))
+            except OSError:
+                pass
+            entries.append((stat.st_mtime, key, size))
+            total += size
+
+        removed = 0
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for ext in ('.docx', '.json'):
+                try:
+                    os.remove(self._path(key, ext))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        if removed:
+            logger.info("报告缓存淘汰 %s 个条目", removed)
+        return removed
@@ -6,6 +6,8 @@
 
 from data_reader import ExcelDataReader
 from ai_service import AIService
+import metrics
+from logging_config import configure_logging
 from docxtpl import DocxTemplate
 
 
@@ -34,14 +36,17 @@ def generate_report(csv_path="减排行动统计.csv", output_path="carbon_repor
     template = DocxTemplate("template.docx")
 
     # 6. 渲染模板
-    template.render(context)
+    with metrics.span('render'):
+        template.render(context)
 
     # 7. 保存报告
-    template.save(output_path)
+    with metrics.span('save'):
+        template.save(output_path)
     print(f"报告已生成: {output_path}")
 
     return output_path
 
 
 if __name__ == "__main__":
+    configure_logging()
     generate_report()
\ No newline at end of file
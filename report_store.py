@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+生成报告的存储：每份报告有唯一 ID 和下载令牌，按内容去重，并按 TTL 和总大小清理。
+
+目录结构（所有元数据都在磁盘上，多个工作进程可以共享同一个存储目录）：
+    <root>/blobs/<sha256>.docx     报告内容，相同内容只存一份
+    <root>/records/<id>.json       报告记录：内容哈希、下载令牌哈希、文件名、创建时间
+
+文件都先写入临时文件再 os.replace，读取方不会看到写了一半的内容。
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# 两次自动清理之间的最短间隔
+CLEANUP_INTERVAL = 60.0
+# 未被引用的内容至少保留这么久，避免删掉其他进程刚写入、记录尚未落盘的内容
+ORPHAN_GRACE_SECONDS = 60.0
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class ReportStore:
+    def __init__(self, root, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES,
+                 cleanup_interval=CLEANUP_INTERVAL):
+        """
+        Args:
+            root: 存储目录
+            ttl_seconds: 报告的保留时间（秒），过期后无法下载并会被清理
+            max_bytes: 内容总大小上限，超出时从最早的报告开始淘汰
+            cleanup_interval: put 时自动清理的最短间隔（秒）
+        """
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.cleanup_interval = cleanup_interval
+        self.blob_dir = os.path.join(root, 'blobs')
+        self.record_dir = os.path.join(root, 'records')
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.record_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+
+    @classmethod
+    def from_env(cls, default_root='uploads/reports'):
+        """按环境变量 REPORT_STORE_DIR、REPORT_TTL_SECONDS、REPORT_STORE_MAX_BYTES 创建存储。"""
+        return cls(
+            os.getenv('REPORT_STORE_DIR', default_root),
+            ttl_seconds=float(os.getenv('REPORT_TTL_SECONDS', DEFAULT_TTL_SECONDS)),
+            max_bytes=int(os.getenv('REPORT_STORE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+        )
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, f'{digest}.docx')
+
+    def _record_path(self, report_id):
+        return os.path.join(self.record_dir, f'{report_id}.json')
+
+    def _write_blob(self, source):
+        """把 bytes 或二进制文件对象写入内容存储，返回 (sha256, 字节数)。"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.blob_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(source, (bytes, bytearray)):
+                    chunks = [source]
+                else:
+                    chunks = iter(lambda: source.read(_CHUNK_SIZE), b'')
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+
+            blob_path = self._blob_path(digest.hexdigest())
+            if os.path.exists(blob_path):
+                # 相同内容已存在：只刷新修改时间，让它不被当作孤儿清理
+                os.utime(blob_path)
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, blob_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return digest.hexdigest(), size
+
+    def _write_record(self, report_id, record):
+        fd, temp_path = tempfile.mkstemp(dir=self.record_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(temp_path, self._record_path(report_id))
+
+    def _read_record(self, report_id):
+        try:
+            with open(self._record_path(report_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, source, filename):
+        """
+        保存一份报告。
+
+        Args:
+            source: 报告内容，bytes 或二进制文件对象
+            filename: 下载时显示的文件名
+
+        Returns:
+            (report_id, token)：下载时必须同时提供两者
+        """
+        digest, size = self._write_blob(source)
+        report_id = uuid.uuid4().hex
+        token = secrets.token_urlsafe(24)
+        self._write_record(report_id, {
+            'sha256': digest,
+            'size': size,
+            'filename': filename,
+            'token_hash': _hash_token(token),
+            'created': time.time(),
+        })
+        logger.debug("报告已存储: %s (%s 字节, %s)", report_id, size, digest)
+
+        if time.monotonic() - self._last_cleanup >= self.cleanup_interval:
+            self.cleanup()
+        return report_id, token
+
+    def get(self, report_id, token):
+        """
+        校验下载令牌并返回 (文件路径, 下载文件名)；报告不存在、已过期或令牌不符时返回 None。
+        """
+        if not report_id or not token or not all(c in '0123456789abcdef' for c in report_id):
+            return None
+        record = self._read_record(report_id)
+        if record is None:
+            return None
+        if not hmac.compare_digest(record['token_hash'], _hash_token(token)):
+            return None
+        if time.time() - record['created'] > self.ttl_seconds:
+            return None
+        path = self._blob_path(record['sha256'])
+        if not os.path.exists(path):
+            return None
+        return path, record['filename']
+
+    def cleanup(self, now=None):
+        """
+        删除过期记录，按总大小淘汰最早的记录，再删除不再被引用的内容和超过 TTL 的遗留临时文件。
+        返回删除的记录数。
+        """
+        with self._lock:
+            self._last_cleanup = time.monotonic()
+            now = time.time() if now is None else now
+
+            records = []
+            for name in os.listdir(self.record_dir):
+                if not name.endswith('.json'):
+                    continue
+                report_id = name[:-len('.json')]
+                record = self._read_record(report_id)
+                if record is not None:
+                    records.append((record['created'], report_id, record))
+
+            removed = set()
+            for created, report_id, record in records:
+                if now - created > self.ttl_seconds:
+                    removed.add(report_id)
+
+            # 按内容（去重后）统计总大小，从最早的记录开始淘汰
+            live = sorted(r for r in records if r[1] not in removed)
+            blob_refs = {}
+            for _, report_id, record in live:
+                blob_refs.setdefault(record['sha256'], set()).add(report_id)
+            total = sum(self._blob_size(digest) for digest in blob_refs)
+            for _, report_id, record in live:
+                if total <= self.max_bytes:
+                    break
+                removed.add(report_id)
+                refs = blob_refs[record['sha256']]
+                refs.discard(report_id)
+                if not refs:
+                    total -= self._blob_size(record['sha256'])
+
+            for report_id in removed:
+                try:
+                    os.remove(self._record_path(report_id))
+                except FileNotFoundError:
+                    pass
+
+            referenced = {digest for digest, refs in blob_refs.items() if refs}
+            for name in os.listdir(self.blob_dir):
+                digest, ext = os.path.splitext(name)
+                if ext != '.docx' or digest in referenced:
+                    continue
+                path = os.path.join(self.blob_dir, name)
+                try:
+                    if now - os.path.getmtime(path) > ORPHAN_GRACE_SECONDS:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+            # 写入中途被终止的工作进程留下的临时文件：超过 TTL 的不可能还在写入
+            for directory in (self.blob_dir, self.record_dir):
+                for name in os.listdir(directory):
+                    if not name.endswith('.tmp'):
+                        continue
+                    path = os.path.join(directory, name)
+                    try:
+                        if now - os.path.getmtime(path) > self.ttl_seconds:
+                            os.remove(path)
+                            logger.debug("删除遗留的临时文件: %s", path)
+                    except FileNotFoundError:
+                        pass
+
+            if removed:
+                logger.info("报告存储清理: 删除 %s 条记录", len(removed))
+            return len(removed)
+
+    def _blob_size(self, digest):
+        try:
+            return os.path.getsize(self._blob_path(digest))
+        except FileNotFoundError:
+            return 0
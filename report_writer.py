@@ -1,9 +1,19 @@
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+
 from docx import Document
 from docx.shared import Pt, Inches
 from docx.oxml.ns import qn # 关键：用于处理中文字体
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from datetime import datetime 
 
+import metrics
+from docx_stream import DocumentStream
+
+logger = logging.getLogger(__name__)
+
 class WordReportWriter: 
     def __init__(self, template_path=None, cover_image_path=None): 
         """
@@ -14,18 +24,20 @@ class WordReportWriter:
             cover_image_path: 封面图片路径（暂未使用，当前使用默认路径）
         """
         self.doc = Document() 
-        print("创建新 Word 文档") 
+        logger.debug("创建新 Word 文档")
         self._setup_styles()
         self._setup_page_margins()
         self.template_path = template_path
         self.cover_image_path = cover_image_path 
+        # 流式组装模式下的输出（见 streaming()），每个章节完成后写出
+        self._stream = None
 
     def _setup_styles(self): 
         """
         "样式与内容分离"思想的核心。
         在这里定义好所有"规则"。
         """
-        print("开始设置 Word 样式...") 
+        logger.debug("开始设置 Word 样式...")
         
         # 1. 设置默认（正文）样式 
         style = self.doc.styles['Normal'] 
@@ -44,13 +56,13 @@ class WordReportWriter:
         style.font.size = Pt(16)
         style.paragraph_format.space_after = Pt(12)  # 段后12点
         
-        print("样式设置完成。")
+        logger.debug("样式设置完成。")
         
     def _setup_page_margins(self):
         """
         设置页面边距，匹配模板文档格式。
         """
-        print("设置页面边距...")
+        logger.debug("设置页面边距...")
         sections = self.doc.sections
         for section in sections:
             # 设置标准边距（1英寸 = 2.54厘米）
@@ -58,11 +70,17 @@ class WordReportWriter:
             section.bottom_margin = Inches(1.0)  # 下边距
             section.left_margin = Inches(1.25)  # 左边距
             section.right_margin = Inches(1.25)  # 右边距
-        print("页面边距设置完成。") 
+        logger.debug("页面边距设置完成。")
 
-    def add_title_page(self, company_name, report_year):
+    def add_title_page(self, company_name, report_year, report_date=None):
         """
         添加封面页，完全参照模板1的格式
+
+        Args:
+            company_name: 公司名称
+            report_year: 报告年份
+            report_date: 文件编号、编制日期和修订日期使用的日期（date 或 datetime），默认为今天。
+                         显式传入后，相同输入生成的报告内容完全一致，可以整份缓存
         """
         import os
         from datetime import datetime
@@ -73,8 +91,8 @@ class WordReportWriter:
         script_dir = os.path.dirname(os.path.abspath(__file__))
         cover_image_path = os.path.join(script_dir, "封面.png")
 
-        print(f"尝试查找封面图片: {cover_image_path}")
-        print(f"封面图片是否存在: {os.path.exists(cover_image_path)}")
+        logger.debug("尝试查找封面图片: %s", cover_image_path)
+        logger.debug("封面图片是否存在: %s", os.path.exists(cover_image_path))
 
         # 1. 添加几个空行作为顶部留白
         for _ in range(2):
@@ -87,7 +105,7 @@ class WordReportWriter:
             run = paragraph.add_run()
             # 添加图片，设置适当的宽度（5.5英寸）
             run.add_picture(cover_image_path, width=Inches(5.5))
-            print("已添加封面图片")
+            logger.debug("已添加封面图片")
 
             # 在图片后添加一些空行
             for _ in range(2):
@@ -142,7 +160,7 @@ class WordReportWriter:
         file_number_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
         file_number_paragraph.paragraph_format.space_after = Pt(0)  # 段后不留空
         # 生成基于当前日期的文件编号
-        current_date = datetime.now()
+        current_date = report_date or datetime.now()
         file_number = f"DY-GHG-{current_date.strftime('%Y')}-01"
         file_number_run = file_number_paragraph.add_run(f"文件编号：{file_number}")
         file_number_run.font.size = Pt(14)
@@ -235,10 +253,11 @@ class WordReportWriter:
         preparer_run._element.rPr.rFonts.set(qn('w:eastAsia'), '宋体')
         preparer_paragraph.paragraph_format.line_spacing = 1.5
 
-        print(f"已添加模板格式的封面: {company_name}")
+        logger.debug("已添加模板格式的封面: %s", company_name)
 
         # 添加分页符
         self.doc.add_page_break() 
+        self._end_section()
 
     def add_executive_summary(self, summary):
         """
@@ -247,7 +266,7 @@ class WordReportWriter:
         Args:
             summary: 执行摘要文本内容
         """
-        print("开始添加执行摘要...")
+        logger.debug("开始添加执行摘要...")
         self.doc.add_heading("执行摘要", level=1)
         
         # 添加摘要段落
@@ -256,13 +275,14 @@ class WordReportWriter:
         
         # 添加分页符
         self.doc.add_page_break()
-        print("执行摘要添加完成。")
+        self._end_section()
+        logger.debug("执行摘要添加完成。")
         
     def add_emission_table(self, data): 
         """
         接收数据字典，并动态生成一个表格。
         """
-        print("开始生成排放汇总表...") 
+        logger.debug("开始生成排放汇总表...")
         self.doc.add_heading("1. 排放数据汇总", level=1) 
         
         # 准备要填入表格的数据 
@@ -296,7 +316,90 @@ class WordReportWriter:
             # 确保所有值都是字符串 
             row_cells[1].text = str(value) 
 
-        print("表格生成完毕。") 
+        self._end_section()
+        logger.debug("表格生成完毕。")
+
+    def add_facility_section(self, row):
+        """
+        添加一个设施（或分组）章节：二级标题加排放表格，用于合并报告。
+
+        Args:
+            row: emissions_cube 合并上下文中 facilities / groups 的表格行
+        """
+        self.doc.add_heading(str(row.get('name', '未知设施')), level=2)
+        table_data = [
+            ("范围一(tCO2e)", row.get('scope_1')),
+            ("范围二(基于位置)(tCO2e)", row.get('scope_2_location')),
+            ("范围二(基于市场)(tCO2e)", row.get('scope_2_market')),
+            ("范围三(tCO2e)", row.get('scope_3')),
+            ("总排放量(基于位置)(tCO2e)", row.get('total_emission_location')),
+            ("总排放量(基于市场)(tCO2e)", row.get('total_emission_market')),
+            ("占合计比例", row.get('share')),
+            ("同比变化", row.get('change_pct')),
+        ]
+        table = self.doc.add_table(rows=len(table_data), cols=2)
+        table.style = 'Table Grid'
+        for cells, (item, value) in zip(table.rows, table_data):
+            cells.cells[0].text = item
+            cells.cells[1].text = '—' if value is None else str(value)
+        self._end_section()
+
+    def _end_section(self):
+        """章节完成：流式组装模式下把已添加的正文写入输出并从内存中移除"""
+        if self._stream is not None:
+            self._stream.flush()
+
+    @contextmanager
+    def streaming(self, output_path):
+        """
+        流式组装模式：word/document.xml 随章节产生逐段写入 output_path，
+        内存中只保留当前章节和样式、编号、关系等部件，峰值内存取决于最大的章节而不是整份报告。
+
+        在 with 块中调用 add_title_page、add_facility_section 等方法，正常退出时写出其余部件。
+        output_path 为路径时先写入同目录的临时文件，完成后再 os.replace 到 output_path；
+        出错时删除临时文件并重新抛出，不会留下不完整的报告（输出为文件对象时只关闭输出）。
+        一个写入器只能流式写出一次。
+
+            with writer.streaming('合并报告.docx'):
+                writer.add_title_page(company_name, report_year)
+                for row in facilities:
+                    writer.add_facility_section(row)
+        """
+        temp_path = None
+        if isinstance(output_path, (str, os.PathLike)):
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix='.tmp')
+            os.close(fd)
+        try:
+            stream = DocumentStream(self.doc, temp_path or output_path)
+            self._stream = stream
+            try:
+                yield stream
+            except BaseException:
+                stream.abort()
+                raise
+            with metrics.span('save'):
+                stream.close()
+            if temp_path is not None:
+                output_path = self._move_into_place(temp_path, output_path)
+                temp_path = None
+        finally:
+            self._stream = None
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+        logger.info("文档已流式写出到: %s", output_path)
+
+    @staticmethod
+    def _move_into_place(temp_path, output_path):
+        """把写好的临时文件移动到 output_path；与 save() 相同，文件被锁定时使用时间戳重命名保存"""
+        try:
+            os.replace(temp_path, output_path)
+        except PermissionError:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base_name, ext = os.path.splitext(output_path)
+            output_path = f"{base_name}_{timestamp}{ext}"
+            os.replace(temp_path, output_path)
+            logger.warning("原文件被锁定，已保存为: %s", output_path)
+        return output_path
 
     def save(self, output_path): 
         """
@@ -304,8 +407,9 @@ class WordReportWriter:
         """
         try:
             # 尝试直接保存
-            self.doc.save(output_path)
-            print(f"文档已成功保存到: {output_path}")
+            with metrics.span('save'):
+                self.doc.save(output_path)
+            logger.info("文档已成功保存到: %s", output_path)
             return True
         except PermissionError:
             # 如果文件被锁定，尝试使用时间戳重命名保存
@@ -314,11 +418,12 @@ class WordReportWriter:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             base_name, ext = os.path.splitext(output_path)
             new_output_path = f"{base_name}_{timestamp}{ext}"
-            self.doc.save(new_output_path)
-            print(f"原文件被锁定，已保存为: {new_output_path}")
+            with metrics.span('save'):
+                self.doc.save(new_output_path)
+            logger.warning("原文件被锁定，已保存为: %s", new_output_path)
             return True
         except Exception as e:
-            print(f"保存文件失败: {e}")
+            logger.error("保存文件失败: %s", e)
             return False
 
 # (你可以在文件末尾添加测试代码) 
@@ -327,11 +432,53 @@ class WordReportWriter:
         主方法：整合所有功能，生成完整报告
         
         Args:
-            data: 包含报告所有数据的字典
-            output_path: 输出文件路径
+            data: 包含报告所有数据的字典，可选的 report_date 指定封面日期
+            output_path: 输出文件路径或二进制文件对象
+        """
+        logger.info("开始生成完整报告: %s", output_path)
+
+        with metrics.span('render'):
+            self._compose_report(data)
+
+        # 4. 保存文档
+        return self.save(output_path)
+
+    def write_consolidated_report(self, context, output_path):
+        """
+        以流式组装模式生成合并报告：封面、执行摘要、合计表格，之后每个分组和设施一个章节。
+
+        Args:
+            context: emissions_cube.EmissionsCube.consolidated_context() 的结果，
+                     可选的 executive_summary、report_date
+            output_path: 输出文件路径或二进制文件对象
+
+        Returns:
+            是否成功写出
+        """
+        logger.info("开始流式生成合并报告: %s", output_path)
+        try:
+            with metrics.span('render'), self.streaming(output_path):
+                self.add_title_page(context.get('company_name', '未知公司'),
+                                    context.get('report_year') or datetime.now().year, context.get('report_date'))
+                if context.get('executive_summary'):
+                    self.add_executive_summary(context['executive_summary'])
+                self.add_emission_table(context)
+                if context.get('groups'):
+                    self.doc.add_heading("2. 分组排放汇总", level=1)
+                    for row in context['groups']:
+                        self.add_facility_section(row)
+                self.doc.add_heading(f"{3 if context.get('groups') else 2}. 各设施排放数据", level=1)
+                for row in context.get('facilities', []):
+                    self.add_facility_section(row)
+            return True
+        except Exception as e:
+            logger.error("生成合并报告失败: %s", e)
+            return False
+
+    def _compose_report(self, data):
+        """
+        按数据结构依次添加封面、执行摘要和排放表格（不保存）。
         """
-        print(f"开始生成完整报告: {output_path}")
-        
         # 处理all_data结构，如果存在的话
         if 'greenhouse_gas_data' in data and 'emission_reductions' in data:
             # 获取温室气体数据
@@ -341,15 +488,15 @@ class WordReportWriter:
             
             # 1. 添加封面页
             company_name = ghg_data.get('company_name', '未知公司')
-            report_year = ghg_data.get('report_year', datetime.now().year)
-            self.add_title_page(company_name, report_year)
+            report_year = ghg_data.get('report_year') or datetime.now().year
+            self.add_title_page(company_name, report_year, data.get('report_date'))
             
             # 2. 添加执行摘要（如果有）
             executive_summary = data.get('executive_summary', ghg_data.get('executive_summary'))
             if executive_summary:
                 self.add_executive_summary(executive_summary)
             else:
-                print("警告：未找到执行摘要数据")
+                logger.warning("未找到执行摘要数据")
                 # 添加空页作为替代
                 self.doc.add_page_break()
             
@@ -358,7 +505,7 @@ class WordReportWriter:
             
             # 4. 如果有减排行动数据，添加到报告中
             if emission_reductions:
-                print(f"正在添加 {len(emission_reductions)} 条减排行动数据到报告中")
+                logger.info("正在添加 %s 条减排行动数据到报告中", len(emission_reductions))
                 # 这里可以根据需要添加减排行动表格或内容
                 # 目前模板可能没有预设位置，所以先不添加到报告中
                 # 但可以在控制台输出提示
@@ -366,23 +513,20 @@ class WordReportWriter:
             # 处理旧的数据结构（向后兼容）
             # 1. 添加封面页
             company_name = data.get('company_name', '未知公司')
-            report_year = data.get('report_year', datetime.now().year)
-            self.add_title_page(company_name, report_year)
+            report_year = data.get('report_year') or datetime.now().year
+            self.add_title_page(company_name, report_year, data.get('report_date'))
             
             # 2. 添加执行摘要（如果有）
             executive_summary = data.get('executive_summary')
             if executive_summary:
                 self.add_executive_summary(executive_summary)
             else:
-                print("警告：未找到执行摘要数据")
+                logger.warning("未找到执行摘要数据")
                 # 添加空页作为替代
                 self.doc.add_page_break()
             
             # 3. 添加排放数据表格
             self.add_emission_table(data)
-        
-        # 4. 保存文档
-        return self.save(output_path)
 
 # (你可以在文件末尾添加测试代码) 
 if __name__ == "__main__": 
@@ -0,0 +1,143 @@
+# response_validator.py
+"""
+AI 响应校验器：确保 AI 只做文本润色，不编造数据、不输出禁用格式。
+
+校验器按数据字典构建一次：原始数字解析后存入有序 float 数组，用二分查找做容差匹配；
+数字、禁用格式和幻觉关键词合并成一个预编译正则，一次扫描完成全部检查。
+"""
+
+import re
+from bisect import bisect_right
+
+# AI 响应中禁止出现的格式（Markdown、列表编号等）
+FORBIDDEN_PATTERNS = ['##', '**', '```', '*', '-', '1.', '2.']
+# 可能意味着数据幻觉的推测性词汇
+HALLUCINATION_KEYWORDS = ['预计', '预测', '可能', '大约', '大概', '估计', '推测']
+# 需要与 AI 响应中的数字核对的原始数据字段
+VALIDATED_FIELDS = ['total_emission_location', 'scope_1', 'scope_2_location', 'scope_3']
+
+NUMBER_PATTERN = r'\d+\.?\d*'
+NUMBER_TOLERANCE = 0.01
+MAX_FORBIDDEN_LENGTH = max(len(p) for p in FORBIDDEN_PATTERNS + HALLUCINATION_KEYWORDS)
+
+# 长模式优先，保证 '**' 先于 '*' 匹配
+_FORBIDDEN_ALTERNATION = '|'.join(
+    re.escape(p) for p in sorted(FORBIDDEN_PATTERNS + HALLUCINATION_KEYWORDS, key=len, reverse=True)
+)
+_FORBIDDEN_REGEX = re.compile(_FORBIDDEN_ALTERNATION)
+_NUMBER_REGEX = re.compile(NUMBER_PATTERN)
+_SCAN_REGEX = re.compile(f'(?P<number>{NUMBER_PATTERN})|(?P<forbidden>{_FORBIDDEN_ALTERNATION})')
+# 由数字和小数点组成的禁用模式（如 '1.'）会被数字分支吞掉，需要在数字内部单独检查
+_NUMERIC_FORBIDDEN = [p for p in FORBIDDEN_PATTERNS if re.fullmatch(r'[\d.]+', p)]
+_PERCENT_MARKERS = ('%', '占比', '比例')
+
+
+def find_forbidden_text(content, start=0):
+    """
+    返回 content[start:] 中出现的第一个禁用格式或幻觉关键词，没有则返回 None。
+    """
+    match = _FORBIDDEN_REGEX.search(content, start)
+    if match:
+        return match.group()
+    for pattern in _NUMERIC_FORBIDDEN:
+        if content.find(pattern, start) != -1:
+            return pattern
+    return None
+
+
+class ResponseValidator:
+    def __init__(self, original_data, fields=VALIDATED_FIELDS):
+        """
+        从原始数据字典中解析出所有可信数字，构建有序数组。
+
+        Args:
+            original_data: 提取到的数据字典
+            fields: 需要核对的字段
+        """
+        numbers = []
+        for field in fields:
+            value = original_data.get(field)
+            if value:
+                numbers.extend(float(n) for n in _NUMBER_REGEX.findall(str(value)))
+        self.original_numbers = sorted(numbers)
+
+    def _is_original_number(self, value):
+        """二分查找：是否存在与 value 相差小于容差的原始数字。"""
+        index = bisect_right(self.original_numbers, value - NUMBER_TOLERANCE)
+        return index < len(self.original_numbers) and self.original_numbers[index] < value + NUMBER_TOLERANCE
+
+    def _classify_number(self, token):
+        """
+        与位置无关的数字检查，结果可在同一响应内按 token 复用。
+
+        Returns:
+            (结论, 信息)：结论为 'ok'、'error' 或 'context'（需要结合上下文判断百分比）
+        """
+        for pattern in _NUMERIC_FORBIDDEN:
+            if pattern in token:
+                return 'error', f"警告：AI响应包含禁用格式 {pattern}"
+
+        ai_num = token.lstrip('0') if token != '0' else token
+        try:
+            value = float(ai_num)
+        except ValueError:
+            return 'error', f"警告：AI响应中包含无效数字格式 {ai_num}"
+
+        # 与原始数据一致，或是年份（合理的年份范围：1900-2100）
+        if self._is_original_number(value) or 1900 <= value <= 2100:
+            return 'ok', None
+
+        # 检查是否是小的整数（可能是序号等）
+        if len(ai_num) <= 2 and value < 50:
+            return 'ok', None
+
+        # 0-100 之间的数字只有以百分比形式出现时才可信
+        if 0 <= value <= 100:
+            return 'context', ai_num
+
+        return 'error', f"警告：AI响应中包含未经验证的数字 {ai_num}"
+
+    def _check_number(self, content, token, position, cache):
+        """
+        检查 AI 响应中的单个数字是否可信：与原始数据一致，或是年份、百分比、小序号。
+        返回 None 表示可信，否则返回警告信息。
+        """
+        verdict = cache.get(token)
+        if verdict is None:
+            verdict = cache[token] = self._classify_number(token)
+        result, info = verdict
+        if result == 'ok':
+            return None
+        if result == 'error':
+            return info
+
+        # 检查是否以百分比形式出现
+        ai_num = info
+        number_start = position + len(token) - len(ai_num)
+        context = content[max(0, number_start - 5):number_start + len(ai_num) + 5]
+        if any(marker in context for marker in _PERCENT_MARKERS):
+            return None
+
+        return f"警告：AI响应中包含未经验证的数字 {ai_num}"
+
+    def validate(self, content):
+        """
+        一次扫描校验 AI 响应。
+
+        Returns:
+            (是否通过, 警告信息)；通过时警告信息为 None
+        """
+        cache = {}
+        for match in _SCAN_REGEX.finditer(content):
+            token = match.group('number')
+            if token is None:
+                forbidden = match.group('forbidden')
+                if forbidden in HALLUCINATION_KEYWORDS:
+                    return False, f"警告：AI响应包含可能的幻觉关键词 {forbidden}"
+                return False, f"警告：AI响应包含禁用格式 {forbidden}"
+
+            warning = self._check_number(content, token, match.start(), cache)
+            if warning:
+                return False, warning
+
+        return True, None
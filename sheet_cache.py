@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+按工作表内容缓存提取结果，分析师修改一个单元格后重新上传时只重新解析改动过的工作表。
+
+.xlsx 是 zip 包，每个工作表是一个部件（xl/worksheets/sheetN.xml）。工作表的哈希是它自己的部件和
+所有工作表共用的部件（共享字符串、样式、workbook.xml）解压后内容的 SHA-256，只需解压、不解析 XML：
+只改了数值的工作表只有它自己的哈希变化，改了文本时共享字符串变化，所有工作表都会重新解析。
+缓存由所有上传共享，不能使用 zip 目录中由上传方给出的 CRC32 和大小作为键（可以伪造，也可能碰撞），
+否则会把另一份工作簿的提取结果返回给当前上传；解压时 zipfile 也会校验 CRC32，不一致的包视为无效。
+
+缓存的是提取计划访问器遍历工作表后的结果（SheetVisitor.state()），条目为 <root>/<key>.json，
+先写入临时文件再 os.replace，多个工作进程可以共享同一个目录；超出磁盘配额时淘汰最久未使用的条目。
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import tempfile
+import zipfile
+from xml.etree import ElementTree
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+# 所有工作表共用、会影响单元格取值的部件
+_SHARED_PARTS = ('xl/workbook.xml', 'xl/sharedStrings.xml', 'xl/styles.xml')
+
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _part_digest(archive, infos, name):
+    """部件解压后内容的 SHA-256，部件不存在时为 'missing'"""
+    info = infos.get(name)
+    if info is None:
+        return 'missing'
+    digest = hashlib.sha256()
+    with archive.open(info) as part:
+        for chunk in iter(lambda: part.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_xlsx(source):
+    """只读取 zip 目录和 workbook.xml 判断是否为有效的 .xlsx 包（不解压工作表），读取后恢复到开头"""
+    try:
+        with zipfile.ZipFile(source) as archive:
+            sheet_parts(archive)
+        return True
+    except (OSError, KeyError, zipfile.BadZipFile, ElementTree.ParseError):
+        return False
+    finally:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+
+
+def sheet_parts(archive):
+    """
+    工作簿中各工作表对应的 zip 部件。
+
+    Args:
+        archive: 已打开的 zipfile.ZipFile
+
+    Returns:
+        [(工作表名, 部件路径)]，按工作簿中的顺序排列；缺少 workbook.xml 时抛出 KeyError
+    """
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    targets = {}
+    for rel in rels.iter(f'{_PKG_REL_NS}Relationship'):
+        target = rel.get('Target', '')
+        # 关系目标相对于 xl/，也可能是以 / 开头的包内绝对路径
+        targets[rel.get('Id')] = target[1:] if target.startswith('/') else posixpath.normpath(f'xl/{target}')
+    return [(sheet.get('name'), targets.get(sheet.get(f'{_REL_NS}id')))
+            for sheet in workbook.iter(f'{_MAIN_NS}sheet')]
+
+
+def sheet_part_hashes(source):
+    """
+    各工作表的内容哈希：工作表部件和共用部件解压后内容的 SHA-256。
+
+    Args:
+        source: .xlsx 文件路径或二进制文件对象（读取后恢复到开头）
+
+    Returns:
+        {工作表名: 哈希}，按工作簿中的顺序排列；不是有效的 .xlsx（包括 CRC32 校验失败）时返回 None
+    """
+    try:
+        with zipfile.ZipFile(source) as archive:
+            infos = {info.filename: info for info in archive.infolist()}
+            parts = sheet_parts(archive)
+            shared = '|'.join(_part_digest(archive, infos, name) for name in _SHARED_PARTS)
+            return {name: f'{_part_digest(archive, infos, part)}|{shared}' for name, part in parts}
+    except (OSError, KeyError, zipfile.BadZipFile, ElementTree.ParseError):
+        return None
+    finally:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+
+
+def sheet_cache_key(plan_fingerprint, alias, sheet_name, part_hash):
+    parts = [plan_fingerprint, alias, sheet_name, part_hash]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _encode(value):
+    """JSON 不支持的单元格值（日期时间）编码为带类型标记的字典"""
+    for kind in (datetime.datetime, datetime.date, datetime.time):
+        if isinstance(value, kind):
+            return {'$' + kind.__name__: value.isoformat()}
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def _decode(obj):
+    if len(obj) == 1:
+        (key, value), = obj.items()
+        kind = {'$datetime': datetime.datetime, '$date': datetime.date, '$time': datetime.time}.get(key)
+        if kind is not None:
+            return kind.fromisoformat(value)
+    return obj
+
+
+class SheetCache:
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            root: 缓存目录
+            max_bytes: 磁盘配额（字节）
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, default_root='uploads/sheet_cache'):
+        """按环境变量 SHEET_CACHE_DIR、SHEET_CACHE_MAX_BYTES 创建缓存；SHEET_CACHE_DIR 为空字符串时返回 None。"""
+        root = os.getenv('SHEET_CACHE_DIR', default_root)
+        if not root:
+            return None
+        return cls(root, max_bytes=int(os.getenv('SHEET_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)))
+
+    def _path(self, key):
+        return os.path.join(self.root, f'{key}.json')
+
+    def get(self, key):
+        """返回缓存的访问器状态，未命中时返回 None。命中时刷新修改时间。"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f, object_hook=_decode)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return state
+
+    def put(self, key, state):
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, default=_encode)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """总大小超出配额时，按最近使用时间从旧到新删除条目。"""
+        evict_lru(self.root, '.json', self.max_bytes)
+
+
+def evict_lru(root, suffix, max_bytes, keep=()):
+    """
+    目录中以 suffix 结尾的文件总大小超出 max_bytes 时，按修改时间从旧到新删除。
+
+    keep 中的路径（如刚写入、马上要读取的文件）计入总大小但不删除。
+    """
+    keep = {os.path.abspath(path) for path in keep}
+    entries = []
+    total = 0
+    for name in os.listdir(root):
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(root, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, path, stat.st_size))
+        total += stat.st_size
+    for _, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            # 已被其他进程删除，或（Windows 上）仍被映射
+            continue
+        total -= size
+
+
+_default_cache = None
+_default_cache_root = None
+
+
+def default_cache():
+    """进程内共享的默认缓存，SHEET_CACHE_DIR 改变时重新创建。"""
+    global _default_cache, _default_cache_root
+    root = os.getenv('SHEET_CACHE_DIR', 'uploads/sheet_cache')
+    if root != _default_cache_root:
+        _default_cache = SheetCache.from_env()
+        _default_cache_root = root
+    return _default_cache
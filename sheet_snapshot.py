@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+"""
+解析后工作表的列式二进制快照，多个工作进程用 mmap 共享同一份页缓存。
+
+同一份大型盘查清册会被多个 Flask / 进程池工作进程反复读取（不同的报告变体），
+每个进程各自解析一遍并在内存中各保存一份。快照把解析结果按列写成二进制文件：
+
+    GHGSNAP2 | 头部长度 | 头部 JSON | 填充到 8 字节
+    values   float64[列数 × 行数]  按列连续存放；数值直接存放，字符串、日期等存放字符串池编号
+    kinds    uint8[列数 × 行数]    每个单元格的类型（空、浮点、整数、布尔、字符串、日期时间……）
+             填充到 8 字节
+    strings  uint64                字符串数
+    offsets  uint64[字符串数 + 1]  字符串池中每个字符串的起止位置
+    blob     字符串池（UTF-8，工作表内去重）
+
+写快照时按行块逐块读取工作表，每块按列写到文件中的对应位置，内存中只有一个行块和字符串池的索引，
+不会为整张工作表构建行数 × 列数的网格。
+
+打开快照时用 mmap 只读映射文件，各区段通过 memoryview 直接读取，不复制；
+同一台机器上映射同一文件的所有进程共享操作系统页缓存中的一份数据。
+快照按工作表名和 zip 部件哈希（sheet_cache.sheet_part_hashes）命名，
+工作表内容变化后自动使用新的快照；目录超出配额时淘汰最久未使用的文件。
+
+通过 xlsx_stream.open_workbook(source, backend='snapshot') 或环境变量 EXCEL_BACKEND=snapshot 使用，
+接口与 xlsx_stream 的流式工作簿相同。数值按本机字节序存放，快照只在同一台机器上共享。
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+import metrics
+import sheet_cache
+import xlsx_stream
+from string_table import StringTable
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# 超过该单元格数（行数 × 列数）的工作表不写快照，直接流式读取
+MAX_CELLS = 20_000_000
+
+_MAGIC = b'GHGSNAP2'
+_COUNT = struct.Struct('<Q')
+# 写快照时每个行块的单元格数
+_BLOCK_CELLS = 1 << 20
+# 字符串池超过该大小时暂存到磁盘
+_BLOB_SPOOL_BYTES = 16 * 1024 * 1024
+_HEADER_LENGTH = struct.Struct('<I')
+
+# 单元格类型
+_EMPTY, _FLOAT, _INT, _BOOL, _STR, _BIG_INT, _DATETIME, _DATE, _TIME, _TIMEDELTA = range(10)
+# float64 能精确表示的整数范围
+_MAX_EXACT_INT = 2 ** 53
+
+
+def _parse_timedelta(text):
+    days, seconds, microseconds = (int(part) for part in text.split(','))
+    return datetime.timedelta(days=days, seconds=seconds, microseconds=microseconds)
+
+
+# 存放在字符串池中的类型如何还原
+_DECODERS = {
+    _STR: None,
+    _BIG_INT: int,
+    _DATETIME: datetime.datetime.fromisoformat,
+    _DATE: datetime.date.fromisoformat,
+    _TIME: datetime.time.fromisoformat,
+    _TIMEDELTA: _parse_timedelta,
+}
+
+
+def _encode(value, intern):
+    """单元格值 -> (类型, float64 槽位的值)"""
+    if isinstance(value, bool):
+        return _BOOL, float(value)
+    if isinstance(value, int):
+        if -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT:
+            return _INT, float(value)
+        return _BIG_INT, intern(str(value))
+    if isinstance(value, float):
+        return _FLOAT, value
+    if isinstance(value, datetime.datetime):
+        return _DATETIME, intern(value.isoformat())
+    if isinstance(value, datetime.date):
+        return _DATE, intern(value.isoformat())
+    if isinstance(value, datetime.time):
+        return _TIME, intern(value.isoformat())
+    if isinstance(value, datetime.timedelta):
+        return _TIMEDELTA, intern(f'{value.days},{value.seconds},{value.microseconds}')
+    return _STR, intern(value if isinstance(value, str) else str(value))
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def write_snapshot(path, sheet):
+    """
+    把工作表写成快照文件（先写临时文件再 os.replace，正在映射旧文件的进程不受影响）。
+
+    按行块读取工作表，每块的各列直接写到文件中该列的位置，内存占用与工作表大小无关。
+
+    Args:
+        path: 快照文件路径
+        sheet: 工作表（需要 max_row、max_column 和 iter_rows）
+    """
+    rows, columns = sheet.max_row or 0, sheet.max_column or 0
+    cells = rows * columns
+    pool = {}
+    offsets = array('Q', [0])
+    blob = tempfile.SpooledTemporaryFile(max_size=_BLOB_SPOOL_BYTES)
+
+    def intern(text):
+        string_id = pool.get(text)
+        if string_id is None:
+            string_id = pool[text] = len(pool)
+            data = text.encode('utf-8')
+            blob.write(data)
+            offsets.append(offsets[-1] + len(data))
+        return string_id
+
+    header = {
+        'version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'title': sheet.title,
+        'max_row': rows,
+        'max_column': columns,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    prefix = _MAGIC + _HEADER_LENGTH.pack(len(header_bytes)) + header_bytes
+    values_start = _align(len(prefix))
+    kinds_start = values_start + 8 * cells
+
+    directory = os.path.dirname(path) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with blob, os.fdopen(fd, 'w+b') as f:
+            f.write(prefix + bytes(values_start - len(prefix)))
+            # 空单元格（类型 0、值 0）不需要写出
+            f.truncate(kinds_start + cells)
+
+            block_rows = max(1, _BLOCK_CELLS // max(columns, 1))
+            row_values = sheet.iter_rows(min_row=1, max_row=rows, max_col=columns, values_only=True)
+            for block_start in range(0, rows, block_rows):
+                height = min(block_rows, rows - block_start)
+                values = array('d', bytes(8 * height * columns))
+                kinds = bytearray(height * columns)
+                for offset, row in zip(range(height), row_values):
+                    for column, value in enumerate(row):
+                        if value is not None:
+                            index = column * height + offset
+                            kinds[index], values[index] = _encode(value, intern)
+
+                values_view = memoryview(values)
+                for column in range(columns):
+                    low, high = column * height, (column + 1) * height
+                    if kinds.count(0, low, high) == height:
+                        continue
+                    position = column * rows + block_start
+                    f.seek(values_start + 8 * position)
+                    f.write(values_view[low:high])
+                    f.seek(kinds_start + position)
+                    f.write(kinds[low:high])
+
+            strings_start = _align(kinds_start + cells)
+            f.seek(kinds_start + cells)
+            f.write(bytes(strings_start - kinds_start - cells))
+            f.write(_COUNT.pack(len(pool)))
+            offsets.tofile(f)
+            blob.seek(0)
+            shutil.copyfileobj(blob, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class SnapshotSheet:
+    def __init__(self, path, workbook=None):
+        """
+        只读映射一个快照文件。文件不存在时抛出 FileNotFoundError，格式不对时抛出 ValueError。
+
+        Args:
+            path: 快照文件路径
+            workbook: 所属的 SnapshotWorkbook（字符串去重到它的字符串表中）
+        """
+        self.parent = workbook
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _view(self, start, length, fmt='B'):
+        view = self._buffer[start:start + length]
+        if fmt != 'B':
+            view = view.cast(fmt)
+        self._views.append(view)
+        return view
+
+    def _parse(self):
+        self._buffer = memoryview(self._map)
+        self._views.append(self._buffer)
+        if self._buffer[:len(_MAGIC)] != _MAGIC:
+            raise ValueError("不是工作表快照文件")
+        start = len(_MAGIC)
+        header_length, = _HEADER_LENGTH.unpack_from(self._buffer, start)
+        start += _HEADER_LENGTH.size
+        header = json.loads(bytes(self._buffer[start:start + header_length]).decode('utf-8'))
+        if header.get('version') != FORMAT_VERSION or header.get('byteorder') != sys.byteorder:
+            raise ValueError("快照格式版本或字节序不匹配")
+
+        self.title = header['title']
+        self.max_row = header['max_row']
+        self.max_column = header['max_column']
+        cells = self.max_row * self.max_column
+        start = _align(start + header_length)
+        strings_start = _align(start + 9 * cells)
+        if len(self._buffer) < strings_start + _COUNT.size:
+            raise ValueError("快照文件不完整")
+        strings, = _COUNT.unpack_from(self._buffer, strings_start)
+        if len(self._buffer) < strings_start + _COUNT.size + 8 * (strings + 1):
+            raise ValueError("快照文件不完整")
+        self._values = self._view(start, 8 * cells, 'd')
+        start += 8 * cells
+        self._kinds = self._view(start, cells)
+        start = strings_start + _COUNT.size
+        self._offsets = self._view(start, 8 * (strings + 1), 'Q')
+        start += 8 * (strings + 1)
+        self._blob = self._view(start, self._offsets[-1])
+        if len(self._blob) != self._offsets[-1]:
+            raise ValueError("快照文件不完整")
+        # 已解码的字符串，按池编号缓存（只缓存用到的）
+        self._strings = {}
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        try:
+            self._map.close()
+        except BufferError:
+            # 调用方仍持有 column() 返回的视图，映射在这些视图释放后回收
+            pass
+
+    def _string(self, string_id):
+        text = self._strings.get(string_id)
+        if text is None:
+            text = bytes(self._blob[self._offsets[string_id]:self._offsets[string_id + 1]]).decode('utf-8')
+            if self.parent is not None:
+                text = self.parent.strings.text(text)
+            self._strings[string_id] = text
+        return text
+
+    def _value(self, row, column):
+        if row < 1 or row > self.max_row or column < 1 or column > self.max_column:
+            return None
+        index = (column - 1) * self.max_row + row - 1
+        kind = self._kinds[index]
+        if kind == _EMPTY:
+            return None
+        number = self._values[index]
+        if kind == _FLOAT:
+            return number
+        if kind == _INT:
+            return int(number)
+        if kind == _BOOL:
+            return number != 0
+        text = self._string(int(number))
+        decode = _DECODERS[kind]
+        return text if decode is None else decode(text)
+
+    def column(self, column):
+        """
+        一列的 (类型, float64 值) memoryview，直接指向映射的文件，不复制。
+
+        类型为 1（浮点）、2（整数）、3（布尔）的单元格，值就是数值；其他类型的值是字符串池编号。
+        """
+        start = (column - 1) * self.max_row
+        return self._kinds[start:start + self.max_row], self._values[start:start + self.max_row]
+
+    def cell(self, row, column):
+        return xlsx_stream.StreamCell(row, column, self._value(row, column))
+
+    def iter_rows(self, min_row=None, max_row=None, min_col=None, max_col=None, values_only=False):
+        """与 openpyxl 的 iter_rows 相同，范围默认到工作表尺寸为止。"""
+        min_row = min_row or 1
+        min_col = min_col or 1
+        max_row = max_row or self.max_row
+        max_col = max_col or self.max_column
+        value = self._value
+        for row in range(min_row, max_row + 1):
+            values = tuple(value(row, column) for column in range(min_col, max_col + 1))
+            if values_only:
+                yield values
+            else:
+                yield tuple(xlsx_stream.StreamCell(row, min_col + i, v) for i, v in enumerate(values))
+
+    def __repr__(self):
+        return f'<SnapshotSheet "{self.title}">'
+
+
+def snapshot_key(sheet_name, part_hash):
+    parts = [FORMAT_VERSION, sheet_name, part_hash]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class SnapshotStore:
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            root: 快照目录，多个工作进程共享
+            max_bytes: 磁盘配额（字节）
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, default_root='uploads/snapshots'):
+        """按环境变量 SNAPSHOT_DIR、SNAPSHOT_MAX_BYTES 创建存储；SNAPSHOT_DIR 为空字符串时返回 None。"""
+        root = os.getenv('SNAPSHOT_DIR', default_root)
+        if not root:
+            return None
+        return cls(root, max_bytes=int(os.getenv('SNAPSHOT_MAX_BYTES', DEFAULT_MAX_BYTES)))
+
+    def path(self, sheet_name, part_hash):
+        return os.path.join(self.root, f'{snapshot_key(sheet_name, part_hash)}.snap')
+
+    def open(self, sheet_name, part_hash, workbook=None):
+        """映射已有的快照，没有或已损坏时返回 None。命中时刷新修改时间。"""
+        path = self.path(sheet_name, part_hash)
+        try:
+            sheet = SnapshotSheet(path, workbook)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("工作表快照 %s 无法读取，重新生成: %s", path, e)
+            return None
+        return sheet
+
+    def put(self, sheet_name, part_hash, sheet):
+        """写入快照并按配额淘汰旧快照（刚写入的快照不淘汰），返回快照路径"""
+        path = self.path(sheet_name, part_hash)
+        write_snapshot(path, sheet)
+        sheet_cache.evict_lru(self.root, '.snap', self.max_bytes, keep=(path,))
+        return path
+
+
+class SnapshotWorkbook:
+    def __init__(self, source, store):
+        """
+        Args:
+            source: .xlsx 文件路径或二进制文件对象；不是有效的 .xlsx 时抛出 ValueError
+            store: SnapshotStore
+        """
+        hashes = sheet_cache.sheet_part_hashes(source)
+        if hashes is None:
+            raise ValueError("不是有效的 .xlsx 文件")
+        self._source = source
+        self._store = store
+        self._hashes = hashes
+        self._sheets = {}
+        # 缺少快照时才流式解析原工作簿
+        self._parsed = None
+        self.strings = StringTable()
+
+    @property
+    def sheetnames(self):
+        return list(self._hashes)
+
+    def __contains__(self, name):
+        return name in self._hashes
+
+    def __getitem__(self, name):
+        if name not in self._hashes:
+            raise KeyError(f"Worksheet {name} does not exist.")
+        if name not in self._sheets:
+            self._sheets[name] = self._open_sheet(name)
+        return self._sheets[name]
+
+    def _open_sheet(self, name):
+        part_hash = self._hashes[name]
+        sheet = self._store.open(name, part_hash, self)
+        if sheet is not None:
+            metrics.REGISTRY.inc(metrics.SNAPSHOT_LOOKUPS, result='hit')
+            return sheet
+        metrics.REGISTRY.inc(metrics.SNAPSHOT_LOOKUPS, result='miss')
+
+        if self._parsed is None:
+            self._parsed = xlsx_stream.StreamWorkbook(self._source)
+            self._parsed.strings = self.strings
+        parsed = self._parsed[name]
+        if parsed.max_row * parsed.max_column > MAX_CELLS:
+            logger.info("工作表 %s 过大，不写快照", name)
+            return parsed
+        try:
+            return SnapshotSheet(self._store.put(name, part_hash, parsed), self)
+        except (OSError, ValueError) as e:
+            # 快照写入或映射失败（磁盘已满、被其他进程淘汰等）时直接使用已解析的工作表
+            logger.warning("工作表 %s 的快照不可用，使用解析结果: %s", name, e)
+            return parsed
+
+    def close(self):
+        for sheet in self._sheets.values():
+            if isinstance(sheet, SnapshotSheet):
+                sheet.close()
+        self._sheets = {}
+        if self._parsed is not None:
+            self._parsed.close()
+            self._parsed = None
+        if hasattr(self._source, 'seek'):
+            self._source.seek(0)
+
+
+def open_workbook(source, store=None):
+    """
+    以快照方式打开工作簿：各工作表第一次访问时映射已有的快照，没有时解析并写入快照。
+
+    Args:
+        source: .xlsx 文件路径或二进制文件对象
+        store: SnapshotStore，默认使用 default_store()；快照被禁用时直接返回流式工作簿
+    """
+    store = store if store is not None else default_store()
+    if store is None:
+        return xlsx_stream.StreamWorkbook(source)
+    return SnapshotWorkbook(source, store)
+
+
+_default_store = None
+_default_store_root = None
+
+
+def default_store():
+    """进程内共享的默认存储，SNAPSHOT_DIR 改变时重新创建。"""
+    global _default_store, _default_store_root
+    root = os.getenv('SNAPSHOT_DIR', 'uploads/snapshots')
+    if root != _default_store_root:
+        _default_store = SnapshotStore.from_env()
+        _default_store_root = root
+    return _default_store
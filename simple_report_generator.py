@@ -10,6 +10,9 @@ from datetime import datetime
 from docxtpl import DocxTemplate
 from data_reader import ExcelDataReader
 from ai_service import AIService
+from emissions_aggregation import split_scope3
+import metrics
+from logging_config import configure_logging
 
 def generate_report(excel_file="test_data.xlsx", csv_file="减排行动统计.csv", template_file="模板1.docx"):
     """
@@ -33,11 +36,14 @@ def generate_report(excel_file="test_data.xlsx", csv_file="减排行动统计.cs
     csv_reader = ExcelDataReader(csv_file)
     emission_actions = csv_reader.read_to_list_of_dicts()
 
+    # 工作簿中没有盘查覆盖周期时使用当前年份
+    report_year = excel_data.get('report_year') or str(datetime.now().year)
+
     # 组装完整的 context 字典
     context = {
         # 基本企业信息（来自Excel）
         "company_name": excel_data.get('company_name', '企业名称'),
-        "report_year": excel_data.get('report_year', '2024'),
+        "report_year": report_year,
 
         # 温室气体排放数据（适配模板变量名）
         "scope_1_emissions": excel_data.get('scope_1', 0),
@@ -45,17 +51,8 @@ def generate_report(excel_file="test_data.xlsx", csv_file="减排行动统计.cs
         "scope_2_market-based_emissions": excel_data.get('scope_2_market', 0),
         "scope_3_emissions": excel_data.get('scope_3', 0),
 
-        # 范围3各类别排放量（使用默认值或从scope_3拆分）
-        "scope_3_category_1_emissions": excel_data.get('scope_3', 0) * 0.1,  # 示例拆分
-        "scope_3_category_2_emissions": excel_data.get('scope_3', 0) * 0.1,
-        "scope_3_category_3_emissions": excel_data.get('scope_3', 0) * 0.1,
-        "scope_3_category_4_emissions": excel_data.get('scope_3', 0) * 0.1,
-        "scope_3_category_5_emissions": excel_data.get('scope_3', 0) * 0.1,
-        "scope_3_category_6_emissions": excel_data.get('scope_3', 0) * 0.1,
-        "scope_3_category_7_emissions": excel_data.get('scope_3', 0) * 0.1,
-        "scope_3_category_9_emissions": excel_data.get('scope_3', 0) * 0.1,
-        "scope_3_category_10_emissions": excel_data.get('scope_3', 0) * 0.05,
-        "scope_3_category_12_emissions": excel_data.get('scope_3', 0) * 0.05,
+        # 范围3各类别排放量（从scope_3按示例比例一次拆分）
+        **split_scope3(excel_data.get('scope_3') or 0),
 
         # 企业基本信息（使用默认值）
         "Unified_Social_Credit_Identifier": "91420100MA4L0XX123",
@@ -68,7 +65,7 @@ def generate_report(excel_file="test_data.xlsx", csv_file="减排行动统计.cs
         "company_profile": "企业简介",
 
         # 报告相关变量
-        "reporting_period": f"{excel_data.get('report_year', '2024')}年1月1日至{excel_data.get('report_year', '2024')}年12月31日",
+        "reporting_period": f"{report_year}年1月1日至{report_year}年12月31日",
         "document_number": "文档编号",
         "posted_time": datetime.now().strftime("%Y年%m月%d日"),
         "deadline": "核查截止日期",
@@ -101,17 +98,20 @@ def generate_report(excel_file="test_data.xlsx", csv_file="减排行动统计.cs
 
     # 步骤6: 执行 template.render(context)
     print("=== 步骤6: 渲染报告 ===")
-    template.render(context)
+    with metrics.span('render'):
+        template.render(context)
 
     # 步骤7: 执行 template.save("最终报告.docx")
     print("=== 步骤7: 保存最终报告 ===")
     output_filename = f"碳盘查报告_{context['company_name']}_{context['report_year']}.docx"
-    template.save(output_filename)
+    with metrics.span('save'):
+        template.save(output_filename)
 
     print(f"[SUCCESS] 报告生成成功！输出文件: {output_filename}")
     return output_filename, context
 
 if __name__ == "__main__":
+    configure_logging()
     try:
         output_file, final_context = generate_report()
         print(f"\n=== 最终报告信息 ===")
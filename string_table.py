@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+工作簿内去重的字符串表和工作表位置索引。
+
+盘查清册中同样的文本会重复成千上万次（"固定燃烧"、单位、"tCO2e"），逐个单元格 str(...).lower()
+再比较既浪费内存也浪费时间。StringTable 为每个不同的文本分配一个编号，只保存一份，
+并在加入时算好小写形式（规范化形式在第一次用到时补齐）；一次查询（包含、相等、正则）只对每个不同的文本计算一次，
+结果是编号集合并被缓存，之后判断单元格是否匹配只是整数的集合查找。
+
+SheetIndex 按编号记录工作表中每个非空单元格的位置（行、列打包成一个整数），
+按标签查找时只需检查匹配编号的位置，不再逐个单元格比较。
+
+    strings = StringTable()
+    index = SheetIndex(workbook['温室气体盘查清册'], strings)
+    row, col = index.first(strings.matching('组织名称'))
+"""
+
+import unicodedata
+from array import array
+
+# 位置打包为 行 << _COLUMN_BITS | 列，Excel 最多 16384 列
+_COLUMN_BITS = 16
+_COLUMN_MASK = (1 << _COLUMN_BITS) - 1
+
+
+def normalize_text(text):
+    """规范化形式：全角转半角（NFKC）、转小写并去掉所有空白"""
+    if text.isascii():
+        return ''.join(text.lower().split())
+    return ''.join(unicodedata.normalize('NFKC', text).lower().split())
+
+
+class StringTable:
+    def __init__(self):
+        self._ids = {}
+        # 按编号排列的原文和小写形式
+        self.strings = []
+        self.lowered = []
+        self._normalized = []
+        # 查询键 -> [已检查的字符串数, 匹配的编号集合]，字符串表增长后只检查新加入的部分
+        self._queries = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, value):
+        """返回 str(value) 的编号，第一次出现时加入表中"""
+        text = value if isinstance(value, str) else str(value)
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._ids[text] = string_id
+            self.strings.append(text)
+            self.lowered.append(text.lower())
+        return string_id
+
+    @property
+    def normalized(self):
+        """按编号排列的规范化形式，第一次用到时补齐新加入的字符串"""
+        for text in self.strings[len(self._normalized):]:
+            self._normalized.append(normalize_text(text))
+        return self._normalized
+
+    def text(self, value):
+        """去重后的字符串对象：相同文本总是返回同一个对象"""
+        return self.strings[self.intern(value)]
+
+    def matching(self, needle, exact=False, case_sensitive=False, normalize=False):
+        """
+        包含（exact 为 True 时等于）needle 的字符串编号集合。
+
+        Args:
+            needle: 要查找的文本
+            exact: 是否要求整个文本相等
+            case_sensitive: 是否区分大小写
+            normalize: 不区分大小写时，是否同时忽略全半角和空白的差异
+        """
+        needle = str(needle)
+        if case_sensitive:
+            form, forms = 'text', self.strings
+        elif normalize:
+            form, forms, needle = 'normalized', self.normalized, normalize_text(needle)
+        else:
+            form, forms, needle = 'lowered', self.lowered, needle.lower()
+        if exact:
+            return self._query(('equals', form, needle), forms, needle.__eq__)
+        return self._query(('contains', form, needle), forms, lambda text: needle in text)
+
+    def search(self, regex):
+        """正则表达式（已编译）能在其中找到匹配的字符串编号集合"""
+        return self._query(('search', regex.pattern, regex.flags), self.strings,
+                           lambda text: regex.search(text) is not None)
+
+    def _query(self, key, forms, predicate):
+        entry = self._queries.get(key)
+        if entry is None:
+            entry = self._queries[key] = [0, set()]
+        checked, found = entry
+        for string_id in range(checked, len(forms)):
+            if predicate(forms[string_id]):
+                found.add(string_id)
+        entry[0] = len(forms)
+        return found
+
+
+class SheetIndex:
+    def __init__(self, sheet, strings):
+        """
+        一次遍历工作表，按字符串编号记录非空单元格的位置。
+
+        Args:
+            sheet: 工作表（openpyxl 普通或只读模式，或 xlsx_stream.StreamSheet）
+            strings: 工作簿共用的 StringTable
+        """
+        self.strings = strings
+        self._positions = {}
+        intern = strings.intern
+        for row_index, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+            for col_index, value in enumerate(values, start=1):
+                if value is None:
+                    continue
+                string_id = intern(value)
+                positions = self._positions.get(string_id)
+                if positions is None:
+                    positions = self._positions[string_id] = array('q')
+                positions.append(row_index << _COLUMN_BITS | col_index)
+
+    def first(self, string_ids, min_row=1, max_row=None, column=None):
+        """
+        按行优先顺序第一个文本编号在 string_ids 中的单元格。
+
+        Args:
+            string_ids: 字符串编号集合（StringTable.matching / search 的结果）
+            min_row, max_row: 行范围
+            column: 只在该列（列号）中查找
+
+        Returns:
+            (行, 列)，没有时返回 None
+        """
+        best = None
+        for string_id in string_ids:
+            for packed in self._positions.get(string_id, ()):
+                row, col = packed >> _COLUMN_BITS, packed & _COLUMN_MASK
+                if max_row is not None and row > max_row:
+                    break
+                if row < min_row or (column is not None and col != column):
+                    continue
+                if best is None or packed < best:
+                    best = packed
+                break
+        if best is None:
+            return None
+        return best >> _COLUMN_BITS, best & _COLUMN_MASK
+
+    def positions(self, string_ids):
+        """文本编号在 string_ids 中的所有单元格 [(行, 列)]，按行优先顺序排列"""
+        packed = sorted(p for string_id in string_ids for p in self._positions.get(string_id, ()))
+        return [(p >> _COLUMN_BITS, p & _COLUMN_MASK) for p in packed]
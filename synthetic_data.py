@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成温室气体盘查数据：生成与 test_data.xlsx、减排行动统计.csv 版式一致的工作簿和 CSV，
+用于基准测试和压力测试，不依赖客户数据。
+
+工作簿保留 extract_data 依赖的工作表名和标签位置（温室气体盘查清册、表1温室气体盘查表、
+组织名称：、盘查覆盖周期:、范围一/二/三、基于位置/基于市场、总排放量 等），
+规模（活动数据行数）、工作表数量和噪声（空行、备注、批注列、文本格式数字）均可配置。
+
+用法：
+    python synthetic_data.py workbook 输出.xlsx [--rows 5000] [--sheets 12] [--noise 0.1] [--seed 1]
+    python synthetic_data.py csv 输出.csv [--rows 100000] [--seed 1]
+    python synthetic_data.py corpus 输出目录 --count 50 [--kind xlsx|csv] [--rows 500]
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+
+from openpyxl import Workbook
+
+MAIN_SHEET = '温室气体盘查清册'
+TABLE_SHEET = '表1温室气体盘查表'
+# 真实工作簿中除主表、表1以外的工作表，按顺序补足 sheet_count
+EXTRA_SHEETS = [
+    '温室气体盘查清册 (2)',
+    '表2.1不确定性评估——基于位置',
+    '表2.1不确定性评估——基于市场',
+    '附表1-GWP TABLE',
+    '附表2-EF',
+    '减排行动统计',
+    '活动数据汇总表（GHG基于位置）',
+    '活动数据汇总表（GHG基于市场）',
+    '基准年温室气体清单 (GHG位置)',
+    '基准年温室气体清单（GHG市场）',
+]
+
+_REGIONS = ['华东', '华北', '江南', '西南', '东海', '北方', '中原', '岭南', '湘江', '渤海']
+_INDUSTRIES = ['特殊钢', '精密铸造', '新材料', '化工', '水泥', '电子科技', '纺织', '造纸', '汽车零部件', '铝业']
+_SUFFIXES = ['有限公司', '股份有限公司', '集团有限公司']
+_FACILITIES = ['高炉', '转炉', '电炉', '烧结', '热处理炉', '锅炉', '石灰窑', '车队', '食堂', '办公楼', '变电站', '各工序']
+
+# (GHG排放类别, 排放源, 单位, 排放因子范围[, 活动数据数量级范围])
+SCOPE1_SOURCES = [
+    ('固定燃烧', '天然气燃烧', '10000Nm3', (18.0, 23.0)),
+    ('固定燃烧', '液化石油气燃烧', 't', (2.9, 3.2)),
+    ('固定燃烧', '烟煤燃烧', 't', (2.2, 2.5)),
+    ('固定燃烧', '无烟煤燃烧', 't', (2.3, 2.6)),
+    ('固定燃烧', '洗精煤燃烧', 't', (2.3, 2.6)),
+    ('固定燃烧', '焦炭燃烧', 't', (2.8, 3.1)),
+    ('固定燃烧', '高炉煤气燃烧', '10000Nm3', (7.0, 8.0)),
+    ('移动燃烧', '0#柴油燃烧', 't', (3.0, 3.2)),
+    ('移动燃烧', '92#汽油燃烧', 't', (2.8, 3.0)),
+    ('逸散排放', '制冷剂逸散（R32）', 't', (600.0, 700.0), (-1.0, 1.0)),
+    ('逸散排放', 'CO2逸散', 't', (1.0, 1.0)),
+    ('逸散排放', 'SF6逸散', 't', (23000.0, 25000.0), (-2.0, 0.0)),
+    ('制程排放', '石灰石', 't', (0.42, 0.46)),
+    ('制程排放', '白云石', 't', (0.45, 0.48)),
+    ('制程排放', '电极', 't', (3.5, 3.7)),
+    ('制程排放', '增碳剂', 't', (3.3, 3.5)),
+]
+
+# 范围三类别：{类别号: (类别描述, [(排放源, 单位, 排放因子范围)])}
+SCOPE3_SOURCES = {
+    1: ('外购商品和服务的上游排放', [('铁矿石生产', 't', (0.05, 0.15)), ('废钢生产', 't', (0.02, 0.1)),
+                                  ('合金生产', 't', (2.0, 9.0)), ('耐材生产', 't', (0.5, 2.0))]),
+    2: ('资本货物', [('机械设备购置', '$', (0.0001, 0.0003)), ('电子设备购置', '$', (0.0001, 0.0002))]),
+    3: ('范围一、二相关燃料和能源相关的活动产生的排放', [('洗精煤生产', 't', (0.5, 0.6)), ('天然气生产', '10000Nm3', (5.0, 7.0)),
+                                          ('外购电力上游排放', 'MWh', (0.07, 0.09))]),
+    4: ('上游运输配送产生的排放', [('公路运输', 'tkm', (0.0001, 0.0002)), ('水路运输', 'tkm', (0.00004, 0.00006))]),
+    5: ('运营中产生的废物排放', [('一般固废处置', 't', (0.3, 0.4)), ('污水处理', 't', (2.5, 2.9))]),
+    6: ('商务旅行产生的排放', [('航空出行', 'passenger*km', (0.07, 0.09)), ('酒店住宿', '间*晚', (0.05, 0.06))]),
+    7: ('员工通勤产生的排放', [('通勤车', 'km', (0.3, 0.4)), ('自驾油车', 'passenger*km', (0.02, 0.03))]),
+    9: ('下游运输配送产生的排放', [('公路运输', 'tkm', (0.0001, 0.0002)), ('铁路运输', 'tkm', (0.00004, 0.00006))]),
+    10: ('外销产品加工产生的排放', [('棒材加工', 't', (0.6, 0.8)), ('钢管加工', 't', (0.08, 0.3))]),
+    11: ('外销产品使用产生的排放', [('产品使用', '10000Nm3', (7.0, 8.0))]),
+    12: ('外售产品报废产生的排放', [('产品报废', 't', (0.005, 0.007))]),
+}
+# 范围三各类别的行数权重，类别1最多
+_SCOPE3_WEIGHTS = {1: 8, 2: 4, 3: 3, 4: 2, 5: 2, 6: 1, 7: 1, 9: 2, 10: 2, 11: 1, 12: 1}
+
+SCOPE2_ITEMS = [
+    ('输入能源间接温室气体排放', '外购电力（基于位置）', 'MWh', (0.53, 0.58)),
+    ('输入能源间接温室气体排放', '外购电力（基于市场）', 'MWh', (0.55, 0.62)),
+]
+
+
+def company_name_for(rng):
+    return f"{rng.choice(_REGIONS)}{rng.choice(_INDUSTRIES)}{rng.choice(_SUFFIXES)}"
+
+
+def _activity(rng, ef_range, magnitude=(1.0, 6.0)):
+    """按对数均匀分布生成活动数据，返回 (活动数据, 排放因子, 排放量)。"""
+    amount = round(10 ** rng.uniform(*magnitude), 2)
+    ef = round(rng.uniform(*ef_range), 6)
+    return amount, ef, round(amount * ef, 6)
+
+
+def build_inventory(activity_rows=80, seed=None, company_name=None, year=2024):
+    """
+    生成一份盘查清单：活动数据行及各范围合计。工作簿和 CSV 生成器共用，
+    同一 seed 生成的两种文件数据一致。
+
+    Returns:
+        {'company_name', 'report_year', 'reporting_period', 'items': [...],
+         'scope_1', 'scope_2_location', 'scope_2_market', 'scope_3', 'scope_3_categories',
+         'total_emission_location', 'total_emission_market'}
+    """
+    rng = random.Random(seed)
+    company_name = company_name or company_name_for(rng)
+    activity_rows = max(activity_rows, len(SCOPE2_ITEMS) + 1 + len(SCOPE3_SOURCES))
+
+    scope1_rows = max(1, int(activity_rows * 0.3))
+    scope3_rows = activity_rows - scope1_rows - len(SCOPE2_ITEMS)
+    total_weight = sum(_SCOPE3_WEIGHTS.values())
+    per_category = {c: max(1, scope3_rows * w // total_weight) for c, w in _SCOPE3_WEIGHTS.items()}
+    # 取整造成的差额补给类别1
+    per_category[1] += scope3_rows - sum(per_category.values())
+
+    items = []
+    for i in range(scope1_rows):
+        category, source, unit, ef_range, *magnitude = SCOPE1_SOURCES[i % len(SCOPE1_SOURCES)]
+        amount, ef, emission = _activity(rng, ef_range, *magnitude)
+        items.append({'scope': '范围一', 'category': category, 'source': source,
+                      'facility': rng.choice(_FACILITIES), 'amount': amount, 'unit': unit,
+                      'ef': ef, 'emission': emission})
+
+    electricity = round(10 ** rng.uniform(4.0, 6.5), 2)
+    for category, source, unit, ef_range in SCOPE2_ITEMS:
+        ef = round(rng.uniform(*ef_range), 6)
+        items.append({'scope': '范围二', 'category': category, 'source': source, 'facility': '用电设备',
+                      'amount': electricity, 'unit': unit, 'ef': ef, 'emission': round(electricity * ef, 6)})
+
+    for number in sorted(per_category):
+        label, sources = SCOPE3_SOURCES[number]
+        for i in range(max(0, per_category[number])):
+            source, unit, ef_range = sources[i % len(sources)]
+            amount, ef, emission = _activity(rng, ef_range, magnitude=(2.0, 7.0))
+            items.append({'scope': f'范围三 类别{number}', 'category': label, 'source': source,
+                          'facility': rng.choice(_FACILITIES), 'amount': amount, 'unit': unit,
+                          'ef': ef, 'emission': emission, 'scope3_category': number})
+
+    scope_1 = round(sum(i['emission'] for i in items if i['scope'] == '范围一'), 6)
+    scope_2_location = items[scope1_rows]['emission']
+    scope_2_market = items[scope1_rows + 1]['emission']
+    categories = {n: 0.0 for n in range(1, 16)}
+    for item in items:
+        if 'scope3_category' in item:
+            categories[item['scope3_category']] += item['emission']
+    categories = {n: round(v, 6) for n, v in categories.items()}
+    scope_3 = round(sum(categories.values()), 6)
+
+    return {
+        'company_name': company_name,
+        'report_year': str(year),
+        'reporting_period': f"{year}年1月1日至{year}年12月31日",
+        'items': items,
+        'scope_1': scope_1,
+        'scope_2_location': scope_2_location,
+        'scope_2_market': scope_2_market,
+        'scope_3': scope_3,
+        'scope_3_categories': categories,
+        'total_emission_location': round(scope_1 + scope_2_location + scope_3, 6),
+        'total_emission_market': round(scope_1 + scope_2_market + scope_3, 6),
+    }
+
+
+def _noisy(rng, noise):
+    return noise > 0 and rng.random() < noise
+
+
+def _write_main_sheet(sheet, inventory, rng, noise):
+    sheet.append([None, MAIN_SHEET])
+    sheet.append([])
+    sheet.append([])
+    sheet.append([None, '组织名称：', inventory['company_name']])
+    sheet.append([])
+    sheet.append([None, '盘查覆盖周期:', inventory['reporting_period']])
+    sheet.append([])
+    sheet.append([None, None, None, None, '范围一排放量：', inventory['scope_1']])
+    sheet.append([None, None, None, None, '范围二（基于位置）排放量：', inventory['scope_2_location']])
+    sheet.append([None, None, None, None, '范围二（基于市场）排放量：', inventory['scope_2_market']])
+    sheet.append([None, None, None, None, '范围三排放量：', inventory['scope_3']])
+    sheet.append([None, None, None, None, None, '总排放量', 'CO2', 'CH4', 'N2O'])
+    sheet.append([])
+
+    section = None
+    for item in inventory['items']:
+        if item['scope'] != section:
+            section = item['scope']
+            title = {'范围一': '范围一 直接排放', '范围二': '范围二 外购电间接排放'}.get(section, section)
+            sheet.append([None, title, item['category']])
+        sheet.append([None, None, item['source'], item['facility'], None, item['emission'], item['emission']])
+        if _noisy(rng, noise):
+            sheet.append([])
+
+
+def _write_table_sheet(sheet, inventory, rng, noise):
+    sheet.append(['表1 温室气体盘查表'])
+    sheet.append([])
+    sheet.append(['序号', 'GHG排放类别', '排放源', '设施', '范围', '活动数据', '单位', '排放因子', '排放量(tCO2e)'])
+    sheet.append([])
+
+    first_of_scope = set()
+    for index, item in enumerate(inventory['items'], start=1):
+        amount = item['amount']
+        # 每个范围的第一行可能被提取逻辑直接读取，不加文本格式噪声
+        if item['scope'] in first_of_scope and _noisy(rng, noise / 4):
+            amount = f"{amount:,.2f}"
+        first_of_scope.add(item['scope'])
+
+        row = [index, item['category'], item['source'], item['facility'], item['scope'],
+               amount, item['unit'], item['ef'], item['emission']]
+        if _noisy(rng, noise):
+            row.extend([None, '数据来源：' + rng.choice(['能源台账', '采购记录', '财务报表', '物流单据'])])
+        sheet.append(row)
+
+        if _noisy(rng, noise):
+            sheet.append([])
+        if _noisy(rng, noise / 2):
+            sheet.append([None, '备注：' + rng.choice(['数据已复核', '按月汇总', '估算值', '供应商提供'])])
+
+    sheet.append([])
+    sheet.append(['范围一：直接温室气体排放'])
+    sheet.append(['范围二：输入能源间接温室气体排放'])
+    sheet.append(['范围三排放统计'])
+    for number, value in inventory['scope_3_categories'].items():
+        label = SCOPE3_SOURCES.get(number, ('不相关',))[0]
+        sheet.append([f'范围三 类别{number}：{label}', None, value])
+    sheet.append([])
+
+    sheet.append([None, '范围一', '范围二', '范围三', '总量'])
+    sheet.append(['总排放量', inventory['scope_1'], inventory['scope_2_location'], inventory['scope_3'],
+                  inventory['total_emission_location'], '基于位置'])
+    sheet.append([])
+    sheet.append([])
+    sheet.append([None, '范围一', '范围二', '范围三', '总量'])
+    sheet.append(['总排放量', inventory['scope_1'], inventory['scope_2_market'], inventory['scope_3'],
+                  inventory['total_emission_market'], '基于市场'])
+
+
+def _write_filler_sheet(sheet, name, inventory, rng, noise):
+    """与主要数据无关的附表，行数与活动数据相当，用于还原真实工作簿的体积。"""
+    sheet.append([name])
+    sheet.append(['排放源', '单位', '排放因子', '不确定性(%)', '数据来源'])
+    for item in inventory['items']:
+        sheet.append([item['source'], item['unit'], item['ef'], round(rng.uniform(1, 15), 2),
+                      rng.choice(['IPCC 2006', '国家指南', '行业数据库', '供应商'])])
+        if _noisy(rng, noise):
+            sheet.append([])
+
+
+def generate_workbook(path, activity_rows=80, sheet_count=12, noise=0.0, seed=None,
+                      company_name=None, year=2024):
+    """
+    生成一个合成盘查工作簿。
+
+    Args:
+        path: 输出 .xlsx 路径
+        activity_rows: 表1中的活动数据行数（决定文件规模）
+        sheet_count: 工作表数量（至少 2：主表和表1）
+        noise: 0~1，空行、备注、批注列和文本格式数字出现的概率
+        seed: 随机种子，相同种子生成相同内容
+        company_name: 企业名称，None 时随机生成
+        year: 报告年度
+
+    Returns:
+        build_inventory() 的结果（去掉 items），可作为提取结果的参照
+    """
+    inventory = build_inventory(activity_rows, seed=seed, company_name=company_name, year=year)
+    rng = random.Random(f"{seed}-layout")
+
+    workbook = Workbook(write_only=True)
+    _write_main_sheet(workbook.create_sheet(MAIN_SHEET), inventory, rng, noise)
+    _write_table_sheet(workbook.create_sheet(TABLE_SHEET), inventory, rng, noise)
+
+    extra_names = list(EXTRA_SHEETS)
+    for index in range(max(0, sheet_count - 2)):
+        name = extra_names[index] if index < len(extra_names) else f'附表{index - len(extra_names) + 3}'
+        _write_filler_sheet(workbook.create_sheet(name), name, inventory, rng, noise)
+
+    workbook.save(path)
+    return {k: v for k, v in inventory.items() if k != 'items'}
+
+
+def generate_csv(path, activity_rows=80, seed=None, company_name=None, year=2024, encoding='gbk'):
+    """
+    生成 减排行动统计.csv 版式的 CSV：变量名/值区域，加上范围一、范围二三排放源区域。
+    activity_rows 为排放源区域的总行数。
+
+    Returns:
+        build_inventory() 的结果（去掉 items）
+    """
+    inventory = build_inventory(activity_rows, seed=seed, company_name=company_name, year=year)
+    rng = random.Random(f"{seed}-csv")
+    fields = [
+        ('company_name', inventory['company_name']),
+        ('reporting_period', inventory['reporting_period']),
+        ('document_number', f"GHG-{year + 1}-{rng.randint(1, 99):02d}"),
+        ('posted_time', f"{year + 1}年{rng.randint(1, 12)}月{rng.randint(1, 28)}日"),
+        ('Unified_Social_Credit_Identifier', '91' + ''.join(rng.choice('0123456789') for _ in range(15)) + 'X'),
+        ('legal_person', rng.choice(['张伟', '王芳', '李强', '刘洋', '陈静'])),
+        ('registered_capital', f"{rng.randint(1000, 500000)}万元"),
+        ('registered_address', f"{rng.choice(_REGIONS)}工业园区{rng.randint(1, 999)}号"),
+        ('evaluation_score', f"{rng.uniform(3, 6):.2f}"),
+        ('evaluation_level', rng.choice(['优', '良', '中'])),
+        ('', ''),
+        ('scope_1_emissions', inventory['scope_1']),
+        ('scope_2_location_based_emissions', inventory['scope_2_location']),
+        ('scope_2_market_based_emissions', inventory['scope_2_market']),
+        ('scope_3_emissions', inventory['scope_3']),
+    ]
+    fields.extend((f'scope_3_category_{n}_emissions', v) for n, v in inventory['scope_3_categories'].items())
+
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['变量名', '值', ''])
+        for key, value in fields:
+            writer.writerow([key, value, ''])
+        writer.writerows([['', '', '']] * 3)
+
+        writer.writerow(['范围一直接排放源', '', ''])
+        writer.writerow(['GHG排放类别', '排放源', '设施'])
+        for item in inventory['items']:
+            if item['scope'] == '范围一':
+                writer.writerow([item['category'], item['source'], item['facility']])
+        writer.writerows([['', '', '']] * 3)
+
+        writer.writerow(['范围二、三直接排放源', '', ''])
+        writer.writerow(['GHG排放类别', '排放源', '设施'])
+        for item in inventory['items']:
+            if item['scope'] != '范围一':
+                writer.writerow([item['category'], item['source'], item['facility']])
+
+    return {k: v for k, v in inventory.items() if k != 'items'}
+
+
+def generate_corpus(output_dir, count, kind='xlsx', seed=0, **kwargs):
+    """
+    在目录下生成 count 份不同企业的合成输入，返回文件路径列表。
+    其余参数传给 generate_workbook / generate_csv。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    width = max(3, int(math.log10(max(count, 1))) + 1)
+    paths = []
+    for index in range(count):
+        path = os.path.join(output_dir, f"synthetic_{index:0{width}d}.{kind}")
+        if kind == 'csv':
+            generate_csv(path, seed=seed + index, **kwargs)
+        else:
+            generate_workbook(path, seed=seed + index, **kwargs)
+        paths.append(path)
+    return paths
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="合成温室气体盘查数据生成器")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    workbook = subparsers.add_parser('workbook', help="生成一个合成工作簿")
+    workbook.add_argument('output', help="输出 .xlsx 路径")
+    workbook.add_argument('--rows', type=int, default=80, help="活动数据行数")
+    workbook.add_argument('--sheets', type=int, default=12, help="工作表数量")
+    workbook.add_argument('--noise', type=float, default=0.0, help="噪声水平 0~1")
+    workbook.add_argument('--seed', type=int, default=None, help="随机种子")
+
+    csv_parser = subparsers.add_parser('csv', help="生成一个合成 CSV")
+    csv_parser.add_argument('output', help="输出 .csv 路径")
+    csv_parser.add_argument('--rows', type=int, default=80, help="排放源行数")
+    csv_parser.add_argument('--seed', type=int, default=None, help="随机种子")
+
+    corpus = subparsers.add_parser('corpus', help="生成一批不同企业的合成输入")
+    corpus.add_argument('output_dir', help="输出目录")
+    corpus.add_argument('--count', type=int, default=10, help="文件数量")
+    corpus.add_argument('--kind', choices=['xlsx', 'csv'], default='xlsx', help="文件类型")
+    corpus.add_argument('--rows', type=int, default=80, help="每个文件的活动数据行数")
+    corpus.add_argument('--noise', type=float, default=0.0, help="噪声水平 0~1（仅工作簿）")
+    corpus.add_argument('--seed', type=int, default=0, help="起始随机种子")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'workbook':
+        truth = generate_workbook(args.output, activity_rows=args.rows, sheet_count=args.sheets,
+                                  noise=args.noise, seed=args.seed)
+        print(json.dumps(truth, ensure_ascii=False, indent=2))
+    elif args.command == 'csv':
+        truth = generate_csv(args.output, activity_rows=args.rows, seed=args.seed)
+        print(json.dumps(truth, ensure_ascii=False, indent=2))
+    elif args.command == 'corpus':
+        kwargs = {'activity_rows': args.rows}
+        if args.kind == 'xlsx':
+            kwargs['noise'] = args.noise
+        paths = generate_corpus(args.output_dir, args.count, kind=args.kind, seed=args.seed, **kwargs)
+        print(f"已生成 {len(paths)} 个文件: {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
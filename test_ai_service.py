@@ -4,7 +4,10 @@
 测试改进后的 ai_service.py 功能，确保AI只进行文本润色，不产生数据幻觉
 """
 
-from ai_service import AIService
+import threading
+import time
+
+from ai_service import AIService, RateLimiter
 from data_reader import ExcelDataReader
 
 def test_ai_service_with_real_data():
@@ -175,5 +178,219 @@ def main():
         import traceback
         traceback.print_exc()
 
+class _FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class _FakeChoice:
+    def __init__(self, content):
+        self.message = _FakeMessage(content)
+
+
+class _FakeResponse:
+    def __init__(self, content):
+        self.choices = [_FakeChoice(content)]
+
+
+class _FakeCompletions:
+    """模拟 client.chat.completions，记录调用次数，按公司名返回不同内容"""
+
+    def __init__(self, fail_for=()):
+        self.calls = 0
+        self.fail_for = fail_for
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+        user_prompt = kwargs['messages'][1]['content']
+        for company in self.fail_for:
+            if company in user_prompt:
+                raise RuntimeError("模拟接口异常")
+        company = user_prompt.split('企业：')[1].split('\n')[0]
+        return _FakeResponse(f"{company}完成了温室气体盘查。")
+
+
+class _FakeClient:
+    def __init__(self, completions):
+        self.chat = type('Chat', (), {'completions': completions})()
+
+
+def _make_service(completions):
+    ai_service = AIService()
+    ai_service.client = _FakeClient(completions)
+    return ai_service
+
+
+def _company_data(company):
+    return {
+        'company_name': company,
+        'report_year': '2024',
+        'total_emission_location': '10000',
+        'scope_1': '3000',
+        'scope_2_location': '4000',
+        'scope_3': '3000'
+    }
+
+
+def test_batch_summaries_dedup_and_order():
+    """批量摘要：相同上下文只调用一次，结果按输入顺序返回"""
+    completions = _FakeCompletions()
+    ai_service = _make_service(completions)
+
+    data_list = [_company_data('甲公司'), _company_data('乙公司'), _company_data('甲公司')]
+    summaries = ai_service.generate_executive_summaries(data_list, max_workers=2)
+
+    assert summaries == ['甲公司完成了温室气体盘查。', '乙公司完成了温室气体盘查。', '甲公司完成了温室气体盘查。']
+    assert completions.calls == 2
+
+
+def test_batch_summaries_distinguish_scope3_categories():
+    """批量摘要：只有范围三类别不同的两家子公司不合并，本地后端分别生成"""
+    ai_service = AIService()
+    base = {'company_name': '子公司', 'report_year': '2024', 'total_emission_location': '10000',
+            'scope_1': '3000', 'scope_2_location': '4000', 'scope_2_market': '3500', 'scope_3': '3000'}
+    first = dict(base, scope_3_category_1_emissions='2000', scope_3_category_4_emissions='1000')
+    second = dict(base, scope_3_category_6_emissions='3000')
+    assert ai_service._assemble_data_context(first) == ai_service._assemble_data_context(second)
+
+    summaries = ai_service.generate_executive_summaries([first, second, dict(first)], backend='local')
+    assert summaries[0] != summaries[1]
+    assert summaries[0] == summaries[2]
+    assert summaries == [ai_service.generate_executive_summary(data, backend='local')
+                         for data in (first, second, first)]
+
+
+def test_batch_summaries_per_item_fallback():
+    """批量摘要：单条失败只对该条启用安全网"""
+    completions = _FakeCompletions(fail_for=('乙公司',))
+    ai_service = _make_service(completions)
+
+    data_list = [_company_data('甲公司'), _company_data('乙公司')]
+    summaries = ai_service.generate_executive_summaries(data_list)
+
+    assert summaries[0] == '甲公司完成了温室气体盘查。'
+    assert summaries[1] == ai_service._get_fallback_summary(data_list[1])
+
+
+def test_rate_limiter_spacing():
+    """限流器保证相邻请求的最小间隔"""
+    limiter = RateLimiter(50)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start >= 4 / 50 - 0.01
+
+
+class _FakeDelta:
+    def __init__(self, content):
+        self.content = content
+
+
+class _FakeStreamChoice:
+    def __init__(self, content):
+        self.delta = _FakeDelta(content)
+
+
+class _FakeStream:
+    """模拟流式响应，记录已被消费的分片数以及是否被关闭"""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self.pieces:
+            self.consumed += 1
+            yield type('Chunk', (), {'choices': [_FakeStreamChoice(piece)]})()
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeStreamingCompletions:
+    def __init__(self, pieces):
+        self.stream = _FakeStream(pieces)
+
+    def create(self, **kwargs):
+        assert kwargs.get('stream') is True
+        return self.stream
+
+
+def test_streaming_summary_passes_validation():
+    """流式模式：完整接收并通过校验的回复原样返回"""
+    completions = _FakeStreamingCompletions(['测试企业在2024年', '完成温室气体盘查，', '总排放量为10000 tCO2e。'])
+    ai_service = _make_service(completions)
+
+    summary = ai_service.generate_executive_summary(_company_data('测试企业'), stream=True)
+
+    assert summary == '测试企业在2024年完成温室气体盘查，总排放量为10000 tCO2e。'
+    assert completions.stream.closed
+
+
+def test_streaming_aborts_on_violation():
+    """流式模式：跨分片出现的禁用内容也能被发现，并立即中止"""
+    pieces = ['测试企业排放', '量预', '计将下降'] + ['继续输出。'] * 20
+    completions = _FakeStreamingCompletions(pieces)
+    ai_service = _make_service(completions)
+    data = _company_data('测试企业')
+
+    summary = ai_service.generate_executive_summary(data, stream=True)
+
+    assert summary == ai_service._get_fallback_summary(data)
+    assert completions.stream.consumed == 3
+    assert completions.stream.closed
+    # 中止的回复计为一次成功调用，但截断的耗时不进入耗时样本
+    assert ai_service.breaker.latency_percentile(95) is None
+    assert list(ai_service.breaker._outcomes) == [True]
+
+
+def test_local_backend_summary():
+    """本地规则引擎：覆盖范围占比、基于位置与市场的差异、范围三主要类别"""
+    ai_service = AIService()
+    data = {
+        'company_name': '测试企业',
+        'report_year': '2024',
+        'scope_1': '3,000.00',
+        'scope_2_location': '4,000.00',
+        'scope_2_market': '4,400.00',
+        'scope_3': '3,000.00',
+        'total_emission_location': '10,000.00',
+        'scope_3_category_1_emissions': '2,000.00',
+        'scope_3_category_4_emissions': '1,000.00',
+    }
+
+    summary = ai_service.generate_executive_summary(data, backend='local')
+
+    assert '10,000.00tCO2e' in summary
+    assert '范围一排放3,000.00tCO2e，占比30.0%' in summary
+    assert '较基于位置的结果高400.00tCO2e（10.0%）' in summary
+    assert summary.index('类别1外购商品和服务') < summary.index('类别4上游运输和配送')
+
+
+def test_unknown_backend_rejected():
+    ai_service = AIService()
+    try:
+        ai_service.generate_executive_summary(_company_data('测试企业'), backend='unknown')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知后端应抛出 ValueError")
+
+
+def test_batch_summaries_local_backend():
+    """批量任务可以指定本地后端，不调用 AI"""
+    completions = _FakeCompletions()
+    ai_service = _make_service(completions)
+
+    summaries = ai_service.generate_executive_summaries(
+        [_company_data('甲公司'), _company_data('乙公司')], backend='local')
+
+    assert completions.calls == 0
+    assert summaries[0].startswith('甲公司2024年度')
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
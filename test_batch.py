@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试批量处理入口：目录/清单输入、单文件出错不中断、JSON 汇总
+"""
+
+import json
+import os
+import shutil
+
+from docx import Document
+
+from batch import load_inputs, output_names, run_reports
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _make_template(path):
+    """生成一个只包含两个变量的小模板，避免测试依赖大模板的渲染耗时"""
+    doc = Document()
+    doc.add_paragraph("{{ company_name }}")
+    doc.add_paragraph("{{ executive_summary }}")
+    doc.save(path)
+
+
+def test_load_inputs_from_manifest(tmp_path):
+    (tmp_path / 'a.xlsx').write_bytes(b'')
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text("# 注释行\na.xlsx\n/abs/b.csv\n", encoding='utf-8')
+
+    assert load_inputs(str(manifest)) == [str(tmp_path / 'a.xlsx'), '/abs/b.csv']
+    assert load_inputs(str(tmp_path)) == [str(tmp_path / 'a.xlsx')]
+
+
+def test_output_names_never_collide():
+    inputs = ['a.xlsx', 'a.csv', 'a_2.xlsx', 'sub/A.xlsx', 'other/a_2.csv']
+    names = output_names(inputs)
+    assert names == ['a.docx', 'a_2.docx', 'a_2_2.docx', 'A_3.docx', 'a_2_3.docx']
+    assert len({name.lower() for name in names}) == len(inputs)
+
+
+def test_run_reports_continues_past_errors(tmp_path):
+    input_dir = tmp_path / 'inputs'
+    input_dir.mkdir()
+    shutil.copy(os.path.join(HERE, '减排行动统计.csv'), input_dir / 'company.csv')
+    (input_dir / 'broken.xlsx').write_bytes(b'not a workbook')
+    template = tmp_path / 'template.docx'
+    _make_template(template)
+
+    summary = run_reports(str(input_dir), str(tmp_path / 'out'), template_path=str(template),
+                          max_workers=1, backend='local')
+
+    assert summary['total'] == 2
+    assert summary['succeeded'] == 1
+    assert summary['failed'] == 1
+    assert os.path.exists(tmp_path / 'out' / 'company.docx')
+
+    with open(tmp_path / 'out' / 'batch_summary.json', encoding='utf-8') as f:
+        written = json.load(f)
+    by_name = {os.path.basename(r['input']): r for r in written['reports']}
+    assert by_name['broken.xlsx']['error'].startswith('load')
+    assert {'extract', 'csv_parse', 'summary', 'render', 'save'} <= set(by_name['company.csv']['timings'])
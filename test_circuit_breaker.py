@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 AI 后端熔断器：失败率熔断、半开探测、自适应超时
+"""
+
+from circuit_breaker import CircuitBreaker
+from ai_service import AIService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_trips_on_failure_rate():
+    """失败率超过阈值后熔断，不再放行请求"""
+    breaker = CircuitBreaker(min_requests=4, failure_threshold=0.5, clock=FakeClock())
+    breaker.record_success(0.5)
+    breaker.record_success(0.5)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_breaker_half_open_probe():
+    """熔断到期后只放行探测请求，探测成功则恢复，失败则再次熔断"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_requests=2, open_seconds=10, half_open_probes=1, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 20
+    assert breaker.allow_request()
+    breaker.record_success(0.3)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_adaptive_timeout():
+    """样本足够时超时收缩到 p95 × 系数，并受上下限约束"""
+    breaker = CircuitBreaker(min_requests=5, max_timeout=20.0, min_timeout=1.0,
+                             timeout_multiplier=2.0, clock=FakeClock())
+    assert breaker.current_timeout() == 20.0
+    for latency in [0.5, 0.6, 0.7, 0.8, 2.0]:
+        breaker.record_success(latency)
+    assert breaker.latency_percentile(95) == 2.0
+    assert breaker.current_timeout() == 4.0
+
+    breaker = CircuitBreaker(min_requests=1, min_timeout=1.0, clock=FakeClock())
+    breaker.record_success(0.01)
+    assert breaker.current_timeout() == 1.0
+
+
+def test_success_without_latency_sample():
+    """没有耗时样本的成功只计入结果：不影响自适应超时，半开时同样恢复"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_requests=2, max_timeout=20.0, open_seconds=10, clock=clock)
+    breaker.record_success(0.5)
+    breaker.record_success()
+    assert breaker.latency_percentile(95) == 0.5
+    assert breaker.current_timeout() == 20.0
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 10
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.latency_percentile(95) is None
+
+
+def test_breaker_recovers_when_backend_slows_down():
+    """超时收缩后后端整体变慢：熔断后探测使用超时上限，探测成功即恢复，超时重新按新的耗时学习"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_requests=5, open_seconds=10, max_timeout=20.0, min_timeout=1.0,
+                             timeout_multiplier=1.5, clock=clock)
+    for _ in range(5):
+        breaker.record_success(1.5)
+    assert breaker.current_timeout() == 2.25
+
+    def call(latency):
+        """按当前超时模拟一次耗时为 latency 的调用"""
+        if not breaker.allow_request():
+            return False
+        if latency > breaker.current_timeout():
+            breaker.record_failure()
+        else:
+            breaker.record_success(latency)
+        return True
+
+    # p95 升到 4 秒：每次调用都被 2.25 秒的超时截断，直到熔断
+    while breaker.state == CircuitBreaker.CLOSED:
+        call(4.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.current_timeout() == 20.0
+
+    clock.now = 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.current_timeout() == 20.0
+    assert call(4.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    for _ in range(10):
+        assert call(4.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.current_timeout() == 6.0
+
+
+class _FailingCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        raise TimeoutError("模拟超时")
+
+
+def test_ai_service_uses_fallback_when_open():
+    """熔断后 AIService 不再调用后端，直接返回安全网摘要"""
+    ai_service = AIService()
+    completions = _FailingCompletions()
+    ai_service.client = type('Client', (), {})()
+    ai_service.client.chat = type('Chat', (), {'completions': completions})()
+    ai_service.breaker = CircuitBreaker(min_requests=2, clock=FakeClock())
+
+    data = {'company_name': '测试企业', 'report_year': '2024', 'total_emission_location': '10000',
+            'scope_1': '3000', 'scope_2_location': '4000', 'scope_3': '3000'}
+    for _ in range(5):
+        summary = ai_service.generate_executive_summary(data)
+        assert summary == ai_service._get_fallback_summary(data)
+
+    assert completions.calls == 2
+    assert ai_service.breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试流式组装报告：document.xml 与一次性保存的结果相同，内存中只保留当前章节，合并报告可以按设施章节写出
+"""
+
+import io
+import os
+import zipfile
+from datetime import date
+
+import pytest
+from docx import Document
+from lxml import etree
+
+from docx_stream import DocumentStream
+from emissions_cube import EmissionsCube
+import report_writer
+from report_writer import WordReportWriter
+
+DATA = {
+    'company_name': '测试企业', 'report_year': '2024', 'report_date': date(2025, 3, 1),
+    'executive_summary': '这是执行摘要。', 'scope_1': '1,000.00', 'scope_2_location': '200.00',
+    'scope_2_market': '150.00', 'scope_3': '50.00', 'total_emission_location': '1,250.00',
+    'total_emission_market': '1,200.00',
+}
+
+
+def _parts(output):
+    with zipfile.ZipFile(output) as archive:
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+def _canonical(xml):
+    return etree.tostring(etree.fromstring(xml), method='c14n')
+
+
+def test_streamed_report_matches_saved_report():
+    saved = io.BytesIO()
+    assert WordReportWriter().write_report(DATA, saved)
+
+    streamed = io.BytesIO()
+    writer = WordReportWriter()
+    body_sizes = []
+    with writer.streaming(streamed):
+        writer._compose_report(DATA)
+        body_sizes.append(len(writer.doc.element.body))
+    # 每个章节完成后正文已写出，文档树中只剩 sectPr
+    assert body_sizes == [1]
+
+    expected, actual = _parts(saved), _parts(streamed)
+    assert set(actual) == set(expected)
+    assert _canonical(actual['word/document.xml']) == _canonical(expected['word/document.xml'])
+    for name in ('word/styles.xml', 'word/_rels/document.xml.rels', '[Content_Types].xml'):
+        assert actual[name] == expected[name], name
+    # 封面图片等其他部件也完整写出
+    assert [p.text for p in Document(streamed).paragraphs] == [p.text for p in Document(saved).paragraphs]
+
+    stream = DocumentStream(Document(), io.BytesIO())
+    stream.close()
+    with pytest.raises(ValueError):
+        stream.flush()
+
+
+def test_consolidated_report_is_written_section_by_section(tmp_path):
+    inventories = [{'company_name': f'设施{f}', 'report_year': year, 'region': '华东' if f % 2 else '华北',
+                    'scope_1': 100.0 + f, 'scope_2_location': 10.0, 'scope_2_market': 8.0, 'scope_3': 1.0}
+                   for f in range(40) for year in (2023, 2024)]
+    context = EmissionsCube.from_inventories(inventories, attributes=('region',)).consolidated_context(
+        company_name='测试集团', group_by='region')
+    output = tmp_path / '合并.docx'
+
+    writer = WordReportWriter()
+    peak = []
+    original = writer._end_section
+
+    def tracking_end_section():
+        original()
+        peak.append(len(writer.doc.element.body))
+
+    writer._end_section = tracking_end_section
+    assert writer.write_consolidated_report(context, str(output))
+    # 正文元素数不随设施数增长
+    assert max(peak) <= 2
+
+    document = Document(str(output))
+    headings = [p.text for p in document.paragraphs if p.style.name == 'Heading 2']
+    assert headings == ['华东', '华北'] + [f'设施{f}' for f in range(40)]
+    assert len(document.tables) == 1 + 2 + 40
+    assert document.tables[-1].cell(0, 1).text == '139.00'
+    assert document.tables[-1].cell(7, 1).text == '0.0%'
+
+    # 出错时返回 False，不留下不完整的文件
+    broken = dict(context, facilities=[None])
+    assert not WordReportWriter().write_consolidated_report(broken, str(tmp_path / 'broken.docx'))
+    assert sorted(os.listdir(tmp_path)) == ['合并.docx']
+
+    # 写好的报告覆盖旧文件时才替换，之前的报告保持完整
+    assert not WordReportWriter().write_consolidated_report(broken, str(output))
+    assert len(Document(str(output)).tables) == 1 + 2 + 40
+
+
+def test_streamed_report_uses_timestamped_name_when_locked(tmp_path, monkeypatch):
+    output = tmp_path / '报告.docx'
+    output.write_bytes(b'locked')
+    original = os.replace
+
+    def locked_replace(source, target):
+        if os.fspath(target) == str(output):
+            raise PermissionError(13, '文件被占用', str(target))
+        return original(source, target)
+
+    monkeypatch.setattr(report_writer.os, 'replace', locked_replace)
+    context = EmissionsCube.from_inventories([dict(DATA, scope_1=1000.0)]).consolidated_context(company_name='测试企业')
+    assert WordReportWriter().write_consolidated_report(context, str(output))
+
+    # 原文件不变，报告以时间戳文件名写出，没有残留的临时文件
+    assert output.read_bytes() == b'locked'
+    saved = [name for name in os.listdir(tmp_path) if name != '报告.docx']
+    assert len(saved) == 1 and saved[0].startswith('报告_') and saved[0].endswith('.docx')
+    assert Document(str(tmp_path / saved[0])).paragraphs
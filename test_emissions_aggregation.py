@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试向量化排放汇总：派生值与 EmissionsModel 一致，按分组汇总，范围三按比例拆分
+"""
+
+import math
+
+import numpy as np
+
+from data_reader import ExcelDataReader
+from emissions_aggregation import COLUMNS, EmissionsMatrix, split_scope3
+from emissions_model import EmissionsModel
+
+RECORDS = [
+    {'scope_1_emissions': '1,000.5', 'scope_2_location_based_emissions': '200', 'scope_2_market_based_emissions': '150',
+     'scope_3_category_1_emissions': '30', 'scope_3_category_4_emissions': '0', 'scope_3_category_12_emissions': '20'},
+    {'scope_1': 10.0, 'scope_2_location': 0.0, 'scope_2_market': 5.0, 'scope_3': '7',
+     'total_emission_location': '0.00', 'total_emission_market': '99'},
+    {'scope_1': None, 'scope_2_location': '用电设备'},
+]
+
+
+def _same(value, expected):
+    if expected is None:
+        return math.isnan(value)
+    return value == expected
+
+
+def test_matrix_matches_scalar_model():
+    matrix = EmissionsMatrix.from_records(RECORDS)
+    assert matrix.shape == (3,)
+    for index, data in enumerate(RECORDS):
+        model = EmissionsModel.from_data(data)
+        assert matrix.model(index) == model
+        for name in ('scope_1', 'scope_2_location', 'scope_2_market', 'scope_3', 'total_location', 'total_market',
+                     'scope_2_delta', 'scope_2_delta_pct'):
+            assert _same(getattr(matrix, name)[index], getattr(model, name)), name
+        for name in ('scope_1', 'scope_2_location', 'scope_3'):
+            assert _same(matrix.shares[name][index], model.shares.get(name)), name
+    assert matrix.nonzero_categories(0) == [1, 12]
+    assert matrix.nonzero_categories(2) == []
+    assert matrix.category_total.tolist() == [50.0, 0.0, 0.0]
+
+
+def test_rollup_over_facilities_and_years():
+    # 4 个设施 × 3 个年度，设施 2 缺少范围二
+    values = np.full((4, 3, len(COLUMNS)), np.nan)
+    values[..., COLUMNS.index('scope_1')] = np.arange(12).reshape(4, 3)
+    values[..., COLUMNS.index('scope_2_location')] = 1.0
+    values[2, :, COLUMNS.index('scope_2_location')] = np.nan
+    values[..., COLUMNS.index('category_3')] = 2.0
+    matrix = EmissionsMatrix(values)
+    assert matrix.total_location.shape == (4, 3)
+    assert np.isnan(matrix.total_location[2]).all()
+
+    groups, rolled = matrix.rollup(['华东', '华北', '华东', '华北'])
+    assert groups.tolist() == ['华东', '华北']
+    assert rolled.scope_1.tolist() == [[6.0, 8.0, 10.0], [12.0, 14.0, 16.0]]
+    # 组内部分缺失的总量只对存在的值求和
+    assert rolled.total_location[0].tolist() == [3.0, 4.0, 5.0]
+    assert rolled.scope_3.tolist() == [[4.0] * 3] * 2
+
+    portfolio = matrix.total()
+    assert portfolio.shape == (3,)
+    assert portfolio.scope_1.tolist() == [18.0, 22.0, 26.0]
+    assert portfolio[0].model().scope_1 == 18.0
+    assert np.isnan(EmissionsMatrix(values[:0]).total().scope_1).all()
+
+
+def test_scope3_split_and_csv_category_sum(tmp_path):
+    split = split_scope3(1234.5)
+    assert split['scope_3_category_1_emissions'] == 1234.5 * 0.1
+    assert split['scope_3_category_12_emissions'] == 1234.5 * 0.05
+    assert 'scope_3_category_8_emissions' not in split
+    arrays = split_scope3(np.array([[10.0, 20.0]]))
+    assert arrays['scope_3_category_10_emissions'].tolist() == [[0.5, 1.0]]
+
+    csv_path = tmp_path / 'emissions.csv'
+    csv_path.write_text('变量,值\nscope_3_category_1_emissions,1.5\nscope_3_category_2_emissions,'
+                        '\nscope_3_category_7_emissions,2,000\nscope_3_category_9_emissions,无\n', encoding='utf-8')
+    data = ExcelDataReader(str(csv_path)).read_emission_data_csv()
+    assert data['scope_3_emissions'] == '3.5'
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试多设施多年度汇总立方体：按设施和年度索引、分组汇总、同比变化，合并报告上下文可以直接渲染
+"""
+
+import math
+import random
+
+import numpy as np
+from docx import Document
+
+from batch import run_consolidated
+from emissions_cube import EmissionsCube, parse_year
+from emissions_model import EmissionsModel
+from synthetic_data import generate_workbook
+
+
+def _inventory(facility, year, scope_1, region='华东', **extra):
+    data = {'company_name': facility, 'report_year': str(year), 'region': region,
+            'scope_1': scope_1, 'scope_2_location': 10.0, 'scope_2_market': 8.0, 'scope_3': 5.0}
+    data.update(extra)
+    return data
+
+
+def test_cube_indexes_groups_and_compares_years():
+    inventories = [
+        _inventory('甲厂', 2022, 100.0),
+        _inventory('乙厂', 2023, 50.0, region='华北'),
+        _inventory('甲厂', 2023, 90.0),
+        _inventory('丙厂', '2023年1月1日至2023年12月31日', 30.0, region='华北'),
+        _inventory('甲厂', 2023, 80.0),           # 重复的设施年度：使用后出现的一份
+        _inventory('丁厂', None, 1.0),            # 没有年度：跳过
+    ]
+    cube = EmissionsCube.from_inventories(inventories, attributes=('region',))
+    assert cube.facilities == ('甲厂', '乙厂', '丙厂')
+    assert cube.years == (2022, 2023)
+    assert cube.shape == (3, 2)
+    assert cube.matrix.scope_1[cube.facility_index['甲厂'], cube.year_index[2023]] == 80.0
+    assert math.isnan(cube.matrix.scope_1[cube.facility_index['乙厂'], cube.year_index[2022]])
+
+    groups, grouped = cube.group_by('region')
+    assert groups.tolist() == ['华东', '华北']
+    assert np.array_equal(grouped.scope_1, [[100.0, 80.0], [np.nan, 80.0]], equal_nan=True)
+    assert cube.by_year().total_location.tolist() == [115.0, 95.0 + 65.0 + 45.0]
+
+    change, change_pct = cube.year_over_year()
+    assert change[0].tolist()[1] == -20.0
+    assert round(change_pct[0, 1], 6) == round(-20.0 / 115.0 * 100, 6)
+    assert np.isnan(change[:, 0]).all()
+
+    sub = cube.select(facilities=['丙厂', '甲厂'], years=[2023])
+    assert sub.facilities == ('甲厂', '丙厂')
+    assert sub.attributes['region'].tolist() == ['华东', '华北']
+    assert parse_year(2024.0) == 2024 and parse_year('本年度') is None
+
+
+def test_rollup_matches_per_inventory_models():
+    rng = random.Random(3)
+    inventories = [_inventory(f'设施{f}', 2020 + y, rng.uniform(0, 1000), region=f'区域{f % 7}',
+                              scope_3=None, **{f'scope_3_category_{n}_emissions': rng.uniform(0, 50)
+                                               for n in (1, 4, 11)})
+                   for f in range(60) for y in range(5)]
+    cube = EmissionsCube.from_inventories(inventories, attributes=('region',))
+    groups, grouped = cube.group_by('region')
+
+    for g, group in enumerate(groups):
+        for y, year in enumerate(cube.years):
+            models = [EmissionsModel.from_data(data) for data in inventories
+                      if data['region'] == group and parse_year(data['report_year']) == year]
+            assert math.isclose(grouped.total_location[g, y], sum(m.total_location for m in models))
+            assert math.isclose(grouped.scope_3[g, y], sum(m.scope_3 for m in models))
+
+
+def test_consolidated_context_renders_group_report(tmp_path):
+    inputs = tmp_path / 'inputs'
+    inputs.mkdir()
+    for facility in range(3):
+        for year in (2023, 2024):
+            generate_workbook(str(inputs / f'f{facility}_{year}.xlsx'), activity_rows=10, sheet_count=1,
+                              seed=facility * 10 + year, company_name=f'设施{facility}', year=year)
+    template = tmp_path / 'template.docx'
+    document = Document()
+    document.add_paragraph("{{ company_name }} {{ report_year }} {{ total_emission_location }} "
+                           "{{ total_change_pct }}")
+    document.add_paragraph("{% for f in facilities %}{{ f.name }}={{ f.total_emission_location }};{% endfor %}")
+    document.save(str(template))
+
+    output = tmp_path / '合并.docx'
+    context = run_consolidated(str(inputs), str(output), template_path=str(template), company_name='测试集团',
+                               max_workers=1)
+    assert context['report_year'] == '2024'
+    assert context['previous_year'] == '2023'
+    assert context['facility_count'] == 3
+    assert [row['name'] for row in context['facilities']] == ['设施0', '设施1', '设施2']
+    text = '\n'.join(p.text for p in Document(str(output)).paragraphs)
+    assert f"测试集团 2024 {context['total_emission_location']}" in text
+    assert '设施2=' in text
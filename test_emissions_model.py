@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试排放数据模型：原始数值只解析一次，汇总值正确，格式化只在渲染视图中应用
+"""
+
+import json
+
+from data_reader import ExcelDataReader
+from emissions_model import EmissionsModel, format_amount, parse_number
+
+
+def test_aggregates_are_computed_once_from_raw_values():
+    model = EmissionsModel(scope_1=100.0, scope_2_location=50.0, scope_2_market=75.0,
+                           scope_3_categories={1: 30.0, 4: 20.0, 8: 0.0})
+    assert model.scope_3 == 50.0
+    assert model.total_location == 200.0
+    assert model.total_market == 225.0
+    assert model.shares == {'scope_1': 50.0, 'scope_2_location': 25.0, 'scope_3': 25.0}
+    assert model.scope_2_delta == 25.0
+    assert model.scope_2_delta_pct == 50.0
+    assert model.top_scope3_categories(5) == [(1, 30.0), (4, 20.0)]
+
+
+def test_from_data_parses_formatted_strings_from_current_values():
+    data = {'scope_1': '1,234.50', 'scope_2_location': '100t', 'scope_2_market': None,
+            'scope_3_emissions': '10', 'total_emission_location': '0.00'}
+    model = EmissionsModel.from_data(data)
+    assert model.scope_1 == 1234.5
+    assert model.scope_2_market is None
+    # 总量为 0 视为缺失，由各范围求和
+    assert model.total_location == 1344.5
+    assert model.total_market is None
+
+    # 覆盖字段后重新构建的模型随之更新
+    data['scope_1'] = '2,000'
+    assert EmissionsModel.from_data(data).total_location == 2110.0
+    assert parse_number('用电设备') is None
+    assert format_amount(None) == '0.00'
+
+
+def test_template_fields_are_a_view():
+    fields = EmissionsModel(scope_1=1234567.891, scope_2_location=1.0, scope_2_market=2.0,
+                            scope_3=3.0, scope_3_categories={11: 3.0}).template_fields()
+    assert fields['scope_1'] == fields['scope_1_emissions'] == '1,234,567.89'
+    assert fields['total_emission_location'] == '1,234,571.89'
+    assert fields['total_emission_market'] == '1,234,572.89'
+    assert fields['scope_3_category_11_emissions'] == '3.00'
+
+
+def test_csv_totals_are_no_longer_zero():
+    data = ExcelDataReader('减排行动统计.csv').extract_data()
+    emissions = EmissionsModel.from_data(data)
+    assert data['total_emission_location'] != '0.00'
+    assert data['total_emission_location'] == format_amount(
+        emissions.scope_1 + emissions.scope_2_location + emissions.scope_3)
+    assert data['total_emission_market'] == format_amount(
+        emissions.scope_1 + emissions.scope_2_market + emissions.scope_3)
+    assert data['scope_1'] == data['scope_1_emissions']
+
+
+def test_csv_data_dict_only_has_present_fields(tmp_path):
+    with open('减排行动统计.csv', 'rb') as f:
+        rows = [line for line in f if not line.startswith(b'scope_2_market_based_emissions')]
+    path = tmp_path / 'no_market.csv'
+    path.write_bytes(b''.join(rows))
+
+    data = ExcelDataReader(str(path)).extract_data()
+    # 数据字典可以直接 JSON 序列化（报告缓存的元数据），没有附带模型对象
+    assert 'emissions' not in data
+    json.dumps(data, ensure_ascii=False)
+    # 数据源中没有的范围不写成 0.00
+    assert 'scope_2_market_based_emissions' not in data and 'scope_2_market' not in data
+    assert data['scope_1'] == data['scope_1_emissions']
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试声明式提取计划：默认计划与原有提取结果一致，每个工作表只遍历一次，新版式只需要新的计划
+"""
+
+import json
+import os
+from datetime import date
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import extraction_plan
+from ai_service import AIService
+from data_reader import ExcelDataReader
+from emissions_model import EmissionsModel
+from report_writer import WordReportWriter
+
+
+def _table_workbook(path):
+    workbook = Workbook()
+    main = workbook.active
+    main.title = '温室气体盘查清册'
+    main['A2'], main['B2'] = '组织名称：', '测试公司'
+    main['A3'], main['B3'] = '盘查覆盖周期:', '2023年1月1日至2023年12月31日'
+    table = workbook.create_sheet('表1温室气体盘查表')
+    table['B4'] = '范围一'
+    table['B5'], table['C5'] = 100.0, '总排放量'
+    table['A7'], table['B7'] = '范围二（基于位置）', 2000000.0
+    table['A8'], table['B8'] = '范围二（基于市场）', 3000000.0
+    table['A9'] = '范围三'
+    table['A10'] = 50.0
+    table['D20'] = '总量'
+    table['E16'], table['F16'] = 2000150.0, '基于位置'
+    table['E24'], table['F24'] = 3000150.0, '基于市场'
+    workbook.save(path)
+    return path
+
+
+def test_default_plan_resolves_fields_and_fallbacks(tmp_path):
+    data = ExcelDataReader(_table_workbook(str(tmp_path / 'plan.xlsx'))).extract_data(csv_path=None)
+    assert data['company_name'] == '测试公司'
+    # 年度取自盘查覆盖周期，不再固定为 2024
+    assert data['report_year'] == '2023'
+    # 总排放量行上方 B 列为范围一，取同列的值
+    assert data['scope_1'] == 100.0
+    assert data['scope_2_location'] == 2000000.0
+    assert data['scope_2_market'] == 3000000.0
+    # 范围三右侧为空，回退到下方的数值
+    assert data['scope_3'] == 50.0
+    # "总排放量" 右侧为空：在 "总量" 附近按上下文标签选出候选值
+    assert data['total_emission_location'] == 2000150.0
+    assert data['total_emission_market'] == 3000150.0
+    assert EmissionsModel.from_data(data).scope_3 == 50.0
+
+
+def test_workbook_without_period_has_no_hard_coded_year(tmp_path):
+    path = _table_workbook(str(tmp_path / 'no_period.xlsx'))
+    workbook = load_workbook(path)
+    workbook['温室气体盘查清册'].delete_rows(3)
+    workbook.save(path)
+
+    data = ExcelDataReader(path).extract_data(csv_path=None)
+    assert data['report_year'] is None
+
+    # 没有年度时封面使用当前年份，安全网摘要写作"本年度"，都不写出 "None"
+    writer = WordReportWriter()
+    writer._compose_report(dict(data, report_date=date(2025, 1, 1)))
+    text = '\n'.join(p.text for p in writer.doc.paragraphs)
+    assert 'None' not in text
+    assert f'统计期间：{date.today().year}年1月1日' in text
+    summary = AIService()._get_fallback_summary(data)
+    assert 'None' not in summary and '本年度' in summary
+
+
+def test_each_sheet_is_iterated_once(tmp_path, monkeypatch):
+    from openpyxl.worksheet.worksheet import Worksheet
+
+    calls = []
+    original = Worksheet.iter_rows
+
+    def counting_iter_rows(self, *args, **kwargs):
+        # 只统计完整遍历（版式指纹只读取前几行）
+        if kwargs.get('max_row') is None:
+            calls.append(self.title)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(Worksheet, 'iter_rows', counting_iter_rows)
+    monkeypatch.setenv('LAYOUT_STORE_DIR', str(tmp_path / 'layouts'))
+    monkeypatch.setenv('SHEET_CACHE_DIR', '')
+    monkeypatch.setenv('EXCEL_BACKEND', 'openpyxl')
+    ExcelDataReader(_table_workbook(str(tmp_path / 'plan.xlsx'))).extract_data(csv_path=None)
+    assert sorted(calls) == ['温室气体盘查清册', '表1温室气体盘查表']
+
+
+def test_custom_plan_handles_new_layout_without_code(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'Summary'
+    sheet['A1'], sheet['A2'] = 'Company', 'Acme'
+    sheet['C1'], sheet['C2'] = 'Scope 1', 10.0
+    sheet['D1'], sheet['D2'] = 'Scope 2', 'n/a'
+    path = str(tmp_path / 'custom.xlsx')
+    workbook.save(path)
+
+    plan = extraction_plan.compile_plan({
+        'name': 'english',
+        'sheets': {'summary': {'candidates': ['Summary'], 'required': True}},
+        'fields': [
+            {'name': 'company_name', 'sheet': 'summary',
+             'strategies': [{'label': 'company', 'direction': 'below'}]},
+            {'name': 'scope_1', 'sheet': 'summary',
+             'strategies': [{'label': 'SCOPE 1', 'direction': 'below', 'type': 'number'}]},
+            {'name': 'scope_2_location', 'sheet': 'summary',
+             'strategies': [{'label': 'Scope 2', 'direction': 'below', 'type': 'number'}], 'default': 0},
+            {'name': 'total_emission_location', 'strategies': [{'sum': ['scope_1', 'scope_2_location']}]},
+        ],
+    })
+    data = ExcelDataReader(path, plan=plan).extract_data(csv_path=None)
+    assert data['company_name'] == 'Acme'
+    assert data['scope_1'] == 10.0
+    assert data['scope_2_location'] == 0
+    assert data['total_emission_location'] == 10.0
+
+    # 缺少必需的工作表时只返回默认值
+    workbook.active.title = 'Other'
+    workbook.save(path)
+    data = ExcelDataReader(path, plan=plan).extract_data(csv_path=None)
+    assert 'company_name' not in data and 'file_type' not in data
+
+
+def test_load_plan_caches_compiled_plan_until_file_changes(tmp_path):
+    path = tmp_path / 'plan.json'
+    path.write_text(json.dumps({'name': 'a', 'fields': [{'name': 'x', 'default': 1}]}), encoding='utf-8')
+    first = extraction_plan.load_plan(str(path))
+    assert extraction_plan.load_plan(str(path)) is first
+    assert extraction_plan.load_plan().name == 'default'
+
+    path.write_text(json.dumps({'name': 'b', 'fields': [{'name': 'x', 'default': 2}]}), encoding='utf-8')
+    # 修改时间变化后重新编译
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))
+    assert extraction_plan.load_plan(str(path)).name == 'b'
+
+    with pytest.raises(extraction_plan.PlanError):
+        extraction_plan.compile_plan({'fields': [{'name': 'y', 'strategies': [{'sum': ['z']}]}]})
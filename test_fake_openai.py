@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试本地 OpenAI 替身：普通响应、流式响应和错误注入都能被 openai 客户端正常处理
+"""
+
+import openai
+import pytest
+from openai import OpenAI
+
+from fake_openai import DEFAULT_CONTENT, FakeOpenAIServer
+
+
+def _client(server):
+    return OpenAI(api_key='fake', base_url=server.base_url, max_retries=0)
+
+
+def test_completion_and_stream():
+    with FakeOpenAIServer(chunk_size=5) as server:
+        client = _client(server)
+        messages = [{'role': 'user', 'content': '你好'}]
+
+        response = client.chat.completions.create(model='fake', messages=messages)
+        assert response.choices[0].message.content == DEFAULT_CONTENT
+
+        stream = client.chat.completions.create(model='fake', messages=messages, stream=True)
+        content = ''.join(chunk.choices[0].delta.content or '' for chunk in stream)
+        assert content == DEFAULT_CONTENT
+
+        assert server.stats == {'requests': 2, 'errors': 0, 'streams': 1}
+
+
+def test_error_injection():
+    with FakeOpenAIServer(error_rate=1.0) as server:
+        with pytest.raises(openai.InternalServerError):
+            _client(server).chat.completions.create(model='fake', messages=[{'role': 'user', 'content': '你好'}])
+        assert server.stats['errors'] == 1
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试已知版式存储：相同版式只遍历到最后一个标签，版式变化或校验失败时回退到完整搜索
+"""
+
+import json
+import os
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.worksheet.worksheet import Worksheet
+
+import extraction_plan
+from layout_store import LayoutStore, sheet_fingerprint
+from synthetic_data import generate_workbook
+
+
+def _workbook(path, seed=1, company_name='测试公司'):
+    generate_workbook(path, activity_rows=20, sheet_count=2, seed=seed, company_name=company_name)
+    return path
+
+
+def _extract(path, store):
+    return extraction_plan.load_plan().extract(load_workbook(path, data_only=True), layout_store=store)
+
+
+def _count_full_passes(monkeypatch):
+    calls = []
+    original = Worksheet.iter_rows
+
+    def counting_iter_rows(self, *args, **kwargs):
+        if kwargs.get('max_row') is None:
+            calls.append(self.title)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(Worksheet, 'iter_rows', counting_iter_rows)
+    return calls
+
+
+def test_known_layout_is_read_by_coordinate(tmp_path, monkeypatch):
+    store = LayoutStore(str(tmp_path / 'layouts'))
+    first = _extract(_workbook(str(tmp_path / 'a.xlsx')), store)
+    # 盘查表有邻近策略，结果依赖整个工作表，只记录清册的版式
+    assert len(os.listdir(store.root)) == 1
+
+    # 同一模板、不同公司名称和数值：指纹相同，清册不再完整遍历
+    path = _workbook(str(tmp_path / 'b.xlsx'), seed=2, company_name='另一家公司')
+    calls = _count_full_passes(monkeypatch)
+    second = _extract(path, store)
+    assert calls == ['表1温室气体盘查表']
+    assert len(os.listdir(store.root)) == 1
+    assert second['company_name'] == '另一家公司'
+    assert second['scope_1'] != first['scope_1']
+
+    # 按版式读取的结果与完整搜索一致
+    assert second == extraction_plan.load_plan().extract(load_workbook(path, data_only=True))
+
+
+def test_stale_layout_falls_back_to_full_search(tmp_path, monkeypatch):
+    store = LayoutStore(str(tmp_path / 'layouts'))
+    path = _workbook(str(tmp_path / 'a.xlsx'))
+    expected = _extract(path, store)
+
+    # 记录的坐标指向不再匹配标签的单元格
+    for name in os.listdir(store.root):
+        layout = store.get(name[:-len('.json')])
+        layout = [[1, 1] if isinstance(entry, list) else entry for entry in layout]
+        with open(os.path.join(store.root, name), 'w', encoding='utf-8') as f:
+            json.dump(layout, f)
+
+    calls = _count_full_passes(monkeypatch)
+    assert _extract(path, store) == expected
+    assert sorted(calls) == ['温室气体盘查清册', '表1温室气体盘查表']
+    # 重新记录后再次命中
+    calls.clear()
+    assert _extract(path, store) == expected
+    assert calls == ['表1温室气体盘查表']
+
+
+def _body_workbook(path, cells):
+    """两个 100 行的工作表，前 50 行只有标题（指纹相同），cells 为 (工作表, 单元格, 值)"""
+    workbook = Workbook()
+    workbook.active.title = '标签'
+    workbook.create_sheet('邻近')
+    for sheet in workbook.worksheets:
+        sheet['A1'] = '标题'
+        sheet['C100'] = '结束'
+    for name, cell, value in cells:
+        workbook[name][cell] = value
+    workbook.save(path)
+    return path
+
+
+def test_body_change_outside_fingerprint_falls_back_to_full_search(tmp_path, monkeypatch):
+    store = LayoutStore(str(tmp_path / 'layouts'))
+    plan = extraction_plan.compile_plan({
+        'name': 'body',
+        'sheets': {'label': {'candidates': ['标签']}, 'near': {'candidates': ['邻近']}},
+        'fields': [
+            {'name': 'target', 'sheet': 'label', 'strategies': [{'label': '目标', 'direction': 'right'}]},
+            {'name': 'total', 'sheet': 'near', 'strategies': [{'near': '总量', 'radius': 1, 'min_value': 10}]},
+        ],
+    })
+    body = [('标签', 'A80', '目标'), ('标签', 'B80', 100), ('邻近', 'A80', '总量'), ('邻近', 'B80', 20)]
+    first = load_workbook(_body_workbook(str(tmp_path / 'a.xlsx'), body))
+    assert plan.extract(first, layout_store=store) == {'target': 100, 'total': 20}
+    assert len(os.listdir(store.root)) == 1
+
+    # 第 60 行新增的标签和候选值都在指纹之外
+    moved = body + [('标签', 'A60', '目标'), ('标签', 'B60', 200), ('邻近', 'A60', '总量'), ('邻近', 'B60', 30)]
+    second = load_workbook(_body_workbook(str(tmp_path / 'b.xlsx'), moved))
+    for name, label in (('标签', '目标'), ('邻近', '总量')):
+        assert sheet_fingerprint(second[name], [label]) == sheet_fingerprint(first[name], [label])
+    assert plan.extract(second, layout_store=store) == plan.extract(second) == {'target': 200, 'total': 30}
+
+    # 重新记录后只有取值变化：标签工作表按版式读取，邻近工作表完整遍历
+    third = load_workbook(_body_workbook(str(tmp_path / 'c.xlsx'), moved + [('标签', 'B60', 300)]))
+    calls = _count_full_passes(monkeypatch)
+    assert plan.extract(third, layout_store=store) == {'target': 300, 'total': 30}
+    assert calls == ['邻近']
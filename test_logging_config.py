@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试日志配置：JSON 格式、按模块设置级别、热路径日志默认关闭
+"""
+
+import io
+import json
+import logging
+import os
+
+import pytest
+
+from data_reader import ExcelDataReader
+from logging_config import JsonFormatter, configure_logging, parse_module_levels
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    level = root.level
+    yield
+    root.setLevel(level)
+    for name in ('data_reader', 'ai_service'):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    configure_logging(level=level, json_format=False, module_levels={}, stream=io.StringIO())
+
+
+def test_parse_module_levels():
+    assert parse_module_levels("data_reader=debug, ai_service=WARNING,bad") == {
+        'data_reader': 'DEBUG',
+        'ai_service': 'WARNING',
+    }
+    assert parse_module_levels(None) == {}
+
+
+def test_json_formatter_outputs_one_object_per_line(restore_logging):
+    stream = io.StringIO()
+    configure_logging(level='INFO', json_format=True, module_levels={}, stream=stream)
+
+    logging.getLogger('ai_service').info("批量生成执行摘要: 共 %s 条", 3)
+
+    entry = json.loads(stream.getvalue().strip())
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'ai_service'
+    assert entry['message'] == "批量生成执行摘要: 共 3 条"
+    assert JsonFormatter().format(logging.makeLogRecord({'msg': 'x'})).startswith('{')
+
+
+def test_module_levels_override_global_level(restore_logging):
+    stream = io.StringIO()
+    configure_logging(level='WARNING', json_format=False,
+                      module_levels={'data_reader': 'DEBUG'}, stream=stream)
+
+    logging.getLogger('data_reader').debug("数据提取完成")
+    logging.getLogger('ai_service').info("不应输出")
+
+    output = stream.getvalue()
+    assert "数据提取完成" in output
+    assert "不应输出" not in output
+
+
+def test_hot_path_messages_are_off_by_default(restore_logging, capsys):
+    stream = io.StringIO()
+    configure_logging(level='INFO', json_format=False, module_levels={}, stream=stream)
+
+    reader = ExcelDataReader(os.path.join(HERE, 'test_data.xlsx'))
+    reader.extract_data(csv_path=None)
+
+    # 调试级别的完整数据字典不再输出到任何地方
+    assert "成功加载 Excel" in stream.getvalue()
+    assert "数据提取完成" not in stream.getvalue()
+    assert "数据提取完成" not in capsys.readouterr().out
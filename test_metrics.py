@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试耗时统计：span 聚合、请求级耗时字典、Prometheus 文本输出
+"""
+
+import os
+
+import pytest
+
+import metrics
+from data_reader import ExcelDataReader
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.REGISTRY.reset()
+    yield
+    metrics.REGISTRY.reset()
+
+
+def test_span_records_histogram_and_request_timings():
+    with metrics.request_timings() as timings:
+        with metrics.span('render'):
+            pass
+        with metrics.span('render'):
+            pass
+
+    assert set(timings) == {'render'}
+    assert metrics.REGISTRY.histogram_count(metrics.STAGE_DURATION, stage='render') == 2
+
+    # 不在 request_timings 中时只写入全局直方图
+    with metrics.span('save'):
+        pass
+    assert 'save' not in timings
+    assert metrics.REGISTRY.histogram_count(metrics.STAGE_DURATION, stage='save') == 1
+
+
+def test_span_counts_errors():
+    with pytest.raises(ValueError):
+        with metrics.span('ai_call'):
+            raise ValueError("boom")
+
+    assert metrics.REGISTRY.counter_value(metrics.STAGE_ERRORS, stage='ai_call') == 1
+    assert metrics.REGISTRY.histogram_count(metrics.STAGE_DURATION, stage='ai_call') == 1
+
+
+def test_prometheus_text_format():
+    metrics.REGISTRY.observe(metrics.STAGE_DURATION, 0.02, stage='render')
+    metrics.REGISTRY.inc(metrics.REQUESTS, endpoint='/api/generate', status=200)
+
+    text = metrics.render_prometheus()
+    assert '# TYPE report_stage_duration_seconds histogram' in text
+    assert 'report_stage_duration_seconds_bucket{stage="render",le="0.01"} 0' in text
+    assert 'report_stage_duration_seconds_bucket{stage="render",le="0.025"} 1' in text
+    assert 'report_stage_duration_seconds_bucket{stage="render",le="+Inf"} 1' in text
+    assert 'report_stage_duration_seconds_count{stage="render"} 1' in text
+    assert 'report_requests_total{endpoint="/api/generate",status="200"} 1' in text
+
+
+def test_server_timing_header():
+    assert metrics.server_timing_header({'render': 0.0125, 'save': 0.5}) == 'render;dur=12.5, save;dur=500.0'
+
+
+def test_pipeline_stages_are_instrumented():
+    with metrics.request_timings() as timings:
+        reader = ExcelDataReader(os.path.join(HERE, '减排行动统计.csv'))
+        reader.extract_data()
+
+    assert 'csv_parse' in timings
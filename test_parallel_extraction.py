@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试多工作表并行提取：进程池结果与逐表顺序读取一致，并按请求顺序合并
+"""
+
+import extraction_plan
+import parallel_extraction
+from data_reader import ExcelDataReader
+from synthetic_data import generate_workbook
+
+
+def test_read_sheets_matches_sequential_reader(tmp_path):
+    path = str(tmp_path / 'facilities.xlsx')
+    generate_workbook(path, activity_rows=30, sheet_count=5, noise=0.1, seed=3)
+    reader = ExcelDataReader(path)
+    names = list(reversed(reader.workbook.sheetnames)) + ['不存在的工作表']
+
+    tables = parallel_extraction.read_sheets(path, names, max_workers=2, header_row=2)
+    assert list(tables) == names[:-1]
+    for name, rows in tables.items():
+        assert rows == reader.read_to_list_of_dicts(name, header_row=2)
+
+
+def test_extract_plan_matches_single_process(tmp_path):
+    path = str(tmp_path / 'inventory.xlsx')
+    generate_workbook(path, activity_rows=30, sheet_count=3, seed=4)
+    plan = extraction_plan.load_plan()
+    expected = plan.extract(ExcelDataReader(path).workbook)
+
+    assert parallel_extraction.extract_plan(path, plan, max_workers=2) == expected
+    assert parallel_extraction.extract_plan(path, plan, max_workers=1) == expected
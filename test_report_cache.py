@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试整份报告缓存：缓存键覆盖所有输入、按磁盘配额做 LRU 淘汰、命中时跳过提取和渲染
+"""
+
+import io
+import os
+import time
+from datetime import date
+
+import docx
+
+from report_cache import ReportCache, report_cache_key
+from report_writer import WordReportWriter
+
+
+def test_key_covers_every_input():
+    base = ('digest', 'template-v1', '测试企业', '2024', 'local', '2025-01-01')
+    keys = {report_cache_key(*base)}
+    for index, value in enumerate(('other', 'template-v2', '其他企业', '2023', 'openai', '2025-01-02')):
+        changed = list(base)
+        changed[index] = value
+        keys.add(report_cache_key(*changed))
+    assert len(keys) == 7
+
+
+def test_lru_eviction_by_disk_quota(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=30)
+    cache.put('a', b'0123456789')
+    cache.put('b', io.BytesIO(b'0123456789'), meta={'n': 1})
+    past = time.time() - 100
+    os.utime(tmp_path / 'a.docx', (past, past))
+    os.utime(tmp_path / 'b.docx', (past + 1, past + 1))
+
+    # 读取 a 使其成为最近使用的条目，写入 c 时淘汰 b
+    report_file, meta = cache.get('a')
+    report_file.close()
+    assert meta == {}
+    cache.put('c', b'0123456789')
+    assert cache.get('b') is None
+    assert sorted(os.listdir(tmp_path)) == ['a.docx', 'c.docx']
+
+    assert ReportCache(str(tmp_path), max_bytes=0).get('a') is None
+
+
+def test_title_page_uses_explicit_date():
+    writer = WordReportWriter()
+    writer.add_title_page('测试企业', '2024', date(2023, 5, 6))
+    text = '\n'.join(p.text for p in writer.doc.paragraphs)
+    assert '编制日期：2023年05月06日' in text
+    assert 'DY-GHG-2023-01' in text
+
+
+def test_generate_hit_skips_pipeline(monkeypatch, tmp_path):
+    import web_api
+
+    monkeypatch.setattr(web_api, 'report_cache', ReportCache(str(tmp_path)))
+    with open('test_data.xlsx', 'rb') as f:
+        content = f.read()
+
+    def post():
+        payload = {'excel_file': (io.BytesIO(content), 'test_data.xlsx'), 'company_name': '测试企业',
+                   'summary_backend': 'local'}
+        return web_api.app.test_client().post('/api/generate', data=payload, content_type='multipart/form-data')
+
+    first = post()
+    assert first.status_code == 200
+
+    def fail(*args, **kwargs):
+        raise AssertionError("命中缓存时不应再提取数据")
+
+    monkeypatch.setattr(web_api, 'open_upload', fail)
+    second = post()
+    assert second.status_code == 200
+    assert second.data == first.data
+    docx.Document(io.BytesIO(second.data))
+
+
+def test_fallback_summary_is_not_cached(monkeypatch, tmp_path):
+    import web_api
+
+    monkeypatch.setattr(web_api, 'report_cache', ReportCache(str(tmp_path)))
+    # 摘要后端暂时不可用：执行摘要降级为安全网
+    monkeypatch.setattr(web_api.ai_service.get_backend('local'), 'summarize', lambda *args, **kwargs: None)
+    with open('test_data.xlsx', 'rb') as f:
+        content = f.read()
+
+    def post():
+        payload = {'excel_file': (io.BytesIO(content), 'test_data.xlsx'), 'company_name': '测试企业',
+                   'summary_backend': 'local'}
+        return web_api.app.test_client().post('/api/generate', data=payload, content_type='multipart/form-data')
+
+    assert post().status_code == 200
+    assert os.listdir(tmp_path) == []
+
+    # 后端恢复后相同的上传重新生成并写入缓存
+    monkeypatch.undo()
+    monkeypatch.setattr(web_api, 'report_cache', ReportCache(str(tmp_path)))
+    assert post().status_code == 200
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.docx')]
+
+
+def test_template_version_covers_extraction_and_summary_code(monkeypatch, tmp_path):
+    import shutil
+
+    import report_cache
+
+    for name in report_cache.REPORT_SOURCE_FILES:
+        shutil.copy(name, tmp_path / name)
+    shutil.copytree('extraction_plans', tmp_path / 'extraction_plans')
+    monkeypatch.setattr(report_cache, '__file__', str(tmp_path / 'report_cache.py'))
+    versions = {report_cache.writer_template_version()}
+
+    # 摘要代码和提取计划的改动都使模板版本变化
+    for changed in ('ai_service.py', 'data_reader.py', 'extraction_plans/default.json'):
+        with open(tmp_path / changed, 'a', encoding='utf-8') as f:
+            f.write('\n')
+        versions.add(report_cache.writer_template_version())
+    assert len(versions) == 4
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试报告存储：唯一 ID 与下载令牌、内容去重、TTL 和总大小清理，以及 app.py 的下载流程
+"""
+
+import io
+import os
+import time
+
+import docx
+
+from report_cache import ReportCache
+from report_store import ReportStore
+
+
+def _blobs(store):
+    return [name for name in os.listdir(store.blob_dir) if name.endswith('.docx')]
+
+
+def test_put_get_and_token_check(tmp_path):
+    store = ReportStore(str(tmp_path))
+    report_id, token = store.put(b'report-a', 'a.docx')
+    other_id, other_token = store.put(io.BytesIO(b'report-b'), 'b.docx')
+    assert report_id != other_id
+
+    path, filename = store.get(report_id, token)
+    assert filename == 'a.docx'
+    with open(path, 'rb') as f:
+        assert f.read() == b'report-a'
+
+    # 令牌只能下载自己的报告
+    assert store.get(report_id, other_token) is None
+    assert store.get('../records', token) is None
+    assert store.get(report_id, None) is None
+
+
+def test_identical_reports_share_one_blob(tmp_path):
+    store = ReportStore(str(tmp_path))
+    first = store.put(b'same', 'a.docx')
+    second = store.put(b'same', 'b.docx')
+    assert first[0] != second[0]
+    assert len(_blobs(store)) == 1
+    assert store.get(*first)[0] == store.get(*second)[0]
+
+
+def test_cleanup_expires_and_bounds_size(tmp_path):
+    store = ReportStore(str(tmp_path), ttl_seconds=60, max_bytes=10)
+    old = store.put(b'12345678', 'old.docx')
+    new = store.put(b'abcdefgh', 'new.docx')
+
+    # 总大小 16 字节超过上限，最早的报告被淘汰，其内容在宽限期后删除
+    assert store.cleanup(now=time.time() + 1) == 1
+    assert store.get(*old) is None
+    assert store.get(*new) is not None
+
+    assert store.cleanup(now=time.time() + 3600) == 1
+    assert store.get(*new) is None
+    assert _blobs(store) == []
+
+
+def test_cleanup_removes_stale_temp_files(tmp_path):
+    store = ReportStore(str(tmp_path), ttl_seconds=60)
+    # 工作进程在写入中途被终止时留下的临时文件
+    leftovers = [tmp_path / 'blobs' / 'abc.tmp', tmp_path / 'records' / 'def.tmp']
+    for path in leftovers:
+        path.write_bytes(b'partial')
+
+    store.cleanup(now=time.time() + 1)
+    assert all(path.exists() for path in leftovers)
+    store.cleanup(now=time.time() + 120)
+    assert not any(path.exists() for path in leftovers)
+
+
+def test_app_downloads_are_isolated_per_user(monkeypatch, tmp_path):
+    import app as web_app
+
+    monkeypatch.setattr(web_app, 'report_store', ReportStore(str(tmp_path / 'store')))
+    monkeypatch.setattr(web_app, 'report_cache', ReportCache(str(tmp_path / 'cache')))
+    monkeypatch.setattr(web_app.ai_service, 'generate_executive_summary', lambda data, **kwargs: '测试摘要')
+    web_app.app.config['TESTING'] = True
+
+    owner = web_app.app.test_client()
+    with open('test_data.xlsx', 'rb') as f:
+        response = owner.post('/generate_report', data={'file': (io.BytesIO(f.read()), 'test_data.xlsx')},
+                              content_type='multipart/form-data')
+    assert response.status_code == 200
+    link = response.get_data(as_text=True).split('href="/download_report/', 1)[1].split('"', 1)[0]
+    link = '/download_report/' + link.replace('&amp;', '&')
+
+    for url in (link, '/download_report'):
+        download = owner.get(url)
+        assert download.status_code == 200
+        docx.Document(io.BytesIO(download.data))
+
+    # 其他用户既没有 session 中的报告，也无法猜出令牌
+    stranger = web_app.app.test_client()
+    assert stranger.get('/download_report').status_code == 302
+    assert stranger.get(link.split('?')[0] + '?token=wrong').status_code == 302
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试预编译的单次扫描 AI 响应校验器
+"""
+
+from response_validator import ResponseValidator, find_forbidden_text
+
+TEST_DATA = {
+    'company_name': '测试企业',
+    'total_emission_location': '10,000.50',
+    'scope_1': '3000',
+    'scope_2_location': '4000.25',
+    'scope_3': '3000.25'
+}
+
+
+def _is_valid(content):
+    return ResponseValidator(TEST_DATA).validate(content)[0]
+
+
+def test_original_numbers_sorted():
+    validator = ResponseValidator(TEST_DATA)
+    assert validator.original_numbers == sorted(validator.original_numbers)
+    assert 4000.25 in validator.original_numbers
+
+
+def test_accepts_original_and_derived_numbers():
+    """原始数字、年份、百分比和小序号都可以出现"""
+    assert _is_valid("测试企业2024年总排放量为10,000.50 tCO2e，范围二排放4000.25 tCO2e，占比40.0%。")
+    assert _is_valid("范围一排放3000.001 tCO2e，共3个范围。")
+
+
+def test_rejects_unknown_numbers():
+    assert not _is_valid("测试企业总排放量为15000 tCO2e。")
+    # 0-100 之间但不在百分比语境中的数字
+    assert not _is_valid("测试企业共有设施75套，分布在各地区。")
+
+
+def test_rejects_forbidden_formats_and_keywords():
+    assert not _is_valid("## 执行摘要")
+    assert not _is_valid("范围一排放**3000** tCO2e")
+    assert not _is_valid("范围一 - 直接排放3000 tCO2e")
+    assert not _is_valid("企业排放量预计将持续下降。")
+    # '1.' 出现在数字内部也算禁用格式，与原实现保持一致
+    assert not _is_valid("范围一占比21.5%。")
+
+
+def test_find_forbidden_text_from_offset():
+    assert find_forbidden_text("前面有**加粗", 0) == '**'
+    assert find_forbidden_text("前面有**加粗", 5) is None
+    assert find_forbidden_text("第1.条", 0) == '1.'
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按工作表内容的增量提取：只重新解析内容变化的工作表，结果与完整提取一致
+"""
+
+import datetime
+import zipfile
+
+from openpyxl import load_workbook
+
+import extraction_plan
+from data_reader import ExcelDataReader
+from layout_store import LayoutStore
+from sheet_cache import SheetCache, sheet_part_hashes, sheet_parts
+from synthetic_data import generate_workbook
+
+TABLE_SHEET = '表1温室气体盘查表'
+
+
+def _saved_copy(source, target, edit=None):
+    """用 openpyxl 重新保存（模拟分析师编辑后保存），edit 为可选的 (工作表, 单元格, 值)"""
+    workbook = load_workbook(source)
+    if edit:
+        sheet, cell, value = edit
+        workbook[sheet][cell] = value
+    workbook.save(target)
+    return target
+
+
+def _count_visits(monkeypatch):
+    visited = []
+    original = extraction_plan.CompiledPlan.visit_sheet
+
+    def counting_visit_sheet(self, alias, sheet):
+        visited.append(sheet.title)
+        return original(self, alias, sheet)
+
+    monkeypatch.setattr(extraction_plan.CompiledPlan, 'visit_sheet', counting_visit_sheet)
+    return visited
+
+
+def test_part_hashes_change_only_for_edited_sheet(tmp_path):
+    generate_workbook(str(tmp_path / 'raw.xlsx'), activity_rows=20, sheet_count=4, seed=5)
+    before = _saved_copy(str(tmp_path / 'raw.xlsx'), str(tmp_path / 'before.xlsx'))
+    after = _saved_copy(before, str(tmp_path / 'after.xlsx'), edit=(TABLE_SHEET, 'Z1', 1.5))
+
+    old, new = sheet_part_hashes(before), sheet_part_hashes(after)
+    assert list(old) == load_workbook(before, read_only=True).sheetnames
+    assert [name for name in old if old[name] != new[name]] == [TABLE_SHEET]
+    assert sheet_part_hashes(str(tmp_path / 'missing.xlsx')) is None
+
+
+def test_part_hashes_use_content_not_zip_directory(tmp_path):
+    generate_workbook(str(tmp_path / 'raw.xlsx'), activity_rows=20, sheet_count=2, seed=7)
+    original = str(tmp_path / 'original.xlsx')
+    # 不压缩地重新打包，便于在不改变 zip 目录（CRC32、大小）的情况下改动部件内容
+    with zipfile.ZipFile(str(tmp_path / 'raw.xlsx')) as source, \
+            zipfile.ZipFile(original, 'w', zipfile.ZIP_STORED) as target:
+        for info in source.infolist():
+            target.writestr(info.filename, source.read(info))
+    with zipfile.ZipFile(original) as archive:
+        part = dict(sheet_parts(archive))[TABLE_SHEET]
+        content = archive.read(part)
+
+    position = content.index(b'<v>') + 3
+    forged_content = content[:position] + (b'9' if content[position:position + 1] != b'9' else b'8') + \
+        content[position + 1:]
+    raw = (tmp_path / 'original.xlsx').read_bytes()
+    forged = tmp_path / 'forged.xlsx'
+    forged.write_bytes(raw.replace(content, forged_content, 1))
+
+    # 部件内容不同而 zip 目录相同：不能得到相同的哈希（CRC32 校验失败，视为无效）
+    with zipfile.ZipFile(str(forged)) as archive, zipfile.ZipFile(original) as reference:
+        assert archive.getinfo(part).CRC == reference.getinfo(part).CRC
+    assert sheet_part_hashes(original) is not None
+    assert sheet_part_hashes(str(forged)) is None
+
+
+def test_reupload_reparses_only_changed_sheets(tmp_path, monkeypatch):
+    generate_workbook(str(tmp_path / 'raw.xlsx'), activity_rows=20, sheet_count=4, seed=6)
+    before = _saved_copy(str(tmp_path / 'raw.xlsx'), str(tmp_path / 'before.xlsx'))
+    after = _saved_copy(before, str(tmp_path / 'after.xlsx'), edit=(TABLE_SHEET, 'Z1', 1.5))
+    cache = SheetCache(str(tmp_path / 'sheets'))
+    layouts = LayoutStore(str(tmp_path / 'layouts'))
+
+    def extract(path):
+        reader = ExcelDataReader(path, layout_store=layouts, sheet_cache=cache)
+        data = reader.extract_data(csv_path=None)
+        # 增量提取不完整加载工作簿
+        assert reader._workbook is None
+        return data
+
+    visited = _count_visits(monkeypatch)
+    first = extract(before)
+    assert sorted(visited) == ['温室气体盘查清册', TABLE_SHEET]
+
+    visited.clear()
+    assert extract(before) == first
+    assert visited == []
+
+    visited.clear()
+    edited = extract(after)
+    assert visited == [TABLE_SHEET]
+    # 与禁用缓存、完整加载工作簿的提取结果一致
+    monkeypatch.setenv('SHEET_CACHE_DIR', '')
+    assert edited == ExcelDataReader(after, layout_store=layouts).extract_data(csv_path=None)
+
+
+def test_cached_state_round_trips_cell_values(tmp_path):
+    cache = SheetCache(str(tmp_path / 'sheets'))
+    state = {'results': [[0, datetime.datetime(2024, 12, 31, 8, 30)], [1, '公司'], [2, 1.5]],
+             'positions': [[0, [3, 2]]], 'near_labels': [[3, [[10, 4]]]], 'candidates': [[3, [[2000000.0, 9, 5]]]]}
+    cache.put('key', state)
+    assert cache.get('key') == state
+    assert cache.get('other') is None
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试工作表列式快照：取值与 openpyxl 一致，按工作表内容复用，多个工作进程映射同一份快照
+"""
+
+import datetime
+import mmap
+import os
+import tracemalloc
+
+from openpyxl import Workbook, load_workbook
+
+import parallel_extraction
+import sheet_snapshot
+from data_reader import ExcelDataReader
+from sheet_snapshot import SnapshotStore
+from synthetic_data import generate_workbook
+
+TABLE_SHEET = '表1温室气体盘查表'
+
+
+def _snapshots(store):
+    return sorted(name for name in os.listdir(store.root) if name.endswith('.snap'))
+
+
+def test_snapshot_round_trips_cell_values(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = '类型'
+    sheet.append(['固定燃烧', 3, 2.5, True, datetime.datetime(2024, 12, 31, 8, 30), datetime.time(8, 30), -7, '固定燃烧'])
+    sheet['B3'] = datetime.timedelta(days=2, seconds=5)
+    sheet['B3'].number_format = '[h]:mm:ss'
+    path = str(tmp_path / 'types.xlsx')
+    workbook.save(path)
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+
+    expected = list(load_workbook(path, data_only=True)['类型'].iter_rows(values_only=True))
+    for _ in range(2):
+        snapshot = sheet_snapshot.open_workbook(path, store)
+        sheet = snapshot['类型']
+        assert isinstance(sheet, sheet_snapshot.SnapshotSheet)
+        assert list(sheet.iter_rows(values_only=True)) == expected
+        assert sheet.cell(1, 8).value is sheet.cell(1, 1).value
+        assert sheet.cell(99, 99).value is None
+        # 数值列直接指向映射的文件
+        kinds, values = sheet.column(2)
+        assert isinstance(values.obj, mmap.mmap) and values[0] == 3.0
+        snapshot.close()
+    assert len(_snapshots(store)) == 1
+
+    # 损坏的快照重新生成
+    with open(os.path.join(store.root, _snapshots(store)[0]), 'wb') as f:
+        f.write(b'broken')
+    snapshot = sheet_snapshot.open_workbook(path, store)
+    assert list(snapshot['类型'].iter_rows(values_only=True)) == expected
+    snapshot.close()
+
+
+def test_reader_results_and_reuse_across_uploads(tmp_path, monkeypatch):
+    monkeypatch.setenv('LAYOUT_STORE_DIR', '')
+    monkeypatch.setenv('SHEET_CACHE_DIR', '')
+    monkeypatch.setenv('SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    raw = str(tmp_path / 'raw.xlsx')
+    generate_workbook(raw, activity_rows=30, sheet_count=3, noise=0.1, seed=8)
+    before, after = str(tmp_path / 'before.xlsx'), str(tmp_path / 'after.xlsx')
+    load_workbook(raw).save(before)
+    edited = load_workbook(before)
+    edited[TABLE_SHEET]['Z1'] = 1.5
+    edited.save(after)
+
+    expected = ExcelDataReader(before, backend='openpyxl')
+    snapshot = ExcelDataReader(before, backend='snapshot')
+    assert snapshot.extract_data(csv_path=None) == expected.extract_data(csv_path=None)
+    for name in expected.workbook.sheetnames:
+        assert snapshot.read_to_list_of_dicts(name, header_row=2) == expected.read_to_list_of_dicts(name, header_row=2)
+    assert snapshot.find_value_by_label('温室气体盘查清册', '组织名称') == \
+        expected.find_value_by_label('温室气体盘查清册', '组织名称')
+
+    # 改动一个工作表后重新上传：只为该工作表写入新快照
+    store = sheet_snapshot.default_store()
+    written = _snapshots(store)
+    assert len(written) == len(expected.workbook.sheetnames)
+    ExcelDataReader(after, backend='snapshot').extract_data(csv_path=None)
+    assert len(set(_snapshots(store)) - set(written)) == 1
+
+
+def test_worker_processes_map_existing_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setenv('SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    monkeypatch.setenv('EXCEL_BACKEND', 'snapshot')
+    path = str(tmp_path / 'facilities.xlsx')
+    generate_workbook(path, activity_rows=20, sheet_count=4, seed=10)
+    reader = ExcelDataReader(path, backend='openpyxl')
+    expected = {name: reader.read_to_list_of_dicts(name, header_row=2) for name in reader.workbook.sheetnames}
+
+    assert parallel_extraction.read_sheets(path, max_workers=2, header_row=2) == expected
+    written = {name: os.path.getmtime(os.path.join(str(tmp_path / 'snapshots'), name))
+               for name in _snapshots(sheet_snapshot.default_store())}
+    assert len(written) == len(expected)
+    # 第二次由工作进程直接映射已有快照，不再写入
+    assert parallel_extraction.read_sheets(path, max_workers=2, header_row=2) == expected
+    assert sorted(written) == _snapshots(sheet_snapshot.default_store())
+
+
+class _GeneratedSheet:
+    """按需生成行的工作表，用于测量写快照时的内存"""
+    title = '生成'
+
+    def __init__(self, rows, columns):
+        self.max_row, self.max_column = rows, columns
+
+    def iter_rows(self, min_row, max_row, max_col, values_only):
+        for row in range(min_row, max_row + 1):
+            yield tuple(None if (row + column) % 5 == 0 else (f'标签{row % 7}' if column == 1 else row * column + 0.5)
+                        for column in range(1, max_col + 1))
+
+
+def test_snapshot_is_written_in_row_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(sheet_snapshot, '_BLOCK_CELLS', 1000)
+    sheet = _GeneratedSheet(4000, 40)
+    path = str(tmp_path / 'generated.snap')
+
+    tracemalloc.start()
+    sheet_snapshot.write_snapshot(path, sheet)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # 整张工作表的网格需要 4000 × 40 × 9 字节（约 1.4MB），按行块写出时只需要一个行块
+    assert peak < 4000 * 40 * 9 / 4
+
+    snapshot = sheet_snapshot.SnapshotSheet(path)
+    try:
+        expected = list(sheet.iter_rows(1, 4000, 40, True))
+        assert list(snapshot.iter_rows(values_only=True)) == expected
+    finally:
+        snapshot.close()
+
+
+def test_new_snapshot_survives_eviction(tmp_path, monkeypatch):
+    path = str(tmp_path / 'facilities.xlsx')
+    generate_workbook(path, activity_rows=20, sheet_count=3, seed=11)
+    expected = load_workbook(path, data_only=True)
+    # 配额小于任何一个快照：每次写入都会触发淘汰，刚写入的快照不能被删除
+    store = SnapshotStore(str(tmp_path / 'snapshots'), max_bytes=1)
+    snapshot = sheet_snapshot.open_workbook(path, store)
+    try:
+        for name in expected.sheetnames:
+            sheet = snapshot[name]
+            assert isinstance(sheet, sheet_snapshot.SnapshotSheet)
+            assert list(sheet.iter_rows(values_only=True)) == list(expected[name].iter_rows(values_only=True))
+    finally:
+        snapshot.close()
+
+    # 快照无法写入时使用解析结果
+    def fail(*args, **kwargs):
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(sheet_snapshot, 'write_snapshot', fail)
+    snapshot = sheet_snapshot.open_workbook(path, SnapshotStore(str(tmp_path / 'other')))
+    try:
+        assert snapshot[TABLE_SHEET].max_row > 0
+        assert not isinstance(snapshot[TABLE_SHEET], sheet_snapshot.SnapshotSheet)
+    finally:
+        snapshot.close()
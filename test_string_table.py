@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试工作簿字符串表：文本去重、按编号缓存的匹配，以及按标签查找与逐单元格比较的结果一致
+"""
+
+import re
+
+from openpyxl import Workbook
+
+from data_reader import ExcelDataReader
+from string_table import SheetIndex, StringTable
+from synthetic_data import generate_workbook
+from xlsx_stream import open_workbook
+
+
+def test_interning_and_cached_matching():
+    strings = StringTable()
+    first = strings.intern(''.join(['固定', '燃烧']))
+    assert strings.intern('固定燃烧') == first
+    assert strings.text(''.join(['固定', '燃烧'])) is strings.strings[first]
+    units = strings.intern('排放量（tCO2e）')
+    full_width = strings.intern('排放量（ｔＣＯ２ｅ）')
+    number = strings.intern(2024)
+
+    assert strings.matching('TCO2E') == {units}
+    assert strings.matching('tCO2e', case_sensitive=True) == {units}
+    assert strings.matching('TCO2E', normalize=True) == {units, full_width}
+    assert strings.matching('固定燃烧', exact=True) == {first}
+    assert strings.matching('2024') == {number}
+    assert strings.search(re.compile(r'co2e$', re.IGNORECASE)) == set()
+
+    # 缓存的查询结果随字符串表增长补上新加入的文本
+    later = strings.intern('移动燃烧')
+    assert strings.matching('燃烧') == {first, later}
+
+
+def test_sheet_index_finds_first_match_in_row_major_order():
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet['C2'], sheet['A3'], sheet['B5'] = '范围一排放', '范围一', '范围一排放'
+    strings = StringTable()
+    index = SheetIndex(sheet, strings)
+
+    assert index.first(strings.matching('范围一')) == (2, 3)
+    assert index.first(strings.matching('范围一'), column=2) == (5, 2)
+    assert index.first(strings.matching('范围一'), min_row=3, max_row=4) == (3, 1)
+    assert index.first(strings.matching('范围二')) is None
+    assert index.positions(strings.matching('范围一')) == [(2, 3), (3, 1), (5, 2)]
+
+
+def test_label_lookups_match_cell_by_cell_scan(tmp_path):
+    reader = ExcelDataReader('test_data.xlsx')
+    sheet = reader.workbook['温室气体盘查清册']
+
+    def scan(label, exact=False):
+        for row in sheet.iter_rows():
+            for cell in row:
+                if cell.value is not None:
+                    text = str(cell.value).lower()
+                    if (text == label.lower()) if exact else (label.lower() in text):
+                        return sheet.cell(row=cell.row, column=cell.column + 1).value
+        return None
+
+    for label in ('组织名称：', '盘查年度', '范围', 'TCO2E', '总排放量', '不存在的标签'):
+        assert reader.find_value_by_label('温室气体盘查清册', label) == scan(label)
+    assert reader.find_value_by_label('温室气体盘查清册', '组织名称：', exact_match=True) == scan('组织名称：', True)
+    assert set(reader._sheet_indexes) == {'温室气体盘查清册'}
+
+    # 流式后端读取时相同文本的单元格共用同一个字符串对象
+    path = str(tmp_path / 'inventory.xlsx')
+    generate_workbook(path, activity_rows=20, sheet_count=2, seed=9)
+    streamed = open_workbook(path, backend='stream')
+    texts = [v for row in streamed['表1温室气体盘查表'].iter_rows(values_only=True) for v in row if isinstance(v, str)]
+    repeated = [text for text in texts if texts.count(text) > 1]
+    assert repeated and all(text is streamed.strings.text(text) for text in repeated)
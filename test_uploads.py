@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试上传文件的内存处理：工作簿从请求流读取，报告渲染到内存后直接返回
+"""
+
+import io
+import os
+
+import docx
+from werkzeug.datastructures import FileStorage
+
+import uploads
+from data_reader import ExcelDataReader
+from report_cache import ReportCache
+
+
+def test_reader_loads_workbook_from_stream():
+    with open('test_data.xlsx', 'rb') as f:
+        stream = io.BytesIO(f.read())
+
+    from_stream = ExcelDataReader('upload.XLSX', stream=stream).extract_data(csv_path=None)
+    from_path = ExcelDataReader('test_data.xlsx').extract_data(csv_path=None)
+    assert from_stream == from_path
+
+
+def test_csv_upload_temp_file_is_removed():
+    with open('减排行动统计.csv', 'rb') as f:
+        storage = FileStorage(stream=io.BytesIO(f.read()), filename='减排行动统计.csv')
+
+    with uploads.open_upload(storage) as reader:
+        path = reader.filepath
+        assert reader.extract_data()['company_name']
+    assert not os.path.exists(path)
+
+
+def test_spooled_buffer_spills_above_threshold():
+    buffer = uploads.spooled_buffer(threshold=16)
+    buffer.write(b'x' * 8)
+    assert not buffer._rolled
+    buffer.write(b'x' * 16)
+    assert buffer._rolled
+
+
+def test_generate_returns_docx_from_memory(monkeypatch, tmp_path):
+    import web_api
+
+    # 请求期间不应向临时目录写入任何文件
+    monkeypatch.setattr(web_api, 'report_cache', ReportCache(str(tmp_path / 'cache'), max_bytes=0))
+    monkeypatch.setattr('tempfile.tempdir', str(tmp_path))
+    with open('test_data.xlsx', 'rb') as f:
+        payload = {
+            'excel_file': (io.BytesIO(f.read()), 'test_data.xlsx'),
+            'company_name': '测试企业',
+            'summary_backend': 'local',
+        }
+    response = web_api.app.test_client().post('/api/generate', data=payload, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert response.mimetype == uploads.DOCX_MIMETYPE
+    document = docx.Document(io.BytesIO(response.data))
+    assert any('测试企业' in p.text for p in document.paragraphs)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试直接流式解析 XML 的读取后端：单元格值与 openpyxl 一致，提取结果与 openpyxl 后端相同
+"""
+
+import datetime
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import extraction_plan
+from data_reader import ExcelDataReader
+from sheet_cache import SheetCache
+from synthetic_data import generate_workbook
+from xlsx_stream import open_workbook
+
+
+def test_values_match_openpyxl():
+    expected = load_workbook('test_data.xlsx', data_only=True)
+    workbook = open_workbook('test_data.xlsx', backend='stream')
+    assert workbook.sheetnames == expected.sheetnames
+
+    for name in expected.sheetnames:
+        sheet, reference = workbook[name], expected[name]
+        # <dimension> 可能比实际单元格多记一行，按 openpyxl 完整加载的尺寸比较
+        size = {'max_row': reference.max_row, 'max_col': reference.max_column}
+        assert list(sheet.iter_rows(values_only=True, **size)) == list(reference.iter_rows(values_only=True, **size))
+        assert [[cell.value for cell in row] for row in sheet.iter_rows(min_row=3, max_row=9, min_col=2, max_col=5)] \
+            == [[cell.value for cell in row] for row in reference.iter_rows(min_row=3, max_row=9, min_col=2, max_col=5)]
+        for row in range(1, reference.max_row + 1, 5):
+            for column in range(1, reference.max_column + 1):
+                assert sheet.cell(row, column).value == reference.cell(row=row, column=column).value
+    workbook.close()
+
+    with pytest.raises(KeyError):
+        open_workbook('test_data.xlsx', backend='stream')['不存在的工作表']
+    with pytest.raises(ValueError):
+        open_workbook('test_data.xlsx', backend='xlrd')
+
+
+def test_cell_types_and_unsized_sheets(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = '类型'
+    sheet.append(['文本', 3, 2.5, True, datetime.datetime(2024, 12, 31, 8, 30), datetime.date(2024, 1, 1)])
+    sheet['C4'] = '=A1'
+    sheet['F6'] = 1e-7
+    path = str(tmp_path / 'types.xlsx')
+    workbook.save(path)
+
+    reference = load_workbook(path, data_only=True)['类型']
+    sheet = open_workbook(path, backend='stream')['类型']
+    assert list(sheet.iter_rows(values_only=True)) == list(reference.iter_rows(values_only=True))
+    assert sheet.cell(1, 5).value == datetime.datetime(2024, 12, 31, 8, 30)
+
+    # 没有 <dimension> 的工作表按实际单元格计算尺寸，与 openpyxl 完整加载相同
+    generate_workbook(str(tmp_path / 'unsized.xlsx'), activity_rows=10, sheet_count=2, seed=1)
+    reference = load_workbook(str(tmp_path / 'unsized.xlsx'), data_only=True)
+    for name in reference.sheetnames:
+        sheet = open_workbook(str(tmp_path / 'unsized.xlsx'), backend='stream')[name]
+        assert (sheet.max_row, sheet.max_column) == (reference[name].max_row, reference[name].max_column)
+        assert list(sheet.iter_rows(values_only=True)) == list(reference[name].iter_rows(values_only=True))
+
+
+def test_reader_results_match_openpyxl_backend(tmp_path, monkeypatch):
+    monkeypatch.setenv('LAYOUT_STORE_DIR', '')
+    monkeypatch.setenv('SHEET_CACHE_DIR', '')
+    path = str(tmp_path / 'inventory.xlsx')
+    generate_workbook(path, activity_rows=30, sheet_count=3, noise=0.1, seed=7)
+
+    for source in ('test_data.xlsx', path):
+        expected, streamed = ExcelDataReader(source, backend='openpyxl'), ExcelDataReader(source, backend='stream')
+        assert streamed.extract_data(csv_path=None) == expected.extract_data(csv_path=None)
+        sheet_name = expected.workbook.sheetnames[0]
+        assert streamed.read_to_list_of_dicts(sheet_name, header_row=2) == \
+            expected.read_to_list_of_dicts(sheet_name, header_row=2)
+        assert streamed.find_value_by_label(sheet_name, '组织名称') == \
+            expected.find_value_by_label(sheet_name, '组织名称')
+
+    plan = extraction_plan.load_plan()
+    cache = SheetCache(str(tmp_path / 'sheets'))
+    assert plan.extract_incremental(path, cache, backend='stream') == plan.extract(load_workbook(path, data_only=True))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+上传文件和生成报告的内存处理。
+
+上传的工作簿直接从请求流（内存缓冲）交给 openpyxl，报告渲染到内存缓冲后直接发回。
+只有超过 UPLOAD_SPOOL_THRESHOLD 字节的内容才会溢出到匿名临时文件，
+不再在共享临时目录里按上传文件名落盘，也就不会有文件名冲突。
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from flask import Request, send_file
+
+from data_reader import ExcelDataReader
+
+logger = logging.getLogger(__name__)
+
+# 超过该字节数的上传文件和报告写入临时文件，默认 8MB
+SPOOL_THRESHOLD = int(os.getenv('UPLOAD_SPOOL_THRESHOLD', 8 * 1024 * 1024))
+
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
+def spooled_buffer(threshold=None):
+    """小于阈值时留在内存、超过后自动写入匿名临时文件的缓冲区。"""
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD if threshold is None else threshold)
+
+
+class SpooledRequest(Request):
+    """
+    上传文件按 SPOOL_THRESHOLD 缓冲的请求类。
+
+    werkzeug 默认在 500KB 以上就把上传写入临时文件，这里改为统一的阈值。
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return spooled_buffer()
+
+
+@contextmanager
+def open_upload(file_storage):
+    """
+    为上传文件创建 ExcelDataReader。
+
+    Excel 直接从上传流读取；CSV 解析依赖文件路径，写入唯一命名的临时文件，退出时删除。
+    """
+    filename = file_storage.filename or ''
+    if not filename.lower().endswith('.csv'):
+        file_storage.stream.seek(0)
+        yield ExcelDataReader(filename, stream=file_storage.stream)
+        return
+
+    temp_dir = tempfile.mkdtemp(prefix='upload_')
+    try:
+        path = os.path.join(temp_dir, 'upload.csv')
+        file_storage.save(path)
+        logger.debug("CSV 上传已保存到: %s", path)
+        yield ExcelDataReader(path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def render_document(writer):
+    """把 WordReportWriter 的文档保存到缓冲区，返回读取位置在开头的缓冲区。"""
+    buffer = spooled_buffer()
+    if not writer.save(buffer):
+        buffer.close()
+        raise RuntimeError("报告保存失败")
+    buffer.seek(0)
+    return buffer
+
+
+def send_docx(report_file, download_name):
+    """把已打开的报告文件作为附件返回，响应结束后文件会被关闭。"""
+    return send_file(report_file, as_attachment=True, download_name=download_name, mimetype=DOCX_MIMETYPE)
+
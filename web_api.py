@@ -1,22 +1,34 @@
 # web_api.py
-import os
-import tempfile
-from flask import Flask, request, jsonify, send_file, render_template
-from werkzeug.utils import secure_filename
+import logging
+from datetime import date
+from flask import Flask, Response, request, jsonify, render_template
 
 # 导入你作业一的"专家"
-from data_reader import ExcelDataReader
 from report_writer import WordReportWriter
 # 导入你刚写的"AI 专家"
 from ai_service import AIService
+import metrics
+from logging_config import configure_logging
+from report_cache import ReportCache, digest_stream, report_cache_key, writer_template_version
+from uploads import SpooledRequest, open_upload, render_document, send_docx
+
+logger = logging.getLogger(__name__)
 
 # 初始化 Flask 应用
 app = Flask(__name__, template_folder='templates')
+# 上传文件在内存中缓冲，超过阈值才写入临时文件
+app.request_class = SpooledRequest
+configure_logging()
 
 # 初始化我们的"专家"
 # 我们在程序启动时就初始化好，而不是每次请求都初始化
 ai_service = AIService()
 
+# 整份报告缓存，模板版本在启动时计算一次
+REPORT_FILENAME = "carbon_report_v1.docx"
+TEMPLATE_VERSION = writer_template_version()
+report_cache = ReportCache.from_env()
+
 @app.route("/")
 def hello():
     # 直接读取并返回根目录下的index.html文件
@@ -24,16 +36,29 @@ def hello():
         with open('index.html', 'r', encoding='utf-8') as f:
             return f.read()
     except Exception as e:
-        print(f"读取index.html失败: {e}")
+        logger.error("读取index.html失败: %s", e)
         return "无法加载页面", 500
 
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus 文本格式的各阶段计数和耗时直方图"""
+    return Response(metrics.render_prometheus(), content_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
 @app.route("/api/generate", methods=["POST"])
 def generate_report():
     """
     这是核心的 API 接口。
     它负责执行完整的"服务串联"。
+    各阶段耗时通过 Server-Timing 响应头返回。
     """
-    print("接收到 /api/generate 请求...")
+    with metrics.request_timings() as timings:
+        response = app.make_response(_generate_report())
+    response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+    metrics.REGISTRY.inc(metrics.REQUESTS, endpoint='/api/generate', status=response.status_code)
+    return response
+
+def _generate_report():
+    logger.info("接收到 /api/generate 请求...")
 
     try:
         # --- 1. 接收文件和参数 ---
@@ -42,75 +67,70 @@ def generate_report():
 
         file = request.files['excel_file']
         company_name = request.form.get('company_name', '未知公司')
-        report_year = request.form.get('report_year', '2024')
+        # 没有填写年份时使用从文件中提取的年度
+        report_year = request.form.get('report_year') or None
+        # 摘要后端可按请求选择，例如 "local" 完全离线生成
+        summary_backend = request.form.get('summary_backend') or None
+        if summary_backend and summary_backend not in ai_service.backends:
+            return jsonify({"error": f"未知的摘要后端: {summary_backend}"}), 400
 
         if file.filename == '':
             return jsonify({"error": "文件名为空"}), 400
 
-        # --- 2. 安全地保存临时文件 ---
-        # 我们不能直接用用户上传的文件名，不安全
-        filename = secure_filename(file.filename)
-        # 我们把它保存在一个临时的、安全的地方
-        temp_dir = tempfile.gettempdir()
-        temp_excel_path = os.path.join(temp_dir, filename)
-        file.save(temp_excel_path)
-        print(f"临时文件已保存到: {temp_excel_path}")
-
-        # --- 3. [串联第一步] 调用 DataReader ---
-        print("调用 DataReader...")
-        reader = ExcelDataReader(temp_excel_path)
-        data = reader.extract_data()
+        # --- 2. 查整份报告缓存：相同输入直接返回已生成的报告 ---
+        report_date = date.today()
+        cache_key = report_cache_key(
+            digest_stream(file.stream), TEMPLATE_VERSION, company_name, report_year,
+            summary_backend or ai_service.default_backend, report_date.isoformat(),
+        )
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("报告缓存命中，跳过提取、AI 和渲染")
+            return send_docx(cached[0], REPORT_FILENAME)
+
+        # --- 3. [串联第一步] 直接从上传流调用 DataReader ---
+        # 工作簿在内存中打开，不再按上传文件名写入共享临时目录
+        logger.debug("调用 DataReader...")
+        with open_upload(file) as reader:
+            data = reader.extract_data()
         if not data:
             return jsonify({"error": "无法从 Excel 提取数据"}), 500
 
         # 把 Web 传来的参数也补充进数据字典
         data['company_name'] = company_name
-        data['report_year'] = report_year
+        if report_year:
+            data['report_year'] = report_year
+        report_year = data.get('report_year') or report_date.year
 
         # --- 4. [串联第二步] 调用 AIService ---
-        print("调用 AIService...")
+        logger.debug("调用 AIService...")
         # 把从 Excel 读到的数据，交给 AI 去写摘要
-        summary_text = ai_service.generate_executive_summary(data)
+        summary_text, used_fallback = ai_service.generate_executive_summary(
+            data, backend=summary_backend, with_status=True)
 
         # --- 5. [串联第三步] 调用 ReportWriter ---
-        print("调用 ReportWriter...")
-        writer = WordReportWriter()
-        writer.add_title_page(company_name, report_year)
-
-        # 在这里把你新写的摘要加进去
-        writer.doc.add_heading("执行摘要", level=1)
-        writer.doc.add_paragraph(summary_text)
-
-        # 加入作业一的表格
-        writer.add_emission_table(data)
-
-        # --- 6. 准备并返回 Word 文件 ---
-        # 我们把 Word 文档也保存在临时目录
-        output_filename = "carbon_report_v1.docx"
-        temp_word_path = os.path.join(temp_dir, output_filename)
-        writer.save(temp_word_path)
-        print(f"临时报告已生成: {temp_word_path}")
-
-        # 使用 send_file 把它作为"附件"发回给浏览器
-        return send_file(
-            temp_word_path,
-            as_attachment=True,
-            download_name=output_filename # 这是浏览器下载时显示的文件名
-        )
+        logger.debug("调用 ReportWriter...")
+        with metrics.span('render'):
+            writer = WordReportWriter()
+            writer.add_title_page(company_name, report_year, report_date)
+
+            # 在这里把你新写的摘要加进去
+            writer.doc.add_heading("执行摘要", level=1)
+            writer.doc.add_paragraph(summary_text)
+
+            # 加入作业一的表格
+            writer.add_emission_table(data)
+
+        # --- 6. 把 Word 文件渲染到内存，写入缓存并作为"附件"发回给浏览器 ---
+        buffer = render_document(writer)
+        # 安全网摘要只是 AI 暂时不可用时的降级结果，不写入缓存，否则当天相同的上传都会拿到降级报告
+        if used_fallback:
+            logger.info("执行摘要使用了安全网，本次报告不写入缓存")
+        else:
+            report_cache.put(cache_key, buffer)
+        buffer.seek(0)
+        return send_docx(buffer, REPORT_FILENAME)
 
     except Exception as e:
-        print(f"生成报告时发生严重错误: {e}")
+        logger.error("生成报告时发生严重错误: %s", e)
         return jsonify({"error": f"服务器内部错误: {str(e)}"}), 500
-    finally:
-        # 无论成功还是失败，都尝试清理临时文件
-        if 'temp_excel_path' in locals() and os.path.exists(temp_excel_path):
-            try:
-                os.remove(temp_excel_path)
-            except Exception as e:
-                print(f"清理临时Excel文件失败: {e}")
-        if 'temp_word_path' in locals() and os.path.exists(temp_word_path):
-            try:
-                os.remove(temp_word_path)
-            except Exception as e:
-                print(f"清理临时Word文件失败: {e}")
-                # 文件可能正在下载，稍后会自动被系统清理
\ No newline at end of file
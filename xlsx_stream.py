@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+直接流式解析 .xlsx 工作表 XML 的轻量读取后端。
+
+openpyxl 打开工作簿时先构建完整的样式表和对象模型，读取几十个标签时这部分开销占了大头。
+本模块只做提取需要的事：用 lxml.etree.iterparse 逐行解析需要的工作表部件，
+共享字符串（xl/sharedStrings.xml）第一次用到时读成按索引访问的列表，与内联字符串一起去重到
+工作簿的 string_table.StringTable 中（相同文本只保存一份）；只取单元格缓存的值
+（不解析公式、字体、边框），解析完的元素立即清除，内存占用与行宽成正比。
+样式只读取数字格式，日期格式的数字与 openpyxl 一样转换为 datetime。
+
+StreamWorkbook / StreamSheet 提供提取代码用到的 openpyxl 接口子集
+（sheetnames、wb[name]、iter_rows、cell、max_row、max_column、title），
+提取计划、版式存储和 ExcelDataReader 的标签查找不需要区分后端：
+
+    from xlsx_stream import open_workbook
+    workbook = open_workbook('盘查.xlsx', backend='stream')
+    rows = workbook['表1温室气体盘查表'].iter_rows(min_row=2, values_only=True)
+
+后端由 backend 参数或环境变量 EXCEL_BACKEND 选择（openpyxl、stream 或 snapshot），默认 openpyxl。
+"""
+
+import os
+import zipfile
+
+import openpyxl
+from lxml import etree
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import column_index_from_string, get_column_letter, range_boundaries
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, WINDOWS_EPOCH, from_excel, from_ISO8601
+
+import sheet_cache
+from string_table import StringTable
+
+BACKENDS = ('openpyxl', 'stream', 'snapshot')
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_ROW = f'{_MAIN_NS}row'
+_CELL = f'{_MAIN_NS}c'
+_VALUE = f'{_MAIN_NS}v'
+_INLINE_STRING = f'{_MAIN_NS}is'
+_TEXT = f'{_MAIN_NS}t'
+_RUN = f'{_MAIN_NS}r'
+_SHARED_STRING = f'{_MAIN_NS}si'
+_DIMENSION = f'{_MAIN_NS}dimension'
+_SHEET_DATA = f'{_MAIN_NS}sheetData'
+_DIGITS = '0123456789'
+
+
+def open_workbook(source, backend=None, read_only=False):
+    """
+    打开工作簿，只取单元格缓存的值（相当于 openpyxl 的 data_only=True）。
+
+    Args:
+        source: .xlsx 文件路径或二进制文件对象
+        backend: 'openpyxl'、'stream' 或 'snapshot'（sheet_snapshot 的 mmap 列式快照），
+            默认使用环境变量 EXCEL_BACKEND，再默认 openpyxl
+        read_only: openpyxl 后端是否以只读模式打开；其他后端总是只读
+
+    Returns:
+        openpyxl 工作簿、StreamWorkbook 或 sheet_snapshot.SnapshotWorkbook；未知的后端抛出 ValueError
+    """
+    backend = backend or os.getenv('EXCEL_BACKEND') or 'openpyxl'
+    if backend == 'stream':
+        return StreamWorkbook(source)
+    if backend == 'snapshot':
+        # 快照后端用本模块解析缺少快照的工作表
+        import sheet_snapshot
+        return sheet_snapshot.open_workbook(source)
+    if backend == 'openpyxl':
+        return openpyxl.load_workbook(source, read_only=read_only, data_only=True)
+    raise ValueError(f"未知的 Excel 读取后端: {backend}")
+
+
+def _cast_number(text):
+    """与 openpyxl 相同：带小数点或指数的为 float，否则为 int"""
+    if '.' in text or 'E' in text or 'e' in text:
+        return float(text)
+    return int(text)
+
+
+def _text_content(element):
+    """<si>/<is> 中的纯文本：直接的 <t> 加上各个 <r> 文本段，忽略注音 <rPh>"""
+    parts = [element.findtext(_TEXT) or '']
+    parts.extend(run.findtext(_TEXT) or '' for run in element.iterchildren(_RUN))
+    return ''.join(parts)
+
+
+class StreamCell:
+    """iter_rows(values_only=False) 和 cell() 返回的单元格，只有位置和值"""
+
+    __slots__ = ('row', 'column', 'value')
+
+    def __init__(self, row, column, value):
+        self.row = row
+        self.column = column
+        self.value = value
+
+    @property
+    def coordinate(self):
+        return f'{get_column_letter(self.column)}{self.row}'
+
+    def __repr__(self):
+        return f'<StreamCell {self.coordinate}={self.value!r}>'
+
+
+class StreamSheet:
+    def __init__(self, workbook, title, part):
+        self.parent = workbook
+        self.title = title
+        self._part = part
+        self._dimensions = None
+        self._cells = None
+
+    def _get_dimensions(self):
+        """<dimension ref> 记录的 (max_row, max_column)，没有记录时为 ()"""
+        if self._dimensions is None:
+            self._dimensions = ()
+            with self.parent._archive.open(self._part) as source:
+                for _, element in etree.iterparse(source, events=('start',)):
+                    if element.tag == _DIMENSION:
+                        try:
+                            _, _, max_column, max_row = range_boundaries(element.get('ref') or '')
+                        except (TypeError, ValueError):
+                            break
+                        if max_row and max_column:
+                            self._dimensions = (max_row, max_column)
+                        break
+                    if element.tag == _SHEET_DATA:
+                        break
+        return self._dimensions
+
+    def _parse_rows(self):
+        """逐行解析工作表 XML，产生 (行号, [(列号, 值), ...])；只包含 XML 中出现的行和单元格。"""
+        convert = self.parent._convert
+        text = self.parent.strings.text
+        with self.parent._archive.open(self._part) as source:
+            row_index = 0
+            for _, row in etree.iterparse(source, tag=_ROW):
+                ref = row.get('r')
+                row_index = int(float(ref)) if ref else row_index + 1
+                column = 0
+                cells = []
+                for cell in row.iterchildren(_CELL):
+                    ref = cell.get('r')
+                    column = column_index_from_string(ref.rstrip(_DIGITS)) if ref else column + 1
+                    kind = cell.get('t', 'n')
+                    if kind == 'inlineStr':
+                        child = cell.find(_INLINE_STRING)
+                        value = text(_text_content(child)) if child is not None else None
+                    else:
+                        value = cell.findtext(_VALUE) or None
+                        if value is not None:
+                            value = convert(kind, value, cell.get('s'))
+                    cells.append((column, value))
+                yield row_index, cells
+                # 已处理的行立即释放，内存不随行数增长
+                row.clear()
+                while row.getprevious() is not None:
+                    del row.getparent()[0]
+
+    def _load_cells(self):
+        """按坐标随机访问（cell()）时把整个工作表读成 {行: {列: 值}}，只解析一次"""
+        if self._cells is None:
+            self._cells = {index: dict(cells) for index, cells in self._parse_rows() if cells}
+        return self._cells
+
+    def _rows(self):
+        if self._cells is not None:
+            return ((index, self._cells[index].items()) for index in sorted(self._cells))
+        return self._parse_rows()
+
+    @property
+    def max_row(self):
+        dimensions = self._get_dimensions()
+        if dimensions:
+            return dimensions[0]
+        return max(self._load_cells(), default=1)
+
+    @property
+    def max_column(self):
+        dimensions = self._get_dimensions()
+        if dimensions:
+            return dimensions[1]
+        return max((max(cells) for cells in self._load_cells().values()), default=1)
+
+    def cell(self, row, column):
+        return StreamCell(row, column, self._load_cells().get(row, {}).get(column))
+
+    def iter_rows(self, min_row=None, max_row=None, min_col=None, max_col=None, values_only=False):
+        """
+        与 openpyxl 的 iter_rows 相同：按行产生 min_col..max_col 的值（或单元格），
+        缺少的行和单元格补 None，范围默认到工作表尺寸为止。未随机访问过的工作表边读边产生。
+        """
+        min_row = min_row or 1
+        min_col = min_col or 1
+        max_row = max_row or self.max_row
+        max_col = max_col or self.max_column
+        width = max_col + 1 - min_col
+
+        def build(index, cells):
+            values = [None] * width
+            for column, value in cells:
+                if min_col <= column <= max_col:
+                    values[column - min_col] = value
+            if values_only:
+                return tuple(values)
+            return tuple(StreamCell(index, min_col + i, value) for i, value in enumerate(values))
+
+        counter = min_row
+        for index, cells in self._rows():
+            if index > max_row:
+                break
+            if index < counter:
+                continue
+            for missing in range(counter, index):
+                yield build(missing, ())
+            yield build(index, cells)
+            counter = index + 1
+        for missing in range(counter, max_row + 1):
+            yield build(missing, ())
+
+    def __repr__(self):
+        return f'<StreamSheet "{self.title}">'
+
+
+class StreamWorkbook:
+    def __init__(self, source):
+        """
+        Args:
+            source: .xlsx 文件路径或二进制文件对象；不是有效的 .xlsx 时抛出 zipfile.BadZipFile 或 KeyError
+        """
+        self._archive = zipfile.ZipFile(source)
+        try:
+            self._parts = dict(sheet_cache.sheet_parts(self._archive))
+            properties = etree.fromstring(self._archive.read('xl/workbook.xml')).find(f'{_MAIN_NS}workbookPr')
+        except Exception:
+            self._archive.close()
+            raise
+        date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+        self.epoch = CALENDAR_MAC_1904 if date1904 else WINDOWS_EPOCH
+        self._sheets = {}
+        # 工作簿内去重的字符串表：相同文本的单元格共用同一个字符串对象
+        self.strings = StringTable()
+        self._shared_strings = None
+        self._formats = None
+
+    @property
+    def sheetnames(self):
+        return list(self._parts)
+
+    def __getitem__(self, name):
+        if name not in self._parts:
+            raise KeyError(f"Worksheet {name} does not exist.")
+        if name not in self._sheets:
+            self._sheets[name] = StreamSheet(self, name, self._parts[name])
+        return self._sheets[name]
+
+    def __contains__(self, name):
+        return name in self._parts
+
+    def close(self):
+        self._archive.close()
+
+    @property
+    def shared_strings(self):
+        """共享字符串表，第一次用到时流式读取"""
+        if self._shared_strings is None:
+            strings = []
+            try:
+                source = self._archive.open('xl/sharedStrings.xml')
+            except KeyError:
+                source = None
+            if source is not None:
+                with source:
+                    for _, element in etree.iterparse(source, tag=_SHARED_STRING):
+                        strings.append(self.strings.text(_text_content(element).replace('x005F_', '')))
+                        element.clear()
+            self._shared_strings = strings
+        return self._shared_strings
+
+    def _number_formats(self):
+        """(日期格式的样式索引集合, 时间间隔格式的样式索引集合)，来自 styles.xml 的 cellXfs"""
+        if self._formats is None:
+            dates, timedeltas = set(), set()
+            try:
+                styles = etree.fromstring(self._archive.read('xl/styles.xml'))
+            except KeyError:
+                styles = None
+            if styles is not None:
+                custom = {int(fmt.get('numFmtId')): fmt.get('formatCode')
+                          for fmt in styles.iterfind(f'{_MAIN_NS}numFmts/{_MAIN_NS}numFmt')}
+                for index, xf in enumerate(styles.iterfind(f'{_MAIN_NS}cellXfs/{_MAIN_NS}xf')):
+                    format_id = int(xf.get('numFmtId', 0))
+                    code = custom[format_id] if format_id in custom else builtin_format_code(format_id)
+                    if is_date_format(code):
+                        dates.add(index)
+                    if is_timedelta_format(code):
+                        timedeltas.add(index)
+            self._formats = (dates, timedeltas)
+        return self._formats
+
+    def _convert(self, kind, text, style):
+        """把 <v> 的文本按单元格类型转换为值，与 openpyxl 的 data_only 读取结果相同"""
+        if kind == 'n':
+            value = _cast_number(text)
+            if style:
+                dates, timedeltas = self._number_formats()
+                style = int(style)
+                if style in dates:
+                    try:
+                        value = from_excel(value, self.epoch, timedelta=style in timedeltas)
+                    except (OverflowError, ValueError):
+                        value = '#VALUE!'
+            return value
+        if kind == 's':
+            return self.shared_strings[int(text)]
+        if kind == 'b':
+            return bool(int(text))
+        if kind == 'd':
+            return from_ISO8601(text)
+        # str（公式结果字符串）、e（错误值）
+        return text